@@ -0,0 +1,107 @@
+"""
+Benchmark: move latency under concurrent games against MongoDB
+
+Plays many games at once through GameService with the real repository and
+reports per-move latency percentiles together with event loop lag. With a
+blocking driver every database round trip stalls all other games, which
+shows up directly in p99 latency and loop lag.
+
+Writes benchmark games into --db (default chess_benchmark); falls back to
+in-memory storage if MongoDB is unreachable.
+
+With --write-behind, moves are acknowledged once buffered and flushed in
+batches (see database/write_buffer.py); flush statistics are printed.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_concurrent_moves [--games N] [--db NAME] [--write-behind]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import logging
+import time
+
+from benchmarks.corpus import opening_heavy_games
+from core.loop_monitor import EventLoopLagMonitor
+from core.settings import settings
+from database.connection import pool_stats
+from database.write_buffer import write_buffer
+from enums.game_enums import TimeControl
+
+
+def percentile(samples, fraction: float) -> float:
+    """Percentile of a sorted list of samples"""
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+async def play(service, moves, latencies):
+    """Create, join and play one game, recording each move's latency"""
+    game = await service.create_game("WhitePlayer", "1+0")
+    await service.join_game(game.id, "BlackPlayer")
+    for i, move in enumerate(moves):
+        player = "WhitePlayer" if i % 2 == 0 else "BlackPlayer"
+        start = time.perf_counter()
+        response = await service.make_move(game.id, player, move)
+        latencies.append(time.perf_counter() - start)
+        if not response.success:
+            break
+
+
+async def run(games):
+    from database.repository import GameRepository
+    from services.game_service import GameService
+
+    repository = GameRepository()
+    await repository.connect()
+    backend = "mongodb" if repository.connected else "in-memory (MongoDB unreachable)"
+    service = GameService(repository)
+
+    monitor = EventLoopLagMonitor(interval=0.005)
+    monitor.start()
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(play(service, moves, latencies) for moves in games))
+    await write_buffer.stop()
+    elapsed = time.perf_counter() - start
+    await monitor.stop()
+    return backend, elapsed, sorted(latencies), monitor.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--plies", type=int, default=40)
+    parser.add_argument("--db", default="chess_benchmark")
+    parser.add_argument("--write-behind", action="store_true", help="Buffer moves and flush them in batches")
+    args = parser.parse_args()
+
+    settings.MONGODB_DB_NAME = args.db
+    if args.write_behind:
+        write_buffer.time_controls = {TimeControl.BULLET}
+    games = opening_heavy_games(args.games, max_plies=args.plies)
+
+    logging.disable(logging.CRITICAL)
+    with contextlib.redirect_stdout(io.StringIO()):
+        backend, elapsed, latencies, lag = asyncio.run(run(games))
+    logging.disable(logging.NOTSET)
+
+    print(f"storage: {backend}")
+    print(f"{args.games} concurrent games, {len(latencies)} moves in {elapsed:.2f}s "
+          f"({len(latencies) / elapsed:.0f} moves/s)")
+    print(f"move latency ms: p50 {percentile(latencies, 0.5) * 1000:.2f}  "
+          f"p99 {percentile(latencies, 0.99) * 1000:.2f}  max {latencies[-1] * 1000:.2f}")
+    print(f"event loop lag ms: p99 {lag['p99_ms']:.2f}  max {lag['max_ms']:.2f}")
+    pool = pool_stats.stats()
+    print(f"mongodb pool: peak checked out {pool['peak_checked_out']}/{pool['max_pool_size']}  "
+          f"avg wait {pool['avg_wait_ms']:.2f}ms  max wait {pool['max_wait_ms']:.2f}ms")
+    if args.write_behind:
+        buffered = write_buffer.stats()
+        print(f"write-behind: {buffered['flushes']} flushes of {buffered['flushed_ops']} games "
+              f"({buffered['coalesced']} moves coalesced)  avg flush {buffered['avg_flush_ms']:.2f}ms  "
+              f"max flush {buffered['max_flush_ms']:.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Benchmark: event loop lag with the chess executor inline vs in a process pool
+
+Plays many games concurrently through ChessExecutor while the event loop
+monitor samples how long the loop was blocked.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_event_loop_lag [--games N] [--workers N]
+"""
+
+import argparse
+import asyncio
+import time
+
+import chess
+
+from benchmarks.corpus import random_games
+from core.loop_monitor import EventLoopLagMonitor
+from utils.chess_executor import ChessExecutor
+
+
+async def play(executor: ChessExecutor, moves):
+    """Play one game, yielding to the loop between moves like real requests do"""
+    board = chess.Board()
+    counts = {}
+    for move in moves:
+        await executor.process_move(board, move, "white" if board.turn else "black", counts)
+        await asyncio.sleep(0)
+
+
+async def run(mode: str, games, workers: int, max_in_flight: int):
+    """Play all games concurrently and return (moves/s, lag stats)"""
+    executor = ChessExecutor(mode=mode, workers=workers, max_in_flight=max_in_flight)
+    monitor = EventLoopLagMonitor(interval=0.005)
+    if mode == "process":
+        # Warm the pool so process start-up is not counted as lag
+        await executor.process_move(chess.Board(), "e2e4", "white")
+    monitor.start()
+    start = time.perf_counter()
+    await asyncio.gather(*(play(executor, moves) for moves in games))
+    elapsed = time.perf_counter() - start
+    await monitor.stop()
+    executor.shutdown()
+    plies = sum(len(moves) for moves in games)
+    return plies / elapsed, monitor.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--games", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--max-in-flight", type=int, default=32)
+    args = parser.parse_args()
+
+    games = random_games(args.games, max_plies=80, seed=7)
+    print(f"{'mode':>8} {'moves/s':>9} {'lag avg ms':>11} {'lag p99 ms':>11} {'lag max ms':>11}")
+    for mode in ("inline", "process"):
+        rate, lag = asyncio.run(run(mode, games, args.workers, args.max_in_flight))
+        print(f"{mode:>8} {rate:>9.0f} {lag['avg_ms']:>11.2f} {lag['p99_ms']:>11.2f} {lag['max_ms']:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
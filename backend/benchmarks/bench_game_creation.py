@@ -0,0 +1,110 @@
+"""
+Benchmark: game creation throughput
+
+Compares the old creation path (random ID, get_game to check for a
+collision, then an upsert) with GameService.create_game (time-ordered ID
+from utils.game_ids and a plain insert that relies on the unique _id).
+Games are created --concurrency at a time, against the in-memory
+repository and, when it is reachable, MongoDB. The ID allocator alone is
+timed too.
+
+Writes benchmark games into --db (default chess_benchmark), which is
+dropped afterwards.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_game_creation [--db NAME] [--games N] [--concurrency N]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import logging
+import random
+import string
+import time
+
+from core.settings import settings
+
+
+async def create_with_pre_read(repository):
+    """The previous create_game: look the random ID up before saving"""
+    from enums.game_enums import GameStatus
+    from models.game_models import GameState
+
+    game_id = "".join(random.choices(string.ascii_lowercase + string.digits, k=8))
+    for _ in range(10):
+        if not await repository.get_game(game_id):
+            break
+        game_id = "".join(random.choices(string.ascii_lowercase + string.digits, k=8))
+    game = GameState(id=game_id, player_white="WhitePlayer", time_control="5+3", status=GameStatus.WAITING)
+    await repository.save_game(game)
+    return game
+
+
+async def games_per_second(create, games: int, concurrency: int) -> float:
+    """Create games in waves of the given concurrency"""
+    start = time.perf_counter()
+    for _ in range(games // concurrency):
+        await asyncio.gather(*(create() for _ in range(concurrency)))
+    return games // concurrency * concurrency / (time.perf_counter() - start)
+
+
+async def run(games: int, concurrency: int):
+    from database.game_cache import game_cache
+    from database.repository import GameRepository
+    from services.game_service import GameService
+
+    results = {}
+    backends = {"memory": GameRepository(in_memory=True)}
+    mongo = GameRepository()
+    await mongo.connect()
+    if mongo.connected:
+        backends["mongodb"] = mongo
+
+    for name, repository in backends.items():
+        service = GameService(repository)
+        game_cache.clear()
+        pre_read = await games_per_second(lambda: create_with_pre_read(repository), games, concurrency)
+        game_cache.clear()
+        insert = await games_per_second(lambda: service.create_game("WhitePlayer", "5+3"), games, concurrency)
+        results[name] = (pre_read, insert)
+
+    if mongo.connected:
+        await mongo.client.drop_database(settings.MONGODB_DB_NAME)
+    return results
+
+
+def allocator_ids_per_second(count: int = 200000) -> float:
+    """IDs allocated per second by one allocator"""
+    from utils.game_ids import GameIdAllocator
+
+    allocator = GameIdAllocator()
+    start = time.perf_counter()
+    for _ in range(count):
+        allocator.next_id()
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--games", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--db", default="chess_benchmark")
+    args = parser.parse_args()
+
+    settings.MONGODB_DB_NAME = args.db
+    logging.disable(logging.CRITICAL)
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = asyncio.run(run(args.games, args.concurrency))
+
+    print(f"ID allocator: {allocator_ids_per_second():,.0f} IDs/s")
+    print(f"{'backend':>8} {'pre-read + upsert':>18} {'insert':>10}   (games/s, concurrency {args.concurrency})")
+    for name, (pre_read, insert) in results.items():
+        print(f"{name:>8} {pre_read:>18,.0f} {insert:>10,.0f}")
+    if "mongodb" not in results:
+        print(" mongodb: skipped (MongoDB unreachable)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Benchmark: per-move latency of the move pipeline
+
+Compares the three FEN-based helpers (each rebuilding the board) against
+process_move on a single live board, replaying the sample corpus.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_move_pipeline [--rounds N]
+"""
+
+import argparse
+import time
+
+import chess
+
+from benchmarks.corpus import sample_games, random_games
+from utils.chess_utils import (
+    process_move, validate_and_apply_move, detect_game_end, get_turn_from_fen
+)
+
+
+def replay_separate_helpers(games):
+    """The pre-fused move path: one FEN parse per helper"""
+    for moves in games:
+        fen = chess.STARTING_FEN
+        for move in moves:
+            get_turn_from_fen(fen)
+            _, fen, _ = validate_and_apply_move(fen, move)
+            detect_game_end(fen)
+
+
+def replay_fused(games):
+    """The fused move path on a live board with a repetition index"""
+    for moves in games:
+        board = chess.Board()
+        counts = {}
+        for move in moves:
+            side = "white" if board.turn else "black"
+            process_move(board, move, side, counts)
+
+
+def time_per_move(replay, games, rounds: int) -> float:
+    """Average microseconds per move over the given number of rounds"""
+    plies = sum(len(moves) for moves in games)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        replay(games)
+    elapsed = time.perf_counter() - start
+    return elapsed / (plies * rounds) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    games = sample_games() + random_games(20)
+    separate = time_per_move(replay_separate_helpers, games, args.rounds)
+    fused = time_per_move(replay_fused, games, args.rounds)
+
+    print(f"separate helpers: {separate:8.1f} us/move")
+    print(f"fused pipeline:   {fused:8.1f} us/move")
+    print(f"speedup:          {separate / fused:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Benchmark: bytes and latency of persisting one move
+
+Compares, for games of 40, 100 and 300 plies, what the last move costs to
+write as a full document replace (legacy FEN-per-ply and compact move
+list formats) versus the append-only $push/$set delta used by
+GameService.make_move. Sizes are the BSON-encoded replacement document or
+update specification; latency is measured against MongoDB when it is
+reachable.
+
+Writes benchmark games into --db (default chess_benchmark).
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_move_writes [--db NAME] [--rounds N]
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+import bson
+import chess
+
+from core.settings import settings
+
+PLY_COUNTS = (40, 100, 300)
+
+
+def long_game(plies: int, seed: int = 1):
+    """A random game that lasts at least the given number of plies"""
+    rng = random.Random(seed)
+    while True:
+        board = chess.Board()
+        moves = []
+        while len(moves) < plies:
+            candidates = list(board.legal_moves)
+            rng.shuffle(candidates)
+            for move in candidates:
+                board.push(move)
+                if not board.is_game_over():
+                    break
+                board.pop()
+            else:
+                break
+            moves.append(board.peek().uci())
+        if len(moves) == plies:
+            return moves
+
+
+def build_game(moves):
+    """A GameState that has played the given UCI moves"""
+    from models.game_models import GameState
+    from utils.chess_utils import pack_move
+
+    game = GameState(id=f"bench-writes-{len(moves)}", player_white="WhitePlayer",
+                     player_black="BlackPlayer", time_control="5+3")
+    board = chess.Board()
+    for uci in moves:
+        move = chess.Move.from_uci(uci)
+        board.push(move)
+        game.record_move(pack_move(move), board.fen())
+    return game
+
+
+def write_sizes(game):
+    """BSON bytes written for the last move by each strategy"""
+    from database.repository import game_to_document, move_update
+
+    compact = game_to_document(game)
+    legacy = dict(compact)
+    for key in ("moves", "checkpoint_interval", "checkpoints"):
+        legacy.pop(key)
+    legacy["fens"] = game.fens
+    return {
+        "legacy_replace": len(bson.encode(legacy)),
+        "compact_replace": len(bson.encode(compact)),
+        "append": len(bson.encode(move_update(game)))
+    }
+
+
+async def write_latencies(games, rounds: int):
+    """Mean milliseconds per write of the last move, or None without MongoDB"""
+    from database.repository import GameRepository, game_to_document, move_update
+
+    repository = GameRepository()
+    await repository.connect()
+    if not repository.connected:
+        return None
+
+    collection = repository.games_collection
+    latencies = {}
+    for plies, game in games.items():
+        document = game_to_document(game)
+        update = move_update(game)
+        # Document as it was before the last move, so every $push lands on the same size
+        before = dict(document, moves=document["moves"][:-1])
+        if "checkpoints" in update["$push"]:
+            before["checkpoints"] = document["checkpoints"][:-1]
+
+        async def timed(write):
+            total = 0.0
+            for _ in range(rounds):
+                await collection.replace_one({"_id": game.id}, before, upsert=True)
+                start = time.perf_counter()
+                await write()
+                total += time.perf_counter() - start
+            return total / rounds * 1000
+
+        latencies[plies] = {
+            "compact_replace": await timed(lambda: collection.replace_one({"_id": game.id}, document)),
+            "append": await timed(lambda: collection.update_one({"_id": game.id}, update))
+        }
+        await collection.delete_one({"_id": game.id})
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--db", default="chess_benchmark")
+    args = parser.parse_args()
+
+    settings.MONGODB_DB_NAME = args.db
+    games = {plies: build_game(long_game(plies, seed=plies)) for plies in PLY_COUNTS}
+
+    print(f"{'plies':>6} {'legacy replace':>15} {'compact replace':>16} {'append':>8}   (bytes per move)")
+    for plies, game in games.items():
+        sizes = write_sizes(game)
+        print(f"{plies:>6} {sizes['legacy_replace']:>15} {sizes['compact_replace']:>16} {sizes['append']:>8}")
+
+    latencies = asyncio.run(write_latencies(games, args.rounds))
+    if latencies is None:
+        print("latency: skipped (MongoDB unreachable)")
+        return
+    print(f"{'plies':>6} {'compact replace':>16} {'append':>8}   (ms per move)")
+    for plies, row in latencies.items():
+        print(f"{plies:>6} {row['compact_replace']:>16.3f} {row['append']:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Benchmark: shared legal-move transposition cache
+
+Replays an opening-heavy corpus through process_move with different cache
+sizes and reports per-move latency and hit rate, to size POSITION_CACHE_SIZE
+and POSITION_CACHE_MAX_PLY.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_position_cache [--games N] [--sizes 0,1000,20000]
+"""
+
+import argparse
+import time
+
+import chess
+
+from benchmarks.corpus import opening_heavy_games
+from utils.chess_utils import process_move
+from utils.position_cache import position_cache
+
+
+def replay(games):
+    """Replay every game on a fresh live board with a repetition index"""
+    for moves in games:
+        board = chess.Board()
+        counts = {}
+        for move in moves:
+            process_move(board, move, "white" if board.turn else "black", counts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--games", type=int, default=500)
+    parser.add_argument("--sizes", default="0,1000,5000,20000,100000")
+    parser.add_argument("--max-ply", type=int, default=position_cache.max_ply)
+    args = parser.parse_args()
+
+    games = opening_heavy_games(args.games)
+    plies = sum(len(moves) for moves in games)
+    position_cache.max_ply = args.max_ply
+    print(f"{args.games} games, {plies} plies, caching up to ply {args.max_ply}")
+    print(f"{'size':>8} {'us/move':>9} {'hit rate':>9} {'entries':>8}")
+
+    for size in (int(size) for size in args.sizes.split(",")):
+        position_cache.clear()
+        position_cache.resize(size)
+        start = time.perf_counter()
+        replay(games)
+        elapsed = time.perf_counter() - start
+        stats = position_cache.stats()
+        print(f"{size:>8} {elapsed / plies * 1e6:>9.1f} {stats['hit_rate']:>9.1%} {stats['size']:>8}")
+
+
+if __name__ == "__main__":
+    main()
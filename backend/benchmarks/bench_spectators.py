@@ -0,0 +1,112 @@
+"""
+Benchmark: player latency with thousands of spectators on one game
+
+Plays --moves moves on one game with two player sockets and --spectators
+simulated spectator sockets, and measures how long each move takes from
+broadcast to being written on the players' sockets. Three setups:
+- players only (the floor)
+- spectators treated like players (every move queued on every socket)
+- spectators in the coalesced spectator tier (services/connection_manager)
+
+Simulated sockets yield to the event loop on every send, like a real
+socket write that does not block.
+
+Exits non-zero if the player p99 with the spectator tier is more than
+--max-factor times the players-only p99 (with a --floor-ms allowance for
+timer noise on sub-millisecond latencies).
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_spectators [--spectators N] [--moves N] [--interval-ms N]
+                                          [--max-factor X] [--floor-ms N]
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+
+
+class SimulatedSocket:
+    """Socket stand-in; player sockets record the latency of every move"""
+
+    def __init__(self, sent_at=None):
+        self.sent_at = sent_at
+        self.latencies = []
+        self.messages = 0
+
+    async def send_text(self, text: str):
+        await asyncio.sleep(0)
+        self.messages += 1
+        if self.sent_at is not None:
+            self.latencies.append(time.perf_counter() - self.sent_at[json.loads(text)["ply"]])
+
+    async def close(self, code: int = 1000):
+        pass
+
+
+async def run(spectators: int, tier: bool, moves: int, interval: float):
+    """Player latencies (seconds) and spectator messages written for one setup"""
+    from services.connection_manager import ConnectionManager
+
+    manager = ConnectionManager(max_queue=moves + 1, spectator_tick=0.1, spectator_batch_size=200)
+    sent_at = {}
+    players = [SimulatedSocket(sent_at), SimulatedSocket(sent_at)]
+    for socket, username in zip(players, ("WhitePlayer", "BlackPlayer")):
+        manager.connect("game", socket, username)
+    audience = [SimulatedSocket() for _ in range(spectators)]
+    for socket in audience:
+        connection = manager.connect("game", socket)
+        if tier:
+            manager.set_spectator(connection)
+
+    # Let every writer task start before the first move, as on a server where spectators joined earlier
+    await asyncio.sleep(0.05)
+
+    fen = "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 1"
+    for ply in range(moves):
+        sent_at[ply] = time.perf_counter()
+        message = {"type": "move_made", "game_id": "game", "move": "e2e4", "fen": fen, "ply": ply}
+        manager.broadcast("game", json.dumps(message), key="move_made")
+        await asyncio.sleep(interval)
+    await asyncio.sleep(0.3)
+
+    for connection in list(manager.game_connections["game"]):
+        await manager.disconnect(connection)
+    latencies = [latency for socket in players for latency in socket.latencies]
+    return latencies, sum(socket.messages for socket in audience)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--spectators", type=int, default=5000)
+    parser.add_argument("--moves", type=int, default=100)
+    parser.add_argument("--interval-ms", type=float, default=20)
+    parser.add_argument("--max-factor", type=float, default=5)
+    parser.add_argument("--floor-ms", type=float, default=1)
+    args = parser.parse_args()
+
+    setups = [
+        ("players only", 0, False),
+        ("spectators as players", args.spectators, False),
+        ("spectator tier", args.spectators, True),
+    ]
+    print(f"{'setup':>22} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'spectator msgs':>15}")
+    p99s = {}
+    for name, spectators, tier in setups:
+        latencies, spectator_messages = asyncio.run(run(spectators, tier, args.moves, args.interval_ms / 1000))
+        latencies.sort()
+        p99 = p99s[name] = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        print(f"{name:>22} {statistics.median(latencies) * 1000:>8.2f} {p99 * 1000:>8.2f} "
+              f"{latencies[-1] * 1000:>8.2f} {spectator_messages:>15}")
+
+    limit = max(p99s["players only"] * args.max_factor, args.floor_ms / 1000)
+    if p99s["spectator tier"] > limit:
+        print(f"FAIL: player p99 with the spectator tier is {p99s['spectator tier'] * 1000:.2f} ms, "
+              f"limit {limit * 1000:.2f} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Benchmark: WebSocket bandwidth and serialization time per wire protocol
+
+Plays --games random games of up to --plies plies and builds the
+messages a player receives (game_state on connect, then one move_made
+per ply, as GameService sends them). For each protocol of
+services/wire_protocol it reports the bytes per move, the bytes per
+game, and the time to encode one move message; spectator (sync) moves
+are reported separately for the compact protocols. MessagePack is only
+measured when the optional msgpack package is installed.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_wire_protocol [--games N] [--plies N] [--repeat N]
+"""
+
+import argparse
+import random
+import time
+from datetime import datetime, timezone
+
+import chess
+
+
+def play(plies: int, rng: random.Random):
+    """Legacy game_state and move_made messages of one random game"""
+    board = chess.Board()
+    state = {
+        "type": "game_state", "game_id": "m5x0k2a9q1", "fen": board.fen(), "ply": 0, "status": "active",
+        "player_white": "WhitePlayer", "player_black": "BlackPlayer", "time_control": "5+3", "result": None
+    }
+    moves = []
+    while len(moves) < plies and not board.is_game_over():
+        move = rng.choice(list(board.legal_moves))
+        username = "WhitePlayer" if board.turn == chess.WHITE else "BlackPlayer"
+        board.push(move)
+        moves.append({
+            "type": "move_made", "game_id": "m5x0k2a9q1", "username": username, "move": move.uci(),
+            "ply": len(moves) + 1, "fen": board.fen(), "timestamp": datetime.now(timezone.utc).isoformat()
+        })
+    return state, moves
+
+
+def encode_time(protocol, messages, sync: bool, repeat: int) -> float:
+    """Microseconds to serialize one message, for a fresh Frame each time (as a broadcast does)"""
+    from services.wire_protocol import Frame
+
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for message in messages:
+            Frame(message).encode(protocol, sync)
+    return (time.perf_counter() - started) / (repeat * len(messages)) * 1e6
+
+
+def main():
+    from services.wire_protocol import PROTOCOLS, Frame
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--games", type=int, default=20)
+    parser.add_argument("--plies", type=int, default=80)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    games = [play(args.plies, rng) for _ in range(args.games)]
+    all_moves = [move for _, moves in games for move in moves]
+    print(f"{len(games)} games, {len(all_moves)} moves")
+    print(f"{'protocol':>24} {'B/move':>8} {'B/game':>8} {'vs json':>8} {'us/move':>8}")
+
+    baseline = None
+    for protocol in PROTOCOLS.values():
+        variants = [(protocol.name, False)]
+        if protocol.compact:
+            variants.append((f"{protocol.name} sync", True))
+        for name, sync in variants:
+            move_bytes = sum(len(Frame(move).encode(protocol, sync)) for move in all_moves)
+            game_bytes = move_bytes + sum(len(Frame(state).encode(protocol)) for state, _ in games)
+            if baseline is None:
+                baseline = game_bytes
+            micros = encode_time(protocol, all_moves, sync, args.repeat)
+            print(f"{name:>24} {move_bytes / len(all_moves):>8.1f} {game_bytes / len(games):>8.0f} "
+                  f"{game_bytes / baseline:>7.0%} {micros:>8.2f}")
+    if "chess.v1.msgpack" not in PROTOCOLS:
+        print("msgpack is not installed; chess.v1.msgpack not measured")
+
+
+if __name__ == "__main__":
+    main()
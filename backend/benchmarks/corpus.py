@@ -0,0 +1,97 @@
+"""
+Benchmark Corpus - Sample games for timing the move path
+
+Games are stored in SAN and converted to UCI with python-chess so the
+corpus stays readable.
+"""
+
+import random
+from typing import List
+
+import chess
+
+# Well-known games and opening lines, heavy on the positions real games share
+SAMPLE_GAMES_SAN = [
+    # Morphy vs Duke Karl / Count Isouard, Paris 1858 (the Opera Game)
+    "e4 e5 Nf3 d6 d4 Bg4 dxe5 Bxf3 Qxf3 dxe5 Bc4 Nf6 Qb3 Qe7 Nc3 c6 Bg5 b5 "
+    "Nxb5 cxb5 Bxb5+ Nbd7 O-O-O Rd8 Rxd7 Rxd7 Rd1 Qe6 Bxd7+ Nxd7 Qb8+ Nxb8 Rd8#",
+    # Ruy Lopez, Closed
+    "e4 e5 Nf3 Nc6 Bb5 a6 Ba4 Nf6 O-O Be7 Re1 b5 Bb3 d6 c3 O-O h3 Nb8 d4 Nbd7 "
+    "Nbd2 Bb7 Bc2 Re8 Nf1 Bf8 Ng3 g6 a4 c5 d5 c4 Bg5 h6 Be3 Nc5 Qd2 h5",
+    # Sicilian Najdorf
+    "e4 c5 Nf3 d6 d4 cxd4 Nxd4 Nf6 Nc3 a6 Be3 e5 Nb3 Be6 f3 Be7 Qd2 O-O O-O-O Nbd7 "
+    "g4 b5 g5 b4 Ne2 Ne8 f4 a5 f5 a4 Nbd4 exd4 Nxd4 b3 Kb1 bxc2+ Nxc2 Bb3",
+    # Queen's Gambit Declined
+    "d4 d5 c4 e6 Nc3 Nf6 Bg5 Be7 e3 O-O Nf3 h6 Bh4 b6 cxd5 Nxd5 Bxe7 Qxe7 Nxd5 exd5 "
+    "Rc1 Be6 Qa4 c5 Qa3 Rc8 Bb5 a6 dxc5 bxc5 O-O Ra7 Be2 Nd7 Nd4 Qf8 Nxe6 fxe6",
+    # Italian Game
+    "e4 e5 Nf3 Nc6 Bc4 Bc5 c3 Nf6 d3 d6 O-O O-O Re1 a6 Bb3 Ba7 h3 h6 Nbd2 Re8 "
+    "Nf1 Be6 Bc2 d5 exd5 Qxd5 Ng3 Rad8 Qe2 Qd7",
+    # Scholar's Mate and Fool's Mate, as played in the functional tests
+    "e4 e5 Bc4 Nc6 Qh5 Nf6 Qxf7#",
+    "f3 e5 g4 Qh4#",
+]
+
+
+def san_to_uci(san_moves: str) -> List[str]:
+    """Convert a space separated SAN game into a list of UCI moves"""
+    board = chess.Board()
+    return [board.push_san(san).uci() for san in san_moves.split()]
+
+
+def sample_games() -> List[List[str]]:
+    """Get the sample games as lists of UCI moves"""
+    return [san_to_uci(game) for game in SAMPLE_GAMES_SAN]
+
+
+def random_games(count: int, max_plies: int = 80, seed: int = 1) -> List[List[str]]:
+    """Generate random legal games for middlegame-heavy coverage"""
+    rng = random.Random(seed)
+    games = []
+    for _ in range(count):
+        board = chess.Board()
+        moves = []
+        while len(moves) < max_plies and not board.is_game_over():
+            move = rng.choice(list(board.legal_moves))
+            board.push(move)
+            moves.append(move.uci())
+        games.append(moves)
+    return games
+
+
+def opening_heavy_games(count: int, max_plies: int = 60, seed: int = 1) -> List[List[str]]:
+    """
+    Generate games that follow a sample opening for a while, then diverge
+
+    Mirrors real traffic: many games share the same first few moves and only
+    become unique once they leave book.
+    """
+    rng = random.Random(seed)
+    openings = sample_games()
+    games = []
+    for _ in range(count):
+        opening = rng.choice(openings)
+        book_plies = rng.randint(min(4, len(opening)), min(24, len(opening)))
+        board = chess.Board()
+        moves = []
+        for move in opening[:book_plies]:
+            board.push_uci(move)
+            moves.append(move)
+        while len(moves) < max_plies and not board.is_game_over():
+            move = rng.choice(list(board.legal_moves))
+            board.push(move)
+            moves.append(move.uci())
+        games.append(moves)
+    return games
+
+
+def positions(games: List[List[str]]) -> List[str]:
+    """Get every FEN reached in the given games, including the start position"""
+    fens = []
+    for moves in games:
+        board = chess.Board()
+        fens.append(board.fen())
+        for move in moves:
+            board.push_uci(move)
+            fens.append(board.fen())
+    return fens
@@ -0,0 +1,202 @@
+"""
+Benchmark Suite - Micro and macro timings of the move path
+
+Micro benchmarks time the chess helpers over a generated corpus of
+positions; macro benchmarks time GameService.make_move against the
+in-memory repository and the /api/games/{id}/move route through the
+TestClient. Results are written as JSON and compared against a stored
+baseline so hot-path regressions are caught before deploy.
+
+Baselines are machine specific: save one on the machine that runs the
+comparison.
+
+Usage (from the backend directory):
+    python -m benchmarks.suite --save-baseline
+    python -m benchmarks.suite --output results.json --max-regression 0.2
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import logging
+import os
+import platform
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import chess
+
+from benchmarks.corpus import positions, random_games, sample_games
+
+DEFAULT_BASELINE = Path(__file__).parent / "baseline.json"
+
+
+def best_of(rounds: int, ops: int, run: Callable[[], None]) -> float:
+    """Run a batch several times and return the best microseconds per operation"""
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return best / ops * 1e6
+
+
+def micro_benchmarks(rounds: int) -> Dict[str, float]:
+    """Time the FEN-based chess helpers over a corpus of positions"""
+    from utils.chess_utils import detect_game_end, get_turn_from_fen, validate_and_apply_move
+
+    fens = positions(sample_games() + random_games(30, seed=3))
+    # One legal move per non-terminal position
+    cases = []
+    for fen in fens:
+        board = chess.Board(fen)
+        move = next(iter(board.legal_moves), None)
+        if move is not None:
+            cases.append((fen, move.uci()))
+
+    return {
+        "micro.get_turn_from_fen": best_of(rounds, len(fens), lambda: [get_turn_from_fen(fen) for fen in fens]),
+        "micro.detect_game_end": best_of(rounds, len(fens), lambda: [detect_game_end(fen) for fen in fens]),
+        "micro.validate_and_apply_move": best_of(
+            rounds, len(cases), lambda: [validate_and_apply_move(fen, move) for fen, move in cases]
+        ),
+    }
+
+
+def _service_games():
+    """Games replayed by the macro benchmarks"""
+    return sample_games()[:5]
+
+
+def macro_make_move(rounds: int) -> float:
+    """Time GameService.make_move end to end against the in-memory repository"""
+    from database.repository import GameRepository
+    from services.game_service import GameService
+    from utils.board_cache import board_cache
+
+    games = _service_games()
+    plies = sum(len(moves) for moves in games)
+
+    async def replay():
+        service = GameService(GameRepository(in_memory=True))
+        board_cache.clear()
+        for moves in games:
+            game = await service.create_game("WhitePlayer", "5+3")
+            await service.join_game(game.id, "BlackPlayer")
+            for i, move in enumerate(moves):
+                player = "WhitePlayer" if i % 2 == 0 else "BlackPlayer"
+                response = await service.make_move(game.id, player, move)
+                assert response.success, response.error
+
+    return best_of(rounds, plies, lambda: asyncio.run(replay()))
+
+
+def macro_move_route(rounds: int) -> float:
+    """Time POST /api/games/{id}/move through the TestClient"""
+    os.environ["TEST_MODE"] = "true"
+    from fastapi.testclient import TestClient
+    from jose import jwt
+
+    from core.settings import settings
+    from database.repository import GameRepository, get_repository
+    from main import app
+    from services.game_service import game_service
+
+    repository = GameRepository(in_memory=True)
+    game_service.repository = repository
+    app.dependency_overrides[get_repository] = lambda: repository
+
+    def headers(username: str) -> dict:
+        token = jwt.encode({"sub": username, "exp": datetime.now(timezone.utc).timestamp() + 3600},
+                           settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+        return {"Authorization": f"Bearer {token}"}
+
+    players = [headers("WhitePlayer"), headers("BlackPlayer")]
+    games = _service_games()
+    plies = sum(len(moves) for moves in games)
+
+    with TestClient(app) as client:
+        def replay():
+            for moves in games:
+                game_id = client.post("/api/games", json={"time_control": "5+3"}, headers=players[0]).json()["id"]
+                client.post(f"/api/games/{game_id}/join", json={}, headers=players[1])
+                for i, move in enumerate(moves):
+                    response = client.post(f"/api/games/{game_id}/move", json={"move": move}, headers=players[i % 2])
+                    assert response.json()["success"], response.text
+
+        try:
+            return best_of(rounds, plies, replay)
+        finally:
+            app.dependency_overrides.pop(get_repository, None)
+
+
+def run_suite(rounds: int, include_route: bool) -> Dict[str, float]:
+    """Run every benchmark and return microseconds per operation by name"""
+    results = micro_benchmarks(rounds)
+    # The service logs and prints on every delivery attempt; keep the report readable
+    logging.disable(logging.CRITICAL)
+    with contextlib.redirect_stdout(io.StringIO()):
+        results["macro.make_move"] = macro_make_move(rounds)
+        if include_route:
+            results["macro.move_route"] = macro_move_route(rounds)
+    logging.disable(logging.NOTSET)
+    return results
+
+
+def compare(results: Dict[str, float], baseline: Dict[str, float], max_regression: float) -> List[str]:
+    """Print a comparison table and return the names that regressed"""
+    regressions = []
+    print(f"{'benchmark':<32} {'us/op':>10} {'baseline':>10} {'change':>8}")
+    for name, value in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:<32} {value:>10.1f} {'-':>10} {'-':>8}")
+            continue
+        change = value / base - 1
+        flag = "  REGRESSION" if change > max_regression else ""
+        print(f"{name:<32} {value:>10.1f} {base:>10.1f} {change:>+8.1%}{flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--output", type=Path, help="Write results as JSON to this file")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Store the results as the new baseline")
+    parser.add_argument("--max-regression", type=float, default=0.2,
+                        help="Fail if any benchmark is slower than the baseline by more than this fraction")
+    parser.add_argument("--skip-route", action="store_true", help="Skip the TestClient route benchmark")
+    args = parser.parse_args()
+
+    results = run_suite(args.rounds, include_route=not args.skip_route)
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "python_chess": chess.__version__,
+        "unit": "us/op",
+        "results": results
+    }
+
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(report, indent=2))
+        print(f"Baseline saved to {args.baseline}")
+
+    baseline = json.loads(args.baseline.read_text())["results"] if args.baseline.exists() else {}
+    regressions = compare(results, baseline, args.max_regression)
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) regressed by more than {args.max_regression:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
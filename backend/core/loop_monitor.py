@@ -0,0 +1,73 @@
+"""
+Event Loop Monitor - Measure how long the event loop is blocked
+
+A background task sleeps for a fixed interval and records how late it
+wakes up. Any lag means some coroutine held the loop (e.g. CPU-bound move
+validation) and every other request on the worker waited that long.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+from core.metrics import register_metrics
+from core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class EventLoopLagMonitor:
+    """Sample event loop lag over a sliding window"""
+
+    def __init__(self, interval: float = 0.05, window: int = 1200):
+        self.interval = interval
+        self._samples: deque = deque(maxlen=window)
+        self._task: Optional[asyncio.Task] = None
+        self.max_lag = 0.0
+
+    async def _run(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - start - self.interval)
+            self._samples.append(lag)
+            self.max_lag = max(self.max_lag, lag)
+
+    def start(self):
+        """Start sampling on the running loop"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop sampling"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def reset(self):
+        """Forget collected samples"""
+        self._samples.clear()
+        self.max_lag = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        """Get lag percentiles over the current window in milliseconds"""
+        samples = sorted(self._samples)
+        if not samples:
+            return {"samples": 0, "avg_ms": 0.0, "p99_ms": 0.0, "max_ms": self.max_lag * 1000}
+        return {
+            "samples": len(samples),
+            "avg_ms": sum(samples) / len(samples) * 1000,
+            "p99_ms": samples[min(len(samples) - 1, int(len(samples) * 0.99))] * 1000,
+            "max_ms": self.max_lag * 1000
+        }
+
+
+# Global event loop monitor instance
+loop_monitor = EventLoopLagMonitor(interval=settings.LOOP_MONITOR_INTERVAL_MS / 1000)
+register_metrics("event_loop", loop_monitor.stats)
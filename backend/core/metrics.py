@@ -0,0 +1,30 @@
+"""
+Metrics Registry - In-process counters for tuning caches, pools and queues
+
+Components register a provider that returns a dict of their current stats;
+the /metrics endpoint collects a snapshot of every registered provider.
+"""
+
+import logging
+from typing import Any, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+_providers: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+
+def register_metrics(name: str, provider: Callable[[], Dict[str, Any]]):
+    """Register (or replace) a stats provider under the given name"""
+    _providers[name] = provider
+
+
+def metrics_snapshot() -> Dict[str, Dict[str, Any]]:
+    """Collect the current stats of every registered provider"""
+    snapshot = {}
+    for name, provider in _providers.items():
+        try:
+            snapshot[name] = provider()
+        except Exception as e:
+            logger.error(f"Failed to collect metrics for {name}: {e}")
+            snapshot[name] = {"error": str(e)}
+    return snapshot
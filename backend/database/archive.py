@@ -0,0 +1,242 @@
+"""
+Game Archive - Cold storage tier for finished games
+
+Finished games older than ARCHIVE_AFTER_DAYS are moved out of the hot
+'games' collection (and its status/player indexes) into 'games_archive':
+- Archived documents keep the listing fields uncompressed, so user game
+  listings are served by the archive's own player indexes
+- The move list is packed as little-endian 16-bit moves and zlib
+  compressed; checkpoints and the repetition index are dropped and rebuilt
+  from the moves when an archived game is read
+- GameRepository.get_game and get_user_game_summaries read through to the
+  archive, so callers do not know which tier a game lives in
+
+The archiver runs as a background task in batches, oldest games first.
+Each game is copied to the archive before it is deleted from the hot
+collection, and the position reached is saved after every batch, so an
+interrupted run resumes where it stopped and never loses a game.
+"""
+
+import array
+import asyncio
+import logging
+import sys
+import time
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+import bson
+
+from core.metrics import register_metrics
+from core.settings import settings
+from enums.game_enums import GameStatus
+from models.game_models import GameState
+from utils.chess_utils import rebuild_position_counts, replay_fens
+
+logger = logging.getLogger(__name__)
+
+# Statuses a game never leaves; only these are archived
+ARCHIVED_STATUSES = [GameStatus.FINISHED.value, GameStatus.ABANDONED.value]
+
+# Fields loaded for game listings from the archive (everything but the packed moves)
+ARCHIVE_SUMMARY_PROJECTION = {
+    "player_white": 1,
+    "player_black": 1,
+    "current_fen": 1,
+    "time_control": 1,
+    "status": 1,
+    "result": 1,
+    "created_at": 1,
+    "updated_at": 1
+}
+
+
+def pack_moves(moves: List[int]) -> bytes:
+    """Compress a packed move list: 16 bits per move, little-endian, zlib"""
+    packed = array.array("H", moves)
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return zlib.compress(packed.tobytes(), 9)
+
+
+def unpack_moves(data: bytes) -> List[int]:
+    """Decompress a move list written by pack_moves"""
+    packed = array.array("H")
+    packed.frombytes(zlib.decompress(data))
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return packed.tolist()
+
+
+def archive_document(game: GameState, archived_at: datetime) -> dict:
+    """Convert a finished GameState to its compressed archive document"""
+    return {
+        "_id": game.id,
+        "player_white": game.player_white,
+        "player_black": game.player_black,
+        "start_fen": game.start_fen,
+        "moves": bson.Binary(pack_moves(game.moves)),
+        "ply": game.ply,
+        "checkpoint_interval": game.checkpoint_interval,
+        "current_fen": game.current_fen,
+        "time_control": game.time_control,
+        "status": game.status.value if hasattr(game.status, 'value') else game.status,
+        "result": game.result,
+        "version": game.version,
+        "created_at": game.created_at,
+        "updated_at": game.updated_at,
+        "archived_at": archived_at
+    }
+
+
+def game_from_archive(document: dict) -> GameState:
+    """Restore a GameState from an archive document, replaying its moves once"""
+    data = dict(document)
+    data["id"] = data.pop("_id")
+    data.pop("ply", None)
+    data.pop("archived_at", None)
+    data["moves"] = unpack_moves(bytes(data["moves"]))
+    fens = replay_fens(data["start_fen"], data["moves"])
+    interval = data["checkpoint_interval"]
+    data["checkpoints"] = fens[interval::interval]
+    data["position_counts"] = rebuild_position_counts(fens)
+    game = GameState(**data)
+    game._persisted = True
+    return game
+
+
+def _bson_size(document: dict) -> int:
+    return len(bson.encode(document))
+
+
+class GameArchiver:
+    """Background task that moves old finished games to the archive in batches"""
+
+    def __init__(self, min_age_seconds: float, batch_size: int = 200, interval_seconds: float = 60):
+        self.min_age_seconds = min_age_seconds
+        self.batch_size = batch_size
+        self.interval_seconds = interval_seconds
+        self._task: Optional[asyncio.Task] = None
+        self.archived = 0
+        self.conflicts = 0
+        self.errors = 0
+        self.batches = 0
+        self.hot_bytes = 0
+        self.archive_bytes = 0
+        self.busy_seconds = 0.0
+        self.last_batch_games_per_second = 0.0
+        self.last_run_at: Optional[datetime] = None
+        self.checkpoint: Optional[Dict[str, Any]] = None
+
+    async def run_batch(self, repository=None) -> int:
+        """
+        Archive one batch of eligible games, oldest first
+
+        Returns:
+            Number of games handled; fewer than batch_size means the run is done
+        """
+        if repository is None:
+            from database.repository import get_repository
+            repository = get_repository()
+
+        if self.checkpoint is None:
+            self.checkpoint = await repository.get_archive_checkpoint()
+        after = None
+        if self.checkpoint:
+            after = (self.checkpoint["updated_at"], self.checkpoint["game_id"])
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.min_age_seconds)
+
+        start = time.perf_counter()
+        games = await repository.find_archive_candidates(cutoff, after, self.batch_size)
+        archived = 0
+        handled = 0
+        for game in games:
+            try:
+                document = archive_document(game, datetime.now(timezone.utc))
+                if await repository.archive_game(game, document):
+                    archived += 1
+                    self.hot_bytes += _bson_size(_hot_document(game))
+                    self.archive_bytes += _bson_size(document)
+                else:
+                    # Written since it was read; it comes back later with a newer updated_at
+                    self.conflicts += 1
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Failed to archive game {game.id}: {e}")
+                break
+            handled += 1
+            self.checkpoint = {"updated_at": game.updated_at, "game_id": game.id}
+
+        if handled:
+            await repository.save_archive_checkpoint(self.checkpoint)
+        if games:
+            elapsed = time.perf_counter() - start
+            self.busy_seconds += elapsed
+            self.batches += 1
+            self.archived += archived
+            self.last_batch_games_per_second = archived / elapsed if elapsed > 0 else 0.0
+            logger.info(f"Archived {archived} of {len(games)} games in {elapsed * 1000:.0f}ms")
+        self.last_run_at = datetime.now(timezone.utc)
+        return handled
+
+    async def run(self, repository=None):
+        """Archive batches until nothing eligible is left"""
+        while await self.run_batch(repository) >= self.batch_size:
+            await asyncio.sleep(0)
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.run()
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Archive run failed: {e}")
+            await asyncio.sleep(self.interval_seconds)
+
+    def start(self):
+        """Run the archiver on the running loop"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        """Stop the archiver; the current game is finished or left untouched"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Get archive throughput and compression counters"""
+        return {
+            "running": self._task is not None,
+            "min_age_seconds": self.min_age_seconds,
+            "archived": self.archived,
+            "conflicts": self.conflicts,
+            "errors": self.errors,
+            "batches": self.batches,
+            "games_per_second": self.archived / self.busy_seconds if self.busy_seconds else 0.0,
+            "last_batch_games_per_second": self.last_batch_games_per_second,
+            "hot_bytes": self.hot_bytes,
+            "archive_bytes": self.archive_bytes,
+            "compression_ratio": self.hot_bytes / self.archive_bytes if self.archive_bytes else 0.0,
+            "last_run_at": self.last_run_at.isoformat() if self.last_run_at else None,
+            "checkpoint": self.checkpoint["game_id"] if self.checkpoint else None
+        }
+
+
+def _hot_document(game: GameState) -> dict:
+    from database.repository import game_to_document
+    return game_to_document(game)
+
+
+# Global game archiver instance
+game_archiver = GameArchiver(
+    min_age_seconds=settings.ARCHIVE_AFTER_DAYS * 86400,
+    batch_size=settings.ARCHIVE_BATCH_SIZE,
+    interval_seconds=settings.ARCHIVE_INTERVAL_SECONDS
+)
+register_metrics("game_archiver", game_archiver.stats)
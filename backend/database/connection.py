@@ -0,0 +1,129 @@
+"""
+Database Connection - Single shared MongoDB client
+
+One AsyncIOMotorClient (and therefore one connection pool) per process,
+shared by the game and auth paths. Pool size, timeouts and server
+selection limits come from core/settings.py; pool saturation and
+checkout wait times are exposed on /metrics.
+"""
+
+import logging
+from typing import Any, Dict, Optional
+
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo import monitoring
+
+from core.metrics import register_metrics
+from core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+_client: Optional[AsyncIOMotorClient] = None
+
+
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+    """Track connection pool usage from pymongo's pool events"""
+
+    def __init__(self, max_pool_size: int):
+        self.max_pool_size = max_pool_size
+        self.open_connections = 0
+        self.checked_out = 0
+        self.peak_checked_out = 0
+        self.checkouts = 0
+        self.checkout_failures = 0
+        self.checkout_timeouts = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.pool_clears = 0
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self.pool_clears += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self.open_connections += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self.open_connections = max(0, self.open_connections - 1)
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        self.checkout_failures += 1
+        if event.reason == monitoring.ConnectionCheckOutFailedReason.TIMEOUT:
+            self.checkout_timeouts += 1
+
+    def connection_checked_out(self, event):
+        self.checkouts += 1
+        self.checked_out += 1
+        self.peak_checked_out = max(self.peak_checked_out, self.checked_out)
+        wait = getattr(event, "duration", None) or 0.0
+        self.total_wait_seconds += wait
+        self.max_wait_seconds = max(self.max_wait_seconds, wait)
+
+    def connection_checked_in(self, event):
+        self.checked_out = max(0, self.checked_out - 1)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get pool occupancy, saturation and checkout wait times"""
+        return {
+            "max_pool_size": self.max_pool_size,
+            "open_connections": self.open_connections,
+            "checked_out": self.checked_out,
+            "peak_checked_out": self.peak_checked_out,
+            "saturation": self.checked_out / self.max_pool_size if self.max_pool_size else 0.0,
+            "checkouts": self.checkouts,
+            "checkout_failures": self.checkout_failures,
+            "checkout_timeouts": self.checkout_timeouts,
+            "avg_wait_ms": self.total_wait_seconds / self.checkouts * 1000 if self.checkouts else 0.0,
+            "max_wait_ms": self.max_wait_seconds * 1000,
+            "pool_clears": self.pool_clears
+        }
+
+
+pool_stats = PoolStatsListener(settings.MONGODB_MAX_POOL_SIZE)
+register_metrics("mongodb_pool", pool_stats.stats)
+
+
+def get_client() -> AsyncIOMotorClient:
+    """Get the process-wide MongoDB client, creating it on first use"""
+    global _client
+    if _client is None:
+        _client = AsyncIOMotorClient(
+            settings.MONGODB_URL,
+            maxPoolSize=settings.MONGODB_MAX_POOL_SIZE,
+            minPoolSize=settings.MONGODB_MIN_POOL_SIZE,
+            maxIdleTimeMS=settings.MONGODB_MAX_IDLE_TIME_MS,
+            waitQueueTimeoutMS=settings.MONGODB_WAIT_QUEUE_TIMEOUT_MS,
+            connectTimeoutMS=settings.MONGODB_CONNECT_TIMEOUT_MS,
+            socketTimeoutMS=settings.MONGODB_SOCKET_TIMEOUT_MS,
+            serverSelectionTimeoutMS=settings.MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+            event_listeners=[pool_stats]
+        )
+        logger.info(f"Created MongoDB client (maxPoolSize={settings.MONGODB_MAX_POOL_SIZE})")
+    return _client
+
+
+def get_database() -> AsyncIOMotorDatabase:
+    """Get the application database on the shared client"""
+    return get_client()[settings.MONGODB_DB_NAME]
+
+
+def close_client():
+    """Close the shared client and its pool"""
+    global _client
+    if _client is not None:
+        _client.close()
+        _client = None
@@ -0,0 +1,117 @@
+"""
+Game Cache - Read-through cache of game documents
+
+Sits in front of the games collection so repeated reads of the same game
+(move, delivery, WebSocket state requests, GET /api/games/{id}) do not
+each cost a MongoDB round trip:
+- Write-through: every repository write stores the new state
+- Version check: a state older than the cached one never replaces it
+- TTL and LRU eviction for active games; finished games never expire
+- Hit/miss counters per calling operation
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from core.metrics import register_metrics
+from core.settings import settings
+from enums.game_enums import GameStatus
+from models.game_models import GameState
+
+
+class _GameEntry:
+    """A cached game together with its expiry time (None never expires)"""
+
+    __slots__ = ("game", "expires_at")
+
+    def __init__(self, game: GameState, expires_at: Optional[float]):
+        self.game = game
+        self.expires_at = expires_at
+
+
+class GameCache:
+    """Bounded LRU cache of games keyed by game ID"""
+
+    def __init__(self, max_games: int = 10000, ttl_seconds: float = 30):
+        self.max_games = max_games
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, _GameEntry]" = OrderedDict()
+        self._operations: Dict[str, Dict[str, int]] = {}
+        self.evictions = 0
+        self.expirations = 0
+        self.stale_puts = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_games > 0
+
+    def get(self, game_id: str, operation: str = "get_game") -> Optional[GameState]:
+        """
+        Get a private copy of a cached game, or None on a miss
+
+        Callers mutate the games they read before writing them back, so
+        the cached instance itself is never handed out.
+        """
+        counters = self._operations.setdefault(operation, {"hits": 0, "misses": 0})
+        entry = self._entries.get(game_id)
+        if entry is not None and entry.expires_at is not None and entry.expires_at <= time.monotonic():
+            del self._entries[game_id]
+            self.expirations += 1
+            entry = None
+        if entry is None:
+            counters["misses"] += 1
+            return None
+
+        counters["hits"] += 1
+        self._entries.move_to_end(game_id)
+        return entry.game.model_copy(deep=True)
+
+    def put(self, game: GameState):
+        """Store a copy of a game unless a newer version is already cached"""
+        if not self.enabled:
+            return
+        entry = self._entries.get(game.id)
+        if entry is not None and entry.game.version > game.version:
+            self.stale_puts += 1
+            return
+
+        finished = game.status == GameStatus.FINISHED or game.status == GameStatus.FINISHED.value
+        expires_at = None if finished else time.monotonic() + self.ttl_seconds
+        self._entries[game.id] = _GameEntry(game.model_copy(deep=True), expires_at)
+        self._entries.move_to_end(game.id)
+        while len(self._entries) > self.max_games:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, game_id: str):
+        """Drop a cached game (failed or conflicting write)"""
+        self._entries.pop(game_id, None)
+
+    def clear(self):
+        """Drop every cached game"""
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get occupancy and hit rates per operation"""
+        operations = {}
+        for name, counters in self._operations.items():
+            lookups = counters["hits"] + counters["misses"]
+            operations[name] = dict(counters, hit_rate=counters["hits"] / lookups if lookups else 0.0)
+        return {
+            "size": len(self._entries),
+            "max_games": self.max_games,
+            "ttl_seconds": self.ttl_seconds,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "stale_puts": self.stale_puts,
+            "operations": operations
+        }
+
+
+# Global game cache instance
+game_cache = GameCache(
+    max_games=settings.GAME_CACHE_MAX_GAMES,
+    ttl_seconds=settings.GAME_CACHE_TTL_SECONDS
+)
+register_metrics("game_cache", game_cache.stats)
@@ -0,0 +1,146 @@
+"""
+Database Indexes - Declarative index registry and query plan checks
+
+Every index the application relies on is declared here, next to the hot
+queries it is meant to serve:
+- ensure_indexes() builds the registry; at startup it runs as a background
+  task so the server does not wait for large builds
+- check_query_plans() explains each hot query and reports the ones that
+  would scan a whole collection (COLLSCAN)
+- With INDEX_SELF_TEST enabled, startup waits for the builds and refuses
+  to start if any hot query is not index-backed
+
+Usage (from the backend directory):
+    python -m database.indexes          # build indexes and check plans
+"""
+
+import asyncio
+import logging
+import sys
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+logger = logging.getLogger(__name__)
+
+
+class IndexSpec(NamedTuple):
+    """One index on one collection"""
+    collection: str
+    keys: List[tuple]
+    name: str
+    unique: bool = False
+
+
+class QueryCheck(NamedTuple):
+    """A hot query whose plan must be index-backed"""
+    name: str
+    collection: str
+    filter: Dict[str, Any]
+    sort: Optional[List[tuple]] = None
+    limit: int = 1
+
+
+INDEXES: List[IndexSpec] = [
+    IndexSpec("games", [("status", ASCENDING)], "status"),
+    # User game listing: one index per $or branch, keyset sort on (updated_at, _id)
+    IndexSpec("games", [("player_white", ASCENDING), ("updated_at", DESCENDING), ("_id", DESCENDING)],
+              "player_white_updated_at"),
+    IndexSpec("games", [("player_black", ASCENDING), ("updated_at", DESCENDING), ("_id", DESCENDING)],
+              "player_black_updated_at"),
+    # Archiver batches: finished games, oldest first
+    IndexSpec("games", [("status", ASCENDING), ("updated_at", ASCENDING), ("_id", ASCENDING)],
+              "status_updated_at"),
+    # Archived games are listed through the same keyset as hot ones
+    IndexSpec("games_archive", [("player_white", ASCENDING), ("updated_at", DESCENDING), ("_id", DESCENDING)],
+              "player_white_updated_at"),
+    IndexSpec("games_archive", [("player_black", ASCENDING), ("updated_at", DESCENDING), ("_id", DESCENDING)],
+              "player_black_updated_at"),
+    # Looked up on every login and registration
+    IndexSpec("users", [("username", ASCENDING)], "username", unique=True),
+]
+
+HOT_QUERIES: List[QueryCheck] = [
+    QueryCheck("get_game", "games", {"_id": "example"}),
+    QueryCheck("versioned_update", "games", {"_id": "example", "version": 3}),
+    QueryCheck(
+        "user_game_summaries", "games",
+        {"$or": [{"player_white": "example"}, {"player_black": "example"}]},
+        sort=[("updated_at", DESCENDING), ("_id", DESCENDING)], limit=50
+    ),
+    QueryCheck(
+        "archived_user_game_summaries", "games_archive",
+        {"$or": [{"player_white": "example"}, {"player_black": "example"}]},
+        sort=[("updated_at", DESCENDING), ("_id", DESCENDING)], limit=50
+    ),
+    QueryCheck("get_user", "users", {"username": "example"}),
+]
+
+
+async def ensure_indexes(db, indexes: List[IndexSpec] = INDEXES):
+    """Create every registered index that does not exist yet"""
+    by_collection: Dict[str, List[IndexModel]] = {}
+    for spec in indexes:
+        by_collection.setdefault(spec.collection, []).append(
+            IndexModel(spec.keys, name=spec.name, unique=spec.unique, background=True)
+        )
+    for collection, models in by_collection.items():
+        try:
+            await db[collection].create_indexes(models)
+            logger.info(f"Indexes ready on {collection}: {', '.join(m.document['name'] for m in models)}")
+        except Exception as e:
+            # A failed build (e.g. duplicate usernames for a unique index) must not stop the server
+            logger.error(f"Failed to build indexes on {collection}: {e}")
+
+
+def _plan_stages(plan: Any) -> List[str]:
+    """All stage names in an explain plan tree"""
+    stages = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        for value in plan.values():
+            stages.extend(_plan_stages(value))
+    elif isinstance(plan, list):
+        for item in plan:
+            stages.extend(_plan_stages(item))
+    return stages
+
+
+async def check_query_plans(db, queries: List[QueryCheck] = HOT_QUERIES) -> Dict[str, List[str]]:
+    """Explain each hot query and return the stages of its winning plan by name"""
+    plans = {}
+    for query in queries:
+        find = {"find": query.collection, "filter": query.filter, "limit": query.limit}
+        if query.sort:
+            find["sort"] = dict(query.sort)
+        explain = await db.command({"explain": find, "verbosity": "queryPlanner"})
+        plans[query.name] = _plan_stages(explain["queryPlanner"]["winningPlan"])
+    return plans
+
+
+async def verify_indexes(db) -> List[str]:
+    """Build the registry, then return the hot queries that still scan a collection"""
+    await ensure_indexes(db)
+    plans = await check_query_plans(db)
+    failures = [name for name, stages in plans.items() if "COLLSCAN" in stages]
+    for name, stages in plans.items():
+        level = logging.ERROR if name in failures else logging.INFO
+        logger.log(level, f"Query plan {name}: {' <- '.join(stages)}")
+    return failures
+
+
+async def _main():
+    from database.connection import close_client, get_database
+
+    logging.basicConfig(level=logging.INFO)
+    failures = await verify_indexes(get_database())
+    close_client()
+    if failures:
+        print(f"COLLSCAN in hot queries: {', '.join(failures)}")
+        sys.exit(1)
+    print("All hot queries are index-backed")
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
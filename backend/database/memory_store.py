@@ -0,0 +1,211 @@
+"""
+Memory Store - Indexed in-process storage backend
+
+Used by GameRepository when STORAGE_BACKEND is "memory" or MongoDB is
+unreachable. Keeps the same semantics as the MongoDB paths without O(n)
+scans:
+- Games by ID, with secondary indexes by player and by status
+- Users by username (other user queries fall back to a scan)
+- Archived games (see database/archive.py) by ID and by player
+- Private copies in and out, and the same version check as MongoDB
+- Optional snapshot to a JSON lines file, loaded on start and rewritten
+  atomically on shutdown and every MEMORY_SNAPSHOT_INTERVAL_SECONDS
+"""
+
+import asyncio
+import logging
+import os
+from datetime import timezone
+from typing import Any, Dict, List, Optional, Set
+
+from bson import json_util
+
+from models.game_models import GameState
+
+logger = logging.getLogger(__name__)
+
+# Restore datetimes as aware UTC, like the ones the application creates
+_JSON_OPTIONS = json_util.JSONOptions(tz_aware=True, tzinfo=timezone.utc)
+
+
+def _status_value(game: GameState) -> str:
+    return game.status.value if hasattr(game.status, 'value') else game.status
+
+
+class MemoryStore:
+    """Games and users in process memory with secondary indexes"""
+
+    def __init__(self, snapshot_path: Optional[str] = None):
+        self.snapshot_path = snapshot_path
+        self._games: Dict[str, GameState] = {}
+        self._users: Dict[str, dict] = {}
+        self._by_player: Dict[str, Set[str]] = {}
+        self._by_status: Dict[str, Set[str]] = {}
+        self._archive: Dict[str, dict] = {}
+        self._archive_by_player: Dict[str, Set[str]] = {}
+        self.archive_checkpoint: Optional[dict] = None
+        self._snapshot_task: Optional[asyncio.Task] = None
+        self.snapshots = 0
+
+    # Games
+
+    def get_game(self, game_id: str) -> Optional[GameState]:
+        """Get a private copy of a game"""
+        game = self._games.get(game_id)
+        return game.model_copy(deep=True) if game else None
+
+    def game_version(self, game_id: str) -> Optional[int]:
+        """Get the stored version of a game, or None if it does not exist"""
+        game = self._games.get(game_id)
+        return game.version if game else None
+
+    def put_game(self, game: GameState):
+        """Store a private copy of a game and update the secondary indexes"""
+        previous = self._games.get(game.id)
+        if previous is not None:
+            self._unindex(previous)
+        stored = game.model_copy(deep=True)
+        self._games[game.id] = stored
+        for player in (stored.player_white, stored.player_black):
+            if player:
+                self._by_player.setdefault(player, set()).add(stored.id)
+        self._by_status.setdefault(_status_value(stored), set()).add(stored.id)
+
+    def delete_game(self, game_id: str):
+        """Remove a game and its index entries"""
+        game = self._games.pop(game_id, None)
+        if game is not None:
+            self._unindex(game)
+
+    def _unindex(self, game: GameState):
+        for player in (game.player_white, game.player_black):
+            if player:
+                self._by_player.get(player, set()).discard(game.id)
+        self._by_status.get(_status_value(game), set()).discard(game.id)
+
+    def games_for_player(self, username: str) -> List[GameState]:
+        """Stored games (not copies) in which the user plays either side"""
+        return [self._games[game_id] for game_id in self._by_player.get(username, ())]
+
+    def games_with_status(self, status: str) -> List[GameState]:
+        """Stored games (not copies) with the given status"""
+        return [self._games[game_id] for game_id in self._by_status.get(status, ())]
+
+    # Archive
+
+    def archive_game(self, document: dict):
+        """Store an archive document (see database.archive.archive_document)"""
+        self._archive[document["_id"]] = document
+        for player in (document["player_white"], document["player_black"]):
+            if player:
+                self._archive_by_player.setdefault(player, set()).add(document["_id"])
+
+    def get_archived(self, game_id: str) -> Optional[dict]:
+        """Get an archive document by game ID"""
+        return self._archive.get(game_id)
+
+    def archived_for_player(self, username: str) -> List[dict]:
+        """Archive documents of the games in which the user played either side"""
+        return [self._archive[game_id] for game_id in self._archive_by_player.get(username, ())]
+
+    # Users
+
+    def find_user(self, query: dict) -> Optional[dict]:
+        """Find a user document; queries by username use the primary key"""
+        if "username" in query:
+            user = self._users.get(query["username"])
+            candidates = [user] if user is not None else []
+        else:
+            candidates = self._users.values()
+        for user_data in candidates:
+            if all(user_data.get(key) == value for key, value in query.items()):
+                return user_data
+        return None
+
+    def insert_user(self, document: dict):
+        """Store a user document keyed by username"""
+        self._users[document.get("username")] = document
+
+    def update_user(self, query: dict, fields: dict) -> int:
+        """Apply a $set to the first matching user; returns the number of users changed"""
+        user_data = self.find_user(query)
+        if user_data is None:
+            return 0
+        user_data.update(fields)
+        return 1
+
+    # Snapshots
+
+    def load_snapshot(self):
+        """Load games and users from the snapshot file, if there is one"""
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return
+        from database.repository import game_from_document
+
+        with open(self.snapshot_path) as f:
+            for line in f:
+                record = json_util.loads(line, json_options=_JSON_OPTIONS)
+                if record["kind"] == "game":
+                    self.put_game(game_from_document(record["document"]))
+                elif record["kind"] == "archive":
+                    self.archive_game(record["document"])
+                elif record["kind"] == "archive_state":
+                    self.archive_checkpoint = record["document"]
+                else:
+                    self.insert_user(record["document"])
+        logger.info(f"Loaded {len(self._games)} games, {len(self._archive)} archived games "
+                    f"and {len(self._users)} users from {self.snapshot_path}")
+
+    def save_snapshot(self):
+        """Write every game and user to the snapshot file atomically"""
+        if not self.snapshot_path:
+            return
+        from database.repository import game_to_document
+
+        tmp_path = f"{self.snapshot_path}.tmp"
+        with open(tmp_path, "w") as f:
+            for game in self._games.values():
+                f.write(json_util.dumps({"kind": "game", "document": game_to_document(game)}) + "\n")
+            for document in self._archive.values():
+                f.write(json_util.dumps({"kind": "archive", "document": document}) + "\n")
+            if self.archive_checkpoint:
+                f.write(json_util.dumps({"kind": "archive_state", "document": self.archive_checkpoint}) + "\n")
+            for user_data in self._users.values():
+                f.write(json_util.dumps({"kind": "user", "document": user_data}) + "\n")
+        os.replace(tmp_path, self.snapshot_path)
+        self.snapshots += 1
+
+    def start_snapshots(self, interval: float):
+        """Rewrite the snapshot periodically on the running loop"""
+        if self.snapshot_path and interval > 0 and self._snapshot_task is None:
+            self._snapshot_task = asyncio.create_task(self._snapshot_loop(interval))
+
+    async def _snapshot_loop(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self.save_snapshot()
+            except Exception as e:
+                logger.error(f"Failed to write snapshot {self.snapshot_path}: {e}")
+
+    def close(self):
+        """Stop periodic snapshots and write a final one"""
+        if self._snapshot_task is not None:
+            self._snapshot_task.cancel()
+            self._snapshot_task = None
+        try:
+            self.save_snapshot()
+        except Exception as e:
+            logger.error(f"Failed to write snapshot {self.snapshot_path}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Get stored counts per index"""
+        return {
+            "games": len(self._games),
+            "archived_games": len(self._archive),
+            "users": len(self._users),
+            "players": len(self._by_player),
+            "games_by_status": {status: len(ids) for status, ids in self._by_status.items()},
+            "snapshot_path": self.snapshot_path,
+            "snapshots": self.snapshots
+        }
@@ -0,0 +1,49 @@
+"""
+Database Migrations - One-off document format upgrades
+
+Usage (from the backend directory):
+    python -m database.migrations
+"""
+
+import asyncio
+import logging
+
+from database.connection import get_database
+from database.repository import game_from_document, game_to_document
+
+logger = logging.getLogger(__name__)
+
+
+async def migrate_compact_moves(db, batch_size: int = 500) -> dict:
+    """
+    Rewrite games stored as one FEN per ply into the compact move list format
+    
+    Idempotent and resumable: only documents that still have a 'fens' array
+    are touched, and each one is replaced only if it was not migrated or
+    modified in the meantime.
+    """
+    migrated = failed = 0
+    cursor = db.games.find({"fens": {"$exists": True}}).batch_size(batch_size)
+    async for game_dict in cursor:
+        try:
+            document = game_to_document(game_from_document(game_dict))
+            await db.games.replace_one(
+                {"_id": game_dict["_id"], "fens": {"$exists": True}, "updated_at": game_dict["updated_at"]},
+                document
+            )
+            migrated += 1
+        except Exception as e:
+            logger.error(f"Failed to migrate game {game_dict['_id']}: {e}")
+            failed += 1
+    
+    logger.info(f"Compact move migration done: {migrated} migrated, {failed} failed")
+    return {"migrated": migrated, "failed": failed}
+
+
+async def _main():
+    return await migrate_compact_moves(get_database())
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    print(asyncio.run(_main()))
@@ -1,190 +1,612 @@
-from typing import List, Optional
-from pymongo import MongoClient
-from models.game_models import GameState
+import asyncio
+import base64
+from datetime import datetime
+from typing import List, Optional, Tuple
+from pymongo.errors import DuplicateKeyError
+from models.game_models import GameState, GameSummary
+from database.archive import ARCHIVE_SUMMARY_PROJECTION, ARCHIVED_STATUSES, game_archiver, game_from_archive
+from database.connection import close_client, get_client
+from database.game_cache import GameCache, game_cache
+from database.indexes import ensure_indexes, verify_indexes
+from database.memory_store import MemoryStore
+from core.metrics import register_metrics
+from database.write_buffer import write_buffer
 from core.settings import settings
 import logging
 
 logger = logging.getLogger(__name__)
 
-# Global database connection
-_client = None
-_db = None
+
+class StaleGameStateError(ValueError):
+    """Raised when a game was written by someone else since it was read"""
+    
+    def __init__(self, game_id: str):
+        super().__init__("Game was modified concurrently, please retry")
+        self.game_id = game_id
+
+
+class DuplicateGameIdError(ValueError):
+    """Raised when a new game is inserted under an ID that is already taken"""
+    
+    def __init__(self, game_id: str):
+        super().__init__(f"Game ID {game_id} is already taken")
+        self.game_id = game_id
+
+
+# Global repository instance, shared by the auth and game paths
 _repository_instance = None
+_index_task: Optional[asyncio.Task] = None
 
 
 def get_repository() -> 'GameRepository':
     """Get singleton repository instance"""
     global _repository_instance
     if _repository_instance is None:
-        _repository_instance = GameRepository()
+        _repository_instance = GameRepository(
+            in_memory=settings.STORAGE_BACKEND == "memory",
+            snapshot_path=settings.MEMORY_SNAPSHOT_PATH or None
+        )
     return _repository_instance
 
 
 async def init_db():
-    """Initialize database connection"""
-    global _client, _db
+    """
+    Initialize database connection and indexes
+    
+    Indexes from database/indexes.py are built in the background. With
+    INDEX_SELF_TEST the builds are awaited instead, and startup fails if a
+    hot query would still scan a whole collection.
+    """
+    global _index_task
     try:
-        _client = MongoClient(settings.MONGODB_URL)
-        _db = _client[settings.MONGODB_DB_NAME]
+        repository = get_repository()
+        await repository.connect()
+        if repository.connected:
+            if settings.INDEX_SELF_TEST:
+                failures = await verify_indexes(repository.db)
+                if failures:
+                    raise RuntimeError(f"Hot queries are not index-backed (COLLSCAN): {', '.join(failures)}")
+            else:
+                _index_task = asyncio.create_task(ensure_indexes(repository.db))
+        else:
+            repository.memory.start_snapshots(settings.MEMORY_SNAPSHOT_INTERVAL_SECONDS)
+        if settings.ARCHIVE_AFTER_DAYS > 0:
+            game_archiver.start()
         logger.info("Database initialized successfully")
     except Exception as e:
         logger.error(f"Failed to initialize database: {e}")
         raise
 
+
+async def close_db():
+    """Close the shared database connection pool"""
+    global _index_task
+    if _index_task is not None and not _index_task.done():
+        _index_task.cancel()
+    _index_task = None
+    await game_archiver.stop()
+    if _repository_instance is not None and not _repository_instance.connected:
+        _repository_instance.memory.close()
+    close_client()
+
+def game_to_document(game: GameState) -> dict:
+    """Convert a GameState to its MongoDB document (compact move list format)"""
+    return {
+        "_id": game.id,
+        "player_white": game.player_white,
+        "player_black": game.player_black,
+        "start_fen": game.start_fen,
+        "moves": game.moves,
+        "checkpoint_interval": game.checkpoint_interval,
+        "checkpoints": game.checkpoints,
+        "current_fen": game.current_fen,
+        "position_counts": game.position_counts,
+        "move_seqs": game.move_seqs,
+        "time_control": game.time_control,
+        "status": game.status.value if hasattr(game.status, 'value') else game.status,
+        "result": game.result,
+        "version": game.version,
+        "created_at": game.created_at,
+        "updated_at": game.updated_at
+    }
+
+
+def game_from_document(game_dict: dict) -> GameState:
+    """
+    Convert a MongoDB document to GameState
+    
+    Legacy documents that still carry a 'fens' array are converted to the
+    compact format on load (see GameState._migrate_fen_history) and marked
+    so their next write is a full replace rather than a delta.
+    """
+    data = dict(game_dict)
+    data["id"] = data.pop("_id")
+    game = GameState(**data)
+    game._persisted = True
+    if "fens" in game_dict and "moves" not in game_dict:
+        game._needs_full_write = True
+    return game
+
+
+# Fields loaded for game listings; legacy documents only have their last FEN sliced out
+SUMMARY_PROJECTION = {
+    "player_white": 1,
+    "player_black": 1,
+    "current_fen": 1,
+    "fens": {"$slice": -1},
+    "time_control": 1,
+    "status": 1,
+    "result": 1,
+    "created_at": 1,
+    "updated_at": 1
+}
+
+
+def summary_from_document(game_dict: dict) -> GameSummary:
+    """Convert a projected MongoDB document to GameSummary"""
+    data = dict(game_dict)
+    data["id"] = data.pop("_id")
+    fens = data.pop("fens", None)
+    if data.get("current_fen") is None and fens:
+        data["current_fen"] = fens[-1]
+    return GameSummary(**data)
+
+
+def encode_page_cursor(summary: GameSummary) -> str:
+    """Opaque keyset cursor pointing after the given game"""
+    raw = f"{summary.updated_at.isoformat()}|{summary.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_page_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Decode a cursor from encode_page_cursor into (updated_at, game_id)"""
+    try:
+        updated_at, game_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        return datetime.fromisoformat(updated_at), game_id
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def version_filter(game_id: str, version: int) -> dict:
+    """Match a game only while it is still at the given version"""
+    if version == 0:
+        # Documents written before versioning have no version field
+        return {"_id": game_id, "version": {"$in": [0, None]}}
+    return {"_id": game_id, "version": version}
+
+
+def move_update(game: GameState) -> dict:
+    """Build the delta update that appends the last move of a game"""
+    push = {"moves": game.moves[-1]}
+    if game.ply % game.checkpoint_interval == 0:
+        push["checkpoints"] = game.checkpoints[-1]
+    return {
+        "$push": push,
+        "$set": {
+            "current_fen": game.current_fen,
+            "position_counts": game.position_counts,
+            "move_seqs": game.move_seqs,
+            "status": game.status.value if hasattr(game.status, 'value') else game.status,
+            "result": game.result,
+            "version": game.version,
+            "updated_at": game.updated_at
+        }
+    }
+
+
+def status_update(game: GameState) -> dict:
+    """Build the delta update for a status change without a move (resignation, agreed draw)"""
+    return {
+        "$set": {
+            "status": game.status.value if hasattr(game.status, 'value') else game.status,
+            "result": game.result,
+            "version": game.version,
+            "updated_at": game.updated_at
+        }
+    }
+
+
 class GameRepository:
     """Lightweight repository for game data operations"""
     
-    def __init__(self):
+    def __init__(self, in_memory: bool = False, snapshot_path: Optional[str] = None,
+                 cache: Optional[GameCache] = None):
+        self._checked = False
+        self._snapshot_path = snapshot_path
+        # Per-worker cache of recently read games (separate ones simulate several workers in tests)
+        self.game_cache = cache if cache is not None else game_cache
+        if in_memory:
+            self._use_memory_storage()
+            self._checked = True
+            return
+        # Shared non-blocking client: nothing here touches the network,
+        # the connection is verified on first use (see connect)
+        self.client = get_client()
+        self.db = self.client[settings.MONGODB_DB_NAME]
+        self.games_collection = self.db.games
+        self.users_collection = self.db.users  # Add users collection
+        self.archive_collection = self.db.games_archive
+        self.archive_state_collection = self.db.archive_state
+        self.connected = True
+    
+    async def connect(self):
+        """Verify the MongoDB connection once, falling back to in-memory storage"""
+        if self._checked:
+            return
         try:
-            self.client = MongoClient(settings.MONGODB_URL)
-            self.db = self.client[settings.MONGODB_DB_NAME]
-            self.games_collection = self.db.games
-            self.users_collection = self.db.users  # Add users collection
-            
-            # Create indexes for efficient queries
-            self.games_collection.create_index("status")
-            self.games_collection.create_index("player_white")
-            self.games_collection.create_index("player_black")
-            self.connected = True
+            await self.client.admin.command("ping")
             logger.info("Repository connected to MongoDB")
         except Exception as e:
             logger.error(f"MongoDB connection failed: {e}")
-            print("Running in test mode with in-memory storage")
-            # Fallback to in-memory storage for testing
-            self.connected = False
-            self._games = {}
-            self._users = {}  # Add users storage
+            if self.connected:
+                print("Running in test mode with in-memory storage")
+                # Fallback to in-memory storage for testing
+                self._use_memory_storage()
+        self._checked = True
+    
+    def _use_memory_storage(self):
+        """Keep games and users in the indexed in-process store instead of MongoDB"""
+        self.connected = False
+        self.memory = MemoryStore(self._snapshot_path)
+        self.memory.load_snapshot()
+        register_metrics("memory_store", self.memory.stats)
+    
+    def _store_in_memory(self, game: GameState, expected_version: int):
+        """Keep a private copy of a game, applying the same version check as MongoDB"""
+        if game._persisted and self.memory.game_version(game.id) != expected_version:
+            raise StaleGameStateError(game.id)
+        game._persisted = True
+        self.memory.put_game(game)
+    
+    async def insert_game(self, game: GameState) -> GameState:
+        """
+        Insert a new game without reading first
+        
+        Relies on the unique _id of the games collection; raises
+        DuplicateGameIdError if the ID is already taken.
+        """
+        await self.connect()
+        if not self.connected:
+            # Use in-memory storage
+            if self.memory.game_version(game.id) is not None:
+                raise DuplicateGameIdError(game.id)
+            game.version += 1
+            self._store_in_memory(game, game.version - 1)
+            return game
+        
+        document = game_to_document(game)
+        document["version"] = game.version + 1
+        try:
+            await self.games_collection.insert_one(document)
+        except DuplicateKeyError:
+            raise DuplicateGameIdError(game.id)
+        except Exception as e:
+            logger.error(f"Failed to insert game {game.id}: {e}")
+            raise
+        game.version += 1
+        game._persisted = True
+        self.game_cache.put(game)
+        return game
     
     async def save_game(self, game: GameState) -> GameState:
-        """Save or update a game in the database"""
+        """
+        Save a game as a full document
+        
+        New games are upserted; games read from storage are replaced only if
+        nobody has written them since (raises StaleGameStateError otherwise).
+        """
+        await self.connect()
+        expected_version = game.version
+        game.version += 1
         if not self.connected:
-            # Use in-memory storage for testing
-            self._games[game.id] = game
+            # Use in-memory storage
+            self._store_in_memory(game, expected_version)
             return game
+        
+        # Full writes are not buffered; let earlier buffered updates land first
+        while write_buffer.latest(game.id) is not None:
+            if not await write_buffer.flush():
+                break
             
         try:
-            game_dict = {
-                "_id": game.id,
-                "player_white": game.player_white,
-                "player_black": game.player_black,
-                "fens": game.fens,
-                "time_control": game.time_control,
-                "status": game.status.value if hasattr(game.status, 'value') else game.status,
-                "result": game.result,
-                "created_at": game.created_at,
-                "updated_at": game.updated_at
-            }
+            game_dict = game_to_document(game)
             
-            # Upsert (insert or update)
-            self.games_collection.replace_one(
-                {"_id": game.id}, 
-                game_dict, 
-                upsert=True
-            )
+            if game._persisted:
+                result = await self.games_collection.replace_one(
+                    version_filter(game.id, expected_version),
+                    game_dict
+                )
+                if result.matched_count == 0:
+                    raise StaleGameStateError(game.id)
+            else:
+                # Upsert (insert or update)
+                await self.games_collection.replace_one(
+                    {"_id": game.id}, 
+                    game_dict, 
+                    upsert=True
+                )
             
+            game._persisted = True
+            game._needs_full_write = False
+            self.game_cache.put(game)
             logger.info(f"Game {game.id} saved successfully")
             return game
             
+        except StaleGameStateError:
+            self.game_cache.invalidate(game.id)
+            logger.info(f"Game {game.id} changed since version {expected_version}, not saved")
+            raise
         except Exception as e:
+            self.game_cache.invalidate(game.id)
             logger.error(f"Failed to save game {game.id}: {e}")
             raise
     
-    async def get_game(self, game_id: str) -> Optional[GameState]:
-        """Get a game by ID"""
+    async def _update_game(self, game: GameState, build_update, since_ply: int) -> GameState:
+        """Apply a delta update to a game if it is still at the version it was read at"""
+        await self.connect()
+        if game._needs_full_write and self.connected:
+            # Legacy FEN-per-ply document: rewrite it in the compact format once
+            return await self.save_game(game)
+        
+        expected_version = game.version
+        game.version += 1
         if not self.connected:
-            # Use in-memory storage for testing
-            return self._games.get(game_id)
-            
+            # Use in-memory storage
+            self._store_in_memory(game, expected_version)
+            return game
+        
+        if write_buffer.accepts(game):
+            # Write-behind: conflicts with buffered updates are still caught here
+            pending = write_buffer.latest(game.id)
+            if pending is not None and pending.version != expected_version:
+                self.game_cache.invalidate(game.id)
+                raise StaleGameStateError(game.id)
+            write_buffer.enqueue(game, expected_version, since_ply)
+            self.game_cache.put(game)
+            return game
+        
         try:
-            game_dict = self.games_collection.find_one({"_id": game_id})
-            if not game_dict:
-                return None
-            
-            # Convert MongoDB document to GameState
-            return GameState(
-                id=game_dict["_id"],
-                player_white=game_dict["player_white"],
-                player_black=game_dict.get("player_black"),
-                fens=game_dict["fens"],
-                time_control=game_dict["time_control"],
-                status=game_dict["status"],
-                result=game_dict.get("result"),
-                created_at=game_dict["created_at"],
-                updated_at=game_dict["updated_at"]
+            result = await self.games_collection.update_one(
+                version_filter(game.id, expected_version),
+                build_update(game)
             )
+            if result.matched_count == 0:
+                raise StaleGameStateError(game.id)
+            self.game_cache.put(game)
+            return game
+            
+        except StaleGameStateError:
+            self.game_cache.invalidate(game.id)
+            logger.info(f"Game {game.id} changed since version {expected_version}, not updated")
+            raise
+        except Exception as e:
+            self.game_cache.invalidate(game.id)
+            logger.error(f"Failed to update game {game.id}: {e}")
+            raise
+    
+    async def append_move(self, game: GameState) -> GameState:
+        """Persist the last move of a game with an atomic conditional $push/$set delta"""
+        return await self._update_game(game, move_update, since_ply=game.ply - 1)
+    
+    async def update_status(self, game: GameState) -> GameState:
+        """Persist a status/result change of a game without rewriting its moves"""
+        return await self._update_game(game, status_update, since_ply=game.ply)
+    
+    async def get_game(self, game_id: str, operation: str = "get_game", fresh: bool = False) -> Optional[GameState]:
+        """
+        Get a game by ID, served from the game cache when possible
+        
+        Args:
+            game_id: Game to load
+            operation: Caller label for the cache hit-rate metrics
+            fresh: Skip the cache (it may be behind writes made by other workers); the result is cached
+        """
+        await self.connect()
+        if not self.connected:
+            # Use in-memory storage
+            game = self.memory.get_game(game_id)
+            if game is None:
+                archived = self.memory.get_archived(game_id)
+                return game_from_archive(archived) if archived else None
+            return game
+        
+        pending = write_buffer.latest(game_id)
+        if pending is not None:
+            return pending.model_copy(deep=True)
+        
+        game = None if fresh else self.game_cache.get(game_id, operation)
+        if game is not None:
+            return game
+            
+        try:
+            game_dict = await self.games_collection.find_one({"_id": game_id})
+            if game_dict:
+                # Convert MongoDB document to GameState
+                game = game_from_document(game_dict)
+            else:
+                archived = await self.archive_collection.find_one({"_id": game_id})
+                if not archived:
+                    return None
+                game = game_from_archive(archived)
+            # Migrated legacy games are cached too (copies keep the full-write mark)
+            self.game_cache.put(game)
+            return game
             
         except Exception as e:
             logger.error(f"Failed to get game {game_id}: {e}")
             return None
     
-    async def get_user_games(self, username: str) -> List[GameState]:
-        """Get all games for a user"""
+    async def get_user_game_summaries(self, username: str, limit: int = 50,
+                                      after: Optional[Tuple[datetime, str]] = None) -> List[GameSummary]:
+        """
+        Get one page of a user's games, most recently updated first
+        
+        Hot and archived games are paged with the same keyset and merged, so
+        a page can span both tiers.
+        
+        Args:
+            username: Player whose games to list
+            limit: Page size
+            after: (updated_at, game_id) of the last game on the previous page
+        """
+        await self.connect()
         if not self.connected:
-            # Use in-memory storage for testing
-            games = []
-            for game in self._games.values():
-                if game.player_white == username or game.player_black == username:
-                    games.append(game)
-            return sorted(games, key=lambda g: g.updated_at, reverse=True)
+            # Use in-memory storage
+            summaries = [GameSummary(**game.model_dump(include=set(GameSummary.model_fields)))
+                         for game in self.memory.games_for_player(username)]
+            summaries += [summary_from_document(game_dict)
+                          for game_dict in self.memory.archived_for_player(username)]
+            summaries.sort(key=lambda g: (g.updated_at, g.id), reverse=True)
+            if after is not None:
+                summaries = [game for game in summaries if (game.updated_at, game.id) < after]
+            return summaries[:limit]
             
         try:
-            games = []
-            cursor = self.games_collection.find({
-                "$or": [
-                    {"player_white": username},
-                    {"player_black": username}
-                ]
-            }).sort("updated_at", -1)  # Most recent first
-            
-            for game_dict in cursor:
-                games.append(GameState(
-                    id=game_dict["_id"],
-                    player_white=game_dict["player_white"],
-                    player_black=game_dict.get("player_black"),
-                    fens=game_dict["fens"],
-                    time_control=game_dict["time_control"],
-                    status=game_dict["status"],
-                    result=game_dict.get("result"),
-                    created_at=game_dict["created_at"],
-                    updated_at=game_dict["updated_at"]
-                ))
+            # Each branch walks its (player, updated_at, _id) index; the results are merge-sorted
+            keyset = {}
+            if after is not None:
+                updated_at, game_id = after
+                keyset = {"$or": [
+                    {"updated_at": {"$lt": updated_at}},
+                    {"updated_at": updated_at, "_id": {"$lt": game_id}}
+                ]}
+            query = {"$or": [
+                {"player_white": username, **keyset},
+                {"player_black": username, **keyset}
+            ]}
+            order = [("updated_at", -1), ("_id", -1)]
+            hot = self.games_collection.find(query, SUMMARY_PROJECTION).sort(order).limit(limit)
+            summaries = [summary_from_document(game_dict) async for game_dict in hot]
+            archived = self.archive_collection.find(query, ARCHIVE_SUMMARY_PROJECTION).sort(order).limit(limit)
+            summaries += [summary_from_document(game_dict) async for game_dict in archived]
             
-            return games
+            # A game being archived can briefly be in both tiers
+            unique = {summary.id: summary for summary in summaries}
+            return sorted(unique.values(), key=lambda g: (g.updated_at, g.id), reverse=True)[:limit]
             
         except Exception as e:
             logger.error(f"Failed to get games for user {username}: {e}")
             return []
 
+    async def find_archive_candidates(self, cutoff: datetime, after: Optional[Tuple[datetime, str]],
+                                      limit: int) -> List[GameState]:
+        """
+        Get finished games last updated before the cutoff, oldest first
+        
+        Args:
+            cutoff: Only games updated before this are returned
+            after: (updated_at, game_id) of the last game already archived
+            limit: Batch size
+        """
+        await self.connect()
+        if not self.connected:
+            # Use in-memory storage
+            games = [game for status in ARCHIVED_STATUSES for game in self.memory.games_with_status(status)
+                     if game.updated_at < cutoff and (after is None or (game.updated_at, game.id) > after)]
+            games.sort(key=lambda g: (g.updated_at, g.id))
+            return [game.model_copy(deep=True) for game in games[:limit]]
+        
+        query = {"status": {"$in": ARCHIVED_STATUSES}, "updated_at": {"$lt": cutoff}}
+        if after is not None:
+            updated_at, game_id = after
+            query["$or"] = [
+                {"updated_at": {"$gt": updated_at}},
+                {"updated_at": updated_at, "_id": {"$gt": game_id}}
+            ]
+        cursor = self.games_collection.find(query).sort([("updated_at", 1), ("_id", 1)]).limit(limit)
+        return [game_from_document(game_dict) async for game_dict in cursor]
+    
+    async def archive_game(self, game: GameState, document: dict) -> bool:
+        """
+        Move a game to the archive collection
+        
+        The archive copy is written first and the hot document is removed
+        only if it is still at the version that was archived, so a crash or
+        a concurrent write never loses the game. Returns False (and removes
+        the archive copy again) if the game changed since it was read.
+        """
+        await self.connect()
+        if not self.connected:
+            # Use in-memory storage
+            if self.memory.game_version(game.id) != game.version:
+                return False
+            self.memory.archive_game(document)
+            self.memory.delete_game(game.id)
+            return True
+        
+        if write_buffer.latest(game.id) is not None:
+            return False
+        await self.archive_collection.replace_one({"_id": game.id}, document, upsert=True)
+        result = await self.games_collection.delete_one(version_filter(game.id, game.version))
+        if result.deleted_count == 0:
+            await self.archive_collection.delete_one({"_id": game.id})
+            return False
+        self.game_cache.invalidate(game.id)
+        return True
+    
+    async def get_archive_checkpoint(self) -> Optional[dict]:
+        """Get the (updated_at, game_id) position the archiver reached, if any"""
+        await self.connect()
+        if not self.connected:
+            return self.memory.archive_checkpoint
+        state = await self.archive_state_collection.find_one({"_id": "games"})
+        return {"updated_at": state["updated_at"], "game_id": state["game_id"]} if state else None
+    
+    async def save_archive_checkpoint(self, checkpoint: dict):
+        """Remember the position the archiver reached so a restart resumes there"""
+        await self.connect()
+        if not self.connected:
+            self.memory.archive_checkpoint = dict(checkpoint)
+            return
+        await self.archive_state_collection.replace_one({"_id": "games"}, checkpoint, upsert=True)
+
     # Generic database methods for authentication
     async def find_one(self, collection_name: str, query: dict):
         """Find one document in a collection"""
+        await self.connect()
         if not self.connected:
-            # Use in-memory storage for testing
+            # Use in-memory storage
             if collection_name == "users":
-                for user_data in self._users.values():
-                    if all(user_data.get(key) == value for key, value in query.items()):
-                        return user_data
+                return self.memory.find_user(query)
             return None
             
         try:
             collection = self.db[collection_name]
-            return collection.find_one(query)
+            return await collection.find_one(query)
         except Exception as e:
             logger.error(f"Failed to find document in {collection_name}: {e}")
             return None
     
     async def insert_one(self, collection_name: str, document: dict):
         """Insert one document into a collection"""
+        await self.connect()
         if not self.connected:
-            # Use in-memory storage for testing
+            # Use in-memory storage
             if collection_name == "users":
-                self._users[document.get("username")] = document
+                self.memory.insert_user(document)
             return document
             
         try:
             collection = self.db[collection_name]
-            collection.insert_one(document)
+            await collection.insert_one(document)
             return document
         except Exception as e:
             logger.error(f"Failed to insert document into {collection_name}: {e}")
             raise
+    
+    async def update_one(self, collection_name: str, query: dict, update: dict):
+        """Update one document in a collection ($set updates only in memory mode)"""
+        await self.connect()
+        if not self.connected:
+            # Use in-memory storage
+            if collection_name == "users":
+                return self.memory.update_user(query, update.get("$set", {}))
+            return 0
+            
+        try:
+            collection = self.db[collection_name]
+            result = await collection.update_one(query, update)
+            return result.modified_count
+        except Exception as e:
+            logger.error(f"Failed to update document in {collection_name}: {e}")
+            raise
@@ -0,0 +1,275 @@
+"""
+Write Buffer - Write-behind persistence of game updates
+
+Optional mode, enabled per time control, that acknowledges game updates
+once they are buffered in memory and persists them in batches:
+- Updates to the same game are coalesced into one $push/$set delta
+- A batch is flushed with a single bulk_write every few milliseconds, or
+  as soon as it reaches the size limit
+- Flushes run one at a time, so the updates of a game reach MongoDB in
+  the order they were made; a failed batch is retried before newer ones
+- Pending states are served to readers until they are flushed
+- Everything still buffered is flushed on shutdown
+
+Updates stay conditional on the version they were read at. A conflict
+found at flush time cannot be reported to the original caller any more;
+it is counted, logged, and the affected games are dropped from the game
+cache so the next read sees what MongoDB actually holds. Updates that a
+bulk write rejects (write errors) are not retried; they are counted as
+failed writes and dropped from the cache the same way.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from core.metrics import register_metrics
+from core.settings import settings
+from database.connection import get_database
+from database.game_cache import game_cache
+from enums.game_enums import TimeControl
+from models.game_models import GameState
+
+logger = logging.getLogger(__name__)
+
+
+def pending_update(game: GameState, since_ply: int) -> dict:
+    """Build the delta update that brings a stored game from since_ply to its current state"""
+    update = {
+        "$set": {
+            "current_fen": game.current_fen,
+            "position_counts": game.position_counts,
+            "move_seqs": game.move_seqs,
+            "status": game.status.value if hasattr(game.status, 'value') else game.status,
+            "result": game.result,
+            "version": game.version,
+            "updated_at": game.updated_at
+        }
+    }
+    push = {}
+    if game.ply > since_ply:
+        push["moves"] = {"$each": game.moves[since_ply:]}
+        new_checkpoints = game.checkpoints[since_ply // game.checkpoint_interval:]
+        if new_checkpoints:
+            push["checkpoints"] = {"$each": new_checkpoints}
+    if push:
+        update["$push"] = push
+    return update
+
+
+class _PendingWrite:
+    """Coalesced updates of one game: the stored version and ply they start from, and the latest state"""
+
+    __slots__ = ("expected_version", "since_ply", "game")
+
+    def __init__(self, expected_version: int, since_ply: int, game: GameState):
+        self.expected_version = expected_version
+        self.since_ply = since_ply
+        self.game = game
+
+    def to_request(self) -> UpdateOne:
+        """Conditional update for the whole pending delta"""
+        if self.expected_version == 0:
+            # Documents written before versioning have no version field
+            query = {"_id": self.game.id, "version": {"$in": [0, None]}}
+        else:
+            query = {"_id": self.game.id, "version": self.expected_version}
+        return UpdateOne(query, pending_update(self.game, self.since_ply))
+
+
+class WriteBuffer:
+    """Coalescing write-behind buffer flushed with bulk_write"""
+
+    def __init__(self, time_controls: List[str], flush_interval: float = 0.005, max_batch: int = 500,
+                 retry_delay: float = 0.1):
+        self.time_controls = {TimeControl(value.strip().lower()) for value in time_controls if value.strip()}
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.retry_delay = retry_delay
+        self.collection = None  # Defaults to the games collection on the shared client
+        self._pending: "OrderedDict[str, _PendingWrite]" = OrderedDict()
+        self._in_flight: Dict[str, _PendingWrite] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self.enqueued = 0
+        self.coalesced = 0
+        self.flushes = 0
+        self.flushed_ops = 0
+        self.flush_failures = 0
+        self.conflicts = 0
+        self.failed_writes = 0
+        self.total_flush_seconds = 0.0
+        self.max_flush_seconds = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.time_controls)
+
+    def accepts(self, game: GameState) -> bool:
+        """Check whether updates of this game are written behind"""
+        return game.time_control_enum in self.time_controls
+
+    def latest(self, game_id: str) -> Optional[GameState]:
+        """Get the newest state of a game that is not yet confirmed by MongoDB"""
+        pending = self._pending.get(game_id) or self._in_flight.get(game_id)
+        return pending.game if pending is not None else None
+
+    def enqueue(self, game: GameState, expected_version: int, since_ply: int):
+        """Buffer an update of a game made at expected_version, starting from since_ply"""
+        self.enqueued += 1
+        snapshot = game.model_copy(deep=True)
+        pending = self._pending.get(game.id)
+        if pending is not None:
+            # Extend the buffered delta; it still starts where the stored document is
+            pending.game = snapshot
+            self.coalesced += 1
+        else:
+            self._pending[game.id] = _PendingWrite(expected_version, since_ply, snapshot)
+
+        self._ensure_task()
+        self._wakeup.set()
+        if len(self._pending) >= self.max_batch:
+            self._full.set()
+
+    def _bind_loop(self):
+        """Create the flusher's synchronization primitives on the running loop"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._flush_lock = asyncio.Lock()
+            self._wakeup = asyncio.Event()
+            self._full = asyncio.Event()
+            self._task = None
+
+    def _ensure_task(self):
+        self._bind_loop()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            if len(self._pending) < self.max_batch:
+                try:
+                    await asyncio.wait_for(self._full.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            self._full.clear()
+            if not await self.flush():
+                await asyncio.sleep(self.retry_delay)
+                self._wakeup.set()
+            elif self._pending:
+                self._wakeup.set()
+
+    async def flush(self) -> bool:
+        """Write one batch of buffered updates; returns False if it must be retried"""
+        self._bind_loop()
+        async with self._flush_lock:
+            if not self._pending:
+                return True
+            batch = []
+            while self._pending and len(batch) < self.max_batch:
+                game_id, pending = self._pending.popitem(last=False)
+                self._in_flight[game_id] = pending
+                batch.append(pending)
+
+            collection = self.collection if self.collection is not None else get_database().games
+            start = time.perf_counter()
+            failed = set()
+            try:
+                result = await collection.bulk_write([pending.to_request() for pending in batch], ordered=False)
+                matched = result.matched_count
+            except BulkWriteError as e:
+                self.flush_failures += 1
+                failed = {error["index"] for error in e.details.get("writeErrors", [])}
+                for index in failed:
+                    logger.error(f"Write-behind update of game {batch[index].game.id} failed")
+                matched = e.details.get("nMatched", 0)
+            except Exception as e:
+                self.flush_failures += 1
+                logger.error(f"Write-behind flush of {len(batch)} games failed, will retry: {e}")
+                self._requeue(batch)
+                return False
+            finally:
+                elapsed = time.perf_counter() - start
+                self.total_flush_seconds += elapsed
+                self.max_flush_seconds = max(self.max_flush_seconds, elapsed)
+
+            self.flushes += 1
+            self.flushed_ops += len(batch)
+            for pending in batch:
+                self._in_flight.pop(pending.game.id, None)
+            if failed:
+                # Rejected by MongoDB (not retried): the cached state was never stored
+                self.failed_writes += len(failed)
+                for index in failed:
+                    game_cache.invalidate(batch[index].game.id)
+            conflicts = len(batch) - len(failed) - matched
+            if conflicts > 0:
+                # Someone else wrote these games; drop our view of them
+                self.conflicts += conflicts
+                logger.error(f"Write-behind flush lost {conflicts} of {len(batch)} updates to concurrent writes")
+                for pending in batch:
+                    game_cache.invalidate(pending.game.id)
+            return True
+
+    def _requeue(self, batch: List[_PendingWrite]):
+        """Put a failed batch back in front of newer updates of the same games"""
+        requeued: "OrderedDict[str, _PendingWrite]" = OrderedDict()
+        for pending in batch:
+            self._in_flight.pop(pending.game.id, None)
+            newer = self._pending.pop(pending.game.id, None)
+            if newer is not None:
+                pending.game = newer.game
+            requeued[pending.game.id] = pending
+        requeued.update(self._pending)
+        self._pending = requeued
+
+    async def stop(self):
+        """Stop the flusher and write out everything still buffered"""
+        if self._task is not None and self._loop is asyncio.get_running_loop():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        attempts = 0
+        while self._pending and attempts < 5:
+            if not await self.flush():
+                attempts += 1
+                await asyncio.sleep(self.retry_delay)
+        if self._pending:
+            logger.error(f"Write-behind buffer dropped {len(self._pending)} games on shutdown")
+
+    def stats(self) -> Dict[str, Any]:
+        """Get queue depth, coalescing and flush latency counters"""
+        return {
+            "time_controls": sorted(tc.value for tc in self.time_controls),
+            "queue_depth": len(self._pending),
+            "in_flight": len(self._in_flight),
+            "enqueued": self.enqueued,
+            "coalesced": self.coalesced,
+            "flushes": self.flushes,
+            "flushed_ops": self.flushed_ops,
+            "flush_failures": self.flush_failures,
+            "conflicts": self.conflicts,
+            "failed_writes": self.failed_writes,
+            "avg_flush_ms": self.total_flush_seconds / self.flushes * 1000 if self.flushes else 0.0,
+            "max_flush_ms": self.max_flush_seconds * 1000
+        }
+
+
+# Global write buffer instance
+write_buffer = WriteBuffer(
+    time_controls=settings.WRITE_BEHIND_TIME_CONTROLS.split(","),
+    flush_interval=settings.WRITE_BEHIND_FLUSH_MS / 1000,
+    max_batch=settings.WRITE_BEHIND_MAX_BATCH
+)
+register_metrics("write_buffer", write_buffer.stats)
@@ -4,11 +4,18 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from core.settings import settings
-from database.repository import init_db
+from core.metrics import metrics_snapshot
+from core.loop_monitor import loop_monitor
+from database.repository import init_db, close_db
+from database.write_buffer import write_buffer
 from message_queue.rabbitmq import rabbitmq_manager
 from routers.game import router as game_router
 from routers.websocket import router as websocket_router
 from routers.auth import router as auth_router
+from services.broadcast_bus import broadcast_bus
+from services.connection_manager import connection_manager
+from services.password_hasher import password_hasher
+from utils.chess_executor import chess_executor
 
 
 @asynccontextmanager
@@ -16,22 +23,36 @@ async def lifespan(app: FastAPI):
     """Manage application lifespan events."""
     # Startup
     print("Starting up...")
+    loop_monitor.start()
     await init_db()
     try:
         await rabbitmq_manager.connect()
         print("RabbitMQ connected")
     except Exception as e:
         print(f"Warning: Could not connect to RabbitMQ: {e}")
+    try:
+        await broadcast_bus.start(connection_manager.broadcast, connection_manager.present_users)
+    except Exception as e:
+        print(f"Warning: Broadcast bus unavailable, broadcasts stay on this worker: {e}")
     print("Startup complete!")
     
     yield
     
     # Shutdown
     print("Shutting down...")
+    try:
+        await broadcast_bus.stop()
+    except Exception:
+        pass
     try:
         await rabbitmq_manager.disconnect()
     except Exception:
         pass
+    chess_executor.shutdown()
+    password_hasher.shutdown()
+    await write_buffer.stop()
+    await close_db()
+    await loop_monitor.stop()
     print("Shutdown complete!")
 
 
@@ -49,6 +70,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],  # Pagination cursor of GET /api/games/user
 )
 
 # Include routers
@@ -63,6 +85,12 @@ async def root():
     return {"message": "Lightweight Chess Backend is running", "status": "healthy"}
 
 
+@app.get("/metrics")
+async def metrics():
+    """In-process cache, pool and queue statistics."""
+    return metrics_snapshot()
+
+
 if __name__ == "__main__":
     uvicorn.run(
         "main:app",
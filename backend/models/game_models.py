@@ -1,7 +1,10 @@
+import chess
 from datetime import datetime, timezone
-from typing import List, Optional
-from pydantic import BaseModel, Field, ConfigDict
+from typing import Any, Dict, List, Optional, Tuple
+from pydantic import BaseModel, Field, ConfigDict, PrivateAttr, model_validator
+from core.settings import settings
 from enums.game_enums import TimeControl, GameStatus
+from utils.chess_utils import moves_from_fens, rebuild_position_counts, replay_fens
 
 class GameCreate(BaseModel):
     """Request model for creating a game"""
@@ -9,28 +12,106 @@ class GameCreate(BaseModel):
     time_control: str = Field(..., description="Time control (e.g., '5+3' or 'daily')")
 
 class GameState(BaseModel):
-    """Lightweight game state model for MongoDB storage"""
+    """
+    Lightweight game state model for MongoDB storage
+    
+    The move history is stored compactly as the start FEN plus a list of
+    packed 16-bit moves (see utils.chess_utils.pack_move), with a FEN
+    checkpoint every checkpoint_interval plies. The FEN of any ply is
+    rebuilt lazily from the nearest checkpoint.
+    """
     id: str = Field(..., description="Unique game identifier")
     player_white: str = Field(..., description="White player username")
     player_black: Optional[str] = Field(None, description="Black player username")
     
-    # FEN-based game state
-    fens: List[str] = Field(default=["rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"], 
-                           description="List of FEN positions (move history)")
+    # Compact move history
+    start_fen: str = Field(chess.STARTING_FEN, description="Position before the first move")
+    moves: List[int] = Field(default_factory=list, description="Packed moves (from | to << 6 | promotion << 12)")
+    checkpoint_interval: int = Field(default_factory=lambda: settings.FEN_CHECKPOINT_INTERVAL,
+                                     description="Plies between FEN checkpoints")
+    checkpoints: List[str] = Field(default_factory=list,
+                                   description="FEN after every checkpoint_interval plies")
+    current_fen: Optional[str] = Field(None, description="Current board position")
+    
+    # Repetition index: Zobrist position key -> occurrences since the last irreversible move
+    position_counts: Dict[str, int] = Field(default_factory=dict,
+                                            description="Position repetition counts")
+    
+    # Retransmits of a WebSocket move are recognised on any worker from the seq and move stored with it
+    move_seqs: Dict[str, Tuple[int, int]] = Field(default_factory=dict,
+                                                  description="(seq, packed move) of each player's last WebSocket move")
     
     # Game metadata
     time_control: str = Field(..., description="Time control string")
     status: GameStatus = Field(GameStatus.WAITING, description="Current game status")
     result: Optional[str] = Field(None, description="Game result: 'white', 'black', 'draw', or None")
     
+    # Incremented on every write; newer versions replace older ones in caches
+    version: int = Field(0, description="Write counter")
+    
     # Timestamps
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     
+    # Set for legacy documents that must be fully rewritten before delta updates apply
+    _needs_full_write: bool = PrivateAttr(default=False)
+    # Set once the game exists in storage; later writes are conditional on version
+    _persisted: bool = PrivateAttr(default=False)
+    
+    @model_validator(mode="before")
+    @classmethod
+    def _migrate_fen_history(cls, data: Any) -> Any:
+        """Convert the legacy one-FEN-per-ply format into the compact move list"""
+        if isinstance(data, dict) and data.get("fens") and "moves" not in data:
+            data = dict(data)
+            fens = data.pop("fens")
+            interval = data.get("checkpoint_interval") or settings.FEN_CHECKPOINT_INTERVAL
+            data["start_fen"] = fens[0]
+            data["moves"] = moves_from_fens(fens)
+            data["checkpoint_interval"] = interval
+            data["checkpoints"] = fens[interval::interval]
+            data["current_fen"] = fens[-1]
+        return data
+    
+    @model_validator(mode="after")
+    def _ensure_derived_state(self) -> "GameState":
+        """Fill in the current FEN and repetition index for new games and cold-loaded documents"""
+        if self.current_fen is None:
+            self.current_fen = self.fen_at(self.ply)
+        if not self.position_counts:
+            # Only positions since the last pawn move or capture can repeat: replay from that ply on
+            halfmove_clock = int(self.current_fen.split()[4])
+            since = max(0, self.ply - halfmove_clock)
+            self.position_counts = rebuild_position_counts(replay_fens(self.fen_at(since), self.moves[since:]))
+        return self
+    
     @property
-    def current_fen(self) -> str:
-        """Get the current board position"""
-        return self.fens[-1]
+    def ply(self) -> int:
+        """Number of half-moves played"""
+        return len(self.moves)
+    
+    @property
+    def fens(self) -> List[str]:
+        """Rebuild the FEN of every ply (replays the whole game)"""
+        return replay_fens(self.start_fen, self.moves)
+    
+    def fen_at(self, ply: int) -> str:
+        """Rebuild the FEN at a given ply from the nearest checkpoint"""
+        if not 0 <= ply <= self.ply:
+            raise IndexError(f"Ply {ply} out of range 0..{self.ply}")
+        if ply == self.ply and self.current_fen is not None:
+            return self.current_fen
+        checkpoint = min(ply // self.checkpoint_interval, len(self.checkpoints))
+        base_fen = self.checkpoints[checkpoint - 1] if checkpoint else self.start_fen
+        base_ply = checkpoint * self.checkpoint_interval
+        return replay_fens(base_fen, self.moves[base_ply:ply])[-1]
+    
+    def record_move(self, move: int, fen: str):
+        """Append a packed move and the resulting FEN"""
+        self.moves.append(move)
+        self.current_fen = fen
+        if self.ply % self.checkpoint_interval == 0:
+            self.checkpoints.append(fen)
     
     @property
     def time_control_enum(self) -> TimeControl:
@@ -44,6 +125,20 @@ class GameState(BaseModel):
     
     model_config = ConfigDict(use_enum_values=True)
 
+class GameSummary(BaseModel):
+    """Projection of a game for listings: no move history"""
+    id: str
+    player_white: str
+    player_black: Optional[str] = None
+    current_fen: str
+    time_control: str
+    status: GameStatus
+    result: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+    
+    model_config = ConfigDict(use_enum_values=True)
+
 class MoveRequest(BaseModel):
     """Request model for making a move"""
     username: str = Field(..., description="Player making the move")
@@ -8,7 +8,7 @@ Provides endpoints for:
 - Getting game state
 """
 
-from fastapi import APIRouter, HTTPException, Depends, Response
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
 from typing import List, Optional
 
 from schemas.game_schemas import (
@@ -66,26 +66,45 @@ async def make_move(game_id: str, request: MakeMoveRequest, current_user: User =
         raise HTTPException(status_code=404, detail="Game not found")
 
 
+@router.get("/user", response_model=List[GameResponse])
+async def get_user_games(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=200),
+    cursor: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get the current user's games, most recent first.
+    
+    With limit or cursor, one page (50 games unless limit says otherwise) and
+    the next page's cursor in X-Next-Cursor; without either, every game.
+    """
+    next_cursor = None
+    try:
+        if limit is None and cursor is None:
+            games = await game_service.list_all_user_games(current_user.username)
+        else:
+            games, next_cursor = await game_service.list_user_games(current_user.username, limit=limit or 50,
+                                                                    cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return [GameResponse.from_game_state(game) for game in games]
+
+
 @router.get("/{game_id}", response_model=GameResponse)
 async def get_game(game_id: str):
     """Get current game state."""
     try:
-        game = await game_service.get_game(game_id)
+        game = await game_service.get_game(game_id, operation="api_get_game")
         return GameResponse.from_game_state(game)
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Game not found")
 
 
-@router.get("/user", response_model=List[GameResponse])
-async def get_user_games(current_user: User = Depends(get_current_user)):
-    """Get all games for the current user."""
-    try:
-        games = await game_service.list_user_games(current_user.username)
-        return [GameResponse.from_game_state(game) for game in games]
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-
 @router.post("/{game_id}/leave", response_model=GameResponse)
 async def leave_game(game_id: str, current_user: User = Depends(get_current_user)):
     """Leave a game (resign)."""
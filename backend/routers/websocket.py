@@ -3,109 +3,182 @@ WebSocket Router - Real-time game communication
 
 Handles WebSocket connections for:
 - Real-time move updates
+- Moves sent on the socket (make_move with sequence numbers, acked or nacked)
 - Game state synchronization
 - Player presence
 - RabbitMQ fallback when players are offline
+
+Broadcasts and presence reach the other workers through the broadcast bus
+(services/broadcast_bus.py); this worker subscribes to a game only while
+it holds sockets of that game.
+
+Clients pick a wire protocol when connecting, with ?protocol= or the
+WebSocket subprotocol (services/wire_protocol.py); the legacy JSON
+messages stay the default.
+
+A socket opened with ?token=<access token> is authenticated once, for
+the whole session, and may send make_move messages; retransmits are
+answered from services/move_sessions.py without applying the move again.
+Sequence numbers belong to the client session named by ?session=, so
+they continue across reconnects and start over when a client reloads.
+The seq and move of each player's last move are also stored with the
+game, so a retransmit that reaches another worker after a reconnect is
+still acked.
 """
 
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from typing import Dict, Set, Optional
-import json
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.security import HTTPAuthorizationCredentials
+from typing import Optional, Set
+import uuid
+import chess
 
+from services.broadcast_bus import broadcast_bus
+from enums.game_enums import GameStatus
+from database.repository import get_repository
+from services.auth_service import AuthService
+from services.connection_manager import ClientConnection, connection_manager
 from services.game_service import game_service
+from services.move_sessions import move_sessions
+from services.wire_protocol import Frame, WireProtocol, negotiate
+from utils.chess_utils import pack_move
 
 router = APIRouter()
 
-# Store active WebSocket connections per game
-game_connections: Dict[str, Set[WebSocket]] = {}
+# Active connections on this worker per game, and per player: {game_id: {username: connection}}
+game_connections = connection_manager.game_connections
+user_connections = connection_manager.user_connections
 
-# Store user connections per game: {game_id: {username: websocket}}
-user_connections: Dict[str, Dict[str, WebSocket]] = {}
 
-
-async def add_connection(game_id: str, websocket: WebSocket, username: str = None):
-    """Add a WebSocket connection to a game."""
-    if game_id not in game_connections:
-        game_connections[game_id] = set()
-    game_connections[game_id].add(websocket)
-    
-    # Track user connections for fallback logic
-    if username:
-        if game_id not in user_connections:
-            user_connections[game_id] = {}
-        user_connections[game_id][username] = websocket
+async def add_connection(game_id: str, websocket: WebSocket, username: str = None,
+                         protocol: WireProtocol = None) -> ClientConnection:
+    """Add a WebSocket connection to a game and start its outbound writer."""
+    connection = connection_manager.connect(game_id, websocket, username, protocol)
+    try:
+        await broadcast_bus.subscribe(game_id)
+        if username:
+            await broadcast_bus.announce_presence(game_id, username, True)
+    except Exception as e:
+        print(f"Failed to register game {game_id} on the broadcast bus: {e}")
+    return connection
 
 
-async def remove_connection(game_id: str, websocket: WebSocket, username: str = None):
+async def remove_connection(connection: ClientConnection):
     """Remove a WebSocket connection from a game."""
-    if game_id in game_connections:
-        game_connections[game_id].discard(websocket)
-        if not game_connections[game_id]:
-            del game_connections[game_id]
-    
-    # Remove from user connections
-    if username and game_id in user_connections:
-        user_connections[game_id].pop(username, None)
-        if not user_connections[game_id]:
-            del user_connections[game_id]
+    game_id, username = connection.game_id, connection.username
+    await connection_manager.disconnect(connection)
+    try:
+        if game_id not in game_connections:
+            await broadcast_bus.unsubscribe(game_id)
+        if username and username not in connection_manager.connected_users(game_id):
+            await broadcast_bus.announce_presence(game_id, username, False)
+    except Exception as e:
+        print(f"Failed to unregister game {game_id} from the broadcast bus: {e}")
 
 
 def is_user_connected(game_id: str, username: str) -> bool:
-    """Check if a user is currently connected to a game via WebSocket."""
-    if game_id not in user_connections or username not in user_connections[game_id]:
-        return False
-    
-    websocket = user_connections[game_id][username]
-    try:
-        # Check if WebSocket is still open (1 = OPEN state)
-        return websocket.client_state == 1
-    except:
-        return False
+    """Check if a user is currently connected to a game via WebSocket, on any worker."""
+    if connection_manager.get_user_connection(game_id, username) is not None:
+        return True
+    return broadcast_bus.is_present(game_id, username)
 
 
 def get_connected_users(game_id: str) -> Set[str]:
-    """Get all users currently connected to a game."""
-    if game_id not in user_connections:
-        return set()
-    return set(user_connections[game_id].keys())
+    """Get all users currently connected to a game, on any worker."""
+    return connection_manager.connected_users(game_id) | broadcast_bus.present_users(game_id)
 
 
-async def handle_user_reconnect(game_id: str, username: str, websocket: WebSocket):
+async def handle_user_reconnect(game_id: str, username: str, connection: ClientConnection):
     """Handle user reconnection - deliver pending moves from RabbitMQ."""
     try:
         from message_queue.rabbitmq import rabbitmq_manager
         print(f"Handling reconnection for user {username} in game {game_id}")
-        await rabbitmq_manager.deliver_pending_moves(game_id, username, websocket)
+        await rabbitmq_manager.deliver_pending_moves(game_id, username, connection)
         print(f"Completed pending move delivery for user {username} in game {game_id}")
     except Exception as e:
         print(f"Failed to deliver pending moves to {username} in game {game_id}: {e}")
 
 
 async def broadcast_to_game(game_id: str, message: dict, exclude: WebSocket = None):
-    """Broadcast a message to all connections in a game."""
-    if game_id not in game_connections:
-        return
+    """Broadcast a message to all connections in a game, on every worker, without waiting for slow sockets."""
+    # Serialized once per wire protocol, then queued on every local connection's outbound queue
+    frame = Frame(message)
+    connection_manager.broadcast(game_id, frame, exclude=exclude, key=message.get("type"))
     
-    message_str = json.dumps(message)
-    connections_to_remove = []
+    # Other workers holding sockets of this game deliver it to theirs
+    try:
+        await broadcast_bus.publish(game_id, frame.text, key=message.get("type"))
+    except Exception as e:
+        print(f"Failed to publish broadcast for game {game_id}: {e}")
+
+
+async def authenticate(token: str) -> Optional[str]:
+    """Username of a valid access token whose user exists, or None."""
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+    try:
+        user = await AuthService(get_repository()).get_current_user(credentials)
+    except HTTPException:
+        return None
+    return user.username
+
+
+async def handle_make_move(connection: ClientConnection, game_id: str, username: Optional[str], message: dict,
+                           session_id: str = ""):
+    """Apply a move sent on the socket once per sequence number and answer with a move_ack or move_nack."""
+    seq, move_uci = message.get("seq"), message.get("move")
+    if not isinstance(seq, int) or isinstance(seq, bool) or not isinstance(move_uci, str):
+        await connection.send({"type": "move_nack", "seq": seq, "error": "make_move needs an integer seq and a move"})
+        return
+    if username is None:
+        await connection.send({"type": "move_nack", "seq": seq,
+                               "error": "Not authenticated, connect with ?token=<access token>"})
+        return
     
-    for connection in game_connections[game_id]:
-        if connection == exclude:
-            continue
+    async def apply() -> dict:
+        try:
+            response = await game_service.make_move(game_id=game_id, username=username, move_uci=move_uci, seq=seq)
+        except FileNotFoundError:
+            return {"type": "move_nack", "error": "Game not found"}
+        except ValueError as e:
+            error = str(e)
+        else:
+            if response.success:
+                return {"type": "move_ack", "game_over": response.game_over, "result": response.result}
+            error = response.error
+        # A retransmit whose first copy was applied by another worker, which holds its session:
+        # the same seq and the same move as the player's last one
         try:
-            await connection.send_text(message_str)
-        except:
-            connections_to_remove.append(connection)
+            submitted = (seq, pack_move(chess.Move.from_uci(move_uci)))
+        except ValueError:
+            return {"type": "move_nack", "error": error}
+        game = await game_service.get_game(game_id)
+        if game is not None and game.move_seqs.get(username) == submitted:
+            game_over = game.status == GameStatus.FINISHED or game.status == GameStatus.FINISHED.value
+            return {"type": "move_ack", "game_over": game_over, "result": game.result}
+        return {"type": "move_nack", "error": error}
     
-    # Remove dead connections
-    for connection in connections_to_remove:
-        game_connections[game_id].discard(connection)
+    try:
+        answer = await move_sessions.submit(game_id, username, seq, apply, session_id)
+    except Exception as e:
+        # Not remembered, so the client may retransmit with the same seq
+        answer = {"type": "move_nack", "seq": seq, "error": f"Error making move: {str(e)}"}
+    await connection.send(answer)
+
+
+async def receive_message(websocket: WebSocket, protocol: WireProtocol) -> dict:
+    """Receive one client message (text or binary frame) as a legacy message dict."""
+    frame = await websocket.receive()
+    if frame["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(frame.get("code", 1000))
+    data = frame.get("text")
+    return protocol.decode(data if data is not None else frame.get("bytes"))
 
 
 @router.websocket("/{game_id}")
 async def websocket_endpoint(websocket: WebSocket, game_id: str):
     """WebSocket endpoint for real-time game communication."""
-    await websocket.accept()
+    protocol, subprotocol = negotiate(websocket.query_params.get("protocol"),
+                                      websocket.scope.get("subprotocols", []))
+    await websocket.accept(subprotocol=subprotocol)
     
     # Try to extract username from query parameters or wait for initial message
     username = None
@@ -113,82 +186,116 @@ async def websocket_endpoint(websocket: WebSocket, game_id: str):
         # Check query parameters for username
         query_params = dict(websocket.query_params)
         username = query_params.get('username')
-        print(f"WebSocket connection for game {game_id}, user: {username or 'anonymous'}")
     except:
         pass
     
-    await add_connection(game_id, websocket, username)
+    # An access token authenticates the session once; it may then send moves
+    authenticated_user = None
+    token = websocket.query_params.get("token")
+    if token:
+        authenticated_user = await authenticate(token)
+        if authenticated_user is None:
+            error = protocol.encode({"type": "error", "message": "Invalid authentication credentials"})
+            if isinstance(error, bytes):
+                await websocket.send_bytes(error)
+            else:
+                await websocket.send_text(error)
+            await websocket.close(code=1008)  # Policy violation
+            return
+        username = authenticated_user
+    # Move numbers are per client session; without a name they start over with every socket
+    session_id = websocket.query_params.get("session") or uuid.uuid4().hex
+    print(f"WebSocket connection for game {game_id}, user: {username or 'anonymous'}, protocol: {protocol.name}")
+    
+    # Everything sent to this socket goes through its outbound queue, in order
+    connection = await add_connection(game_id, websocket, username, protocol)
     
     # Handle missed moves from RabbitMQ when user reconnects
     if username:
         print(f"User {username} connected to game {game_id}, checking for pending moves...")
-        await handle_user_reconnect(game_id, username, websocket)
+        await handle_user_reconnect(game_id, username, connection)
     
     try:
         # Send current game state to newly connected client
         try:
-            game = await game_service.get_game(game_id)
+            game = await game_service.get_game(game_id, operation="ws_connect")
             if game:
                 game_state_message = {
                     "type": "game_state",
                     "game_id": game_id,
                     "fen": game.current_fen,
+                    "ply": game.ply,
                     "status": game.status.value if hasattr(game.status, 'value') else game.status,
                     "player_white": game.player_white,
                     "player_black": game.player_black,
                     "time_control": game.time_control,
                     "result": game.result
                 }
-                await websocket.send_text(json.dumps(game_state_message))
+                await connection.send(game_state_message)
+                # Only players authenticated by ?token= (or a possible second player) get the
+                # direct feed; anyone else, including a socket that just claims a ?username=, spectates
+                is_player = authenticated_user is not None and (
+                    authenticated_user in (game.player_white, game.player_black) or game.player_black is None
+                )
+                if not is_player:
+                    connection_manager.set_spectator(connection)
                 print(f"Sent current game state to {username or 'anonymous'} for game {game_id}")
             else:
-                await websocket.send_text(json.dumps({
+                await connection.send({
                     "type": "error",
                     "message": "Game not found"
-                }))
+                })
+                await connection.flush()
                 return
         except Exception as e:
-            await websocket.send_text(json.dumps({
+            await connection.send({
                 "type": "error",
                 "message": f"Error getting game: {str(e)}"
-            }))
+            })
+            await connection.flush()
             return
         
-        # Listen for messages from client (optional - moves typically come via REST API)
+        # Listen for messages from client (moves come via make_move or the REST API)
         while True:
             try:
-                data = await websocket.receive_text()
-                message = json.loads(data)
+                message = await receive_message(websocket, protocol)
+                
+                if message["type"] == "make_move":
+                    await handle_make_move(connection, game_id, authenticated_user, message, session_id)
                 
-                if message["type"] == "get_game_state":
+                elif message["type"] == "get_game_state":
                     try:
-                        game = await game_service.get_game(game_id)
+                        game = await game_service.get_game(game_id, operation="ws_game_state")
                         if game:
-                            await websocket.send_text(json.dumps({
+                            await connection.send({
                                 "type": "game_state",
                                 "game_id": game_id,
                                 "fen": game.current_fen,
+                                "ply": game.ply,
                                 "status": game.status.value if hasattr(game.status, 'value') else game.status,
                                 "player_white": game.player_white,
                                 "player_black": game.player_black,
                                 "result": game.result
-                            }))
+                            })
                     except Exception as e:
-                        await websocket.send_text(json.dumps({
+                        await connection.send({
                             "type": "error",
                             "message": f"Error getting game state: {str(e)}"
-                        }))
+                        })
                         
             except WebSocketDisconnect:
                 break
             except Exception as e:
-                await websocket.send_text(json.dumps({
+                if connection.closed:
+                    # Dropped as a slow consumer or its socket failed
+                    break
+                await connection.send({
                     "type": "error", 
                     "message": f"Error processing message: {str(e)}"
-                }))
+                })
                     
     except WebSocketDisconnect:
         pass
     finally:
         print(f"WebSocket disconnected for user {username or 'anonymous'} in game {game_id}")
-        await remove_connection(game_id, websocket, username)
+        await remove_connection(connection)
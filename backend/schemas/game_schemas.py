@@ -4,9 +4,9 @@ API Schema Models - Request/Response models for REST endpoints
 Designed for React frontend with FEN-based communication
 """
 
-from typing import List, Optional
+from typing import List, Optional, Union
 from pydantic import BaseModel, Field
-from models.game_models import GameState
+from models.game_models import GameState, GameSummary
 
 
 class CreateGameRequest(BaseModel):
@@ -37,8 +37,8 @@ class GameResponse(BaseModel):
     updated_at: str
     
     @classmethod
-    def from_game_state(cls, game: GameState) -> "GameResponse":
-        """Convert GameState to API response"""
+    def from_game_state(cls, game: Union[GameState, GameSummary]) -> "GameResponse":
+        """Convert GameState (or a listing's GameSummary) to API response"""
         # Convert status to match frontend expectations
         status = game.status.value if hasattr(game.status, 'value') else game.status
         if status == "in_progress":
@@ -0,0 +1,133 @@
+"""
+Auth Cache - Skip JWT decoding and user lookups on authenticated requests
+
+Two bounded in-process caches used by get_current_user:
+- Verified tokens, keyed by the SHA-256 of the token, each kept only
+  until the token's own 'exp'
+- Users, keyed by username, kept for a short TTL so changes made by
+  other workers are picked up
+
+Call invalidate_user() whenever a user document changes (and
+revoke_token() for logout-style revocation) so this worker stops serving
+the old state immediately.
+"""
+
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from core.metrics import register_metrics
+from core.settings import settings
+from models.user_models import User
+
+
+class _ExpiringLRU:
+    """Bounded LRU map whose entries carry their own wall-clock expiry"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is not None and entry[1] <= time.time():
+            del self._entries[key]
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key: str, value: Any, expires_at: float):
+        if self.max_size <= 0 or expires_at <= time.time():
+            return
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key: str):
+        self._entries.pop(key, None)
+
+    def drop_values(self, predicate):
+        for key in [key for key, (value, _) in self._entries.items() if predicate(value)]:
+            del self._entries[key]
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+
+def token_key(token: str) -> str:
+    """Cache key for a bearer token; the raw token is never kept"""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class AuthCache:
+    """Verified-token and user caches for the authentication dependency"""
+
+    def __init__(self, max_users: int = 10000, user_ttl_seconds: float = 300, max_tokens: int = 10000):
+        self.user_ttl_seconds = user_ttl_seconds
+        self.users = _ExpiringLRU(max_users)
+        self.tokens = _ExpiringLRU(max_tokens)
+
+    def get_token_subject(self, token: str) -> Optional[str]:
+        """Get the username of a token that was already verified and has not expired"""
+        return self.tokens.get(token_key(token))
+
+    def put_token(self, token: str, username: str, exp: float):
+        """Remember a verified token until its 'exp' (seconds since the epoch)"""
+        self.tokens.put(token_key(token), username, exp)
+
+    def revoke_token(self, token: str):
+        """Forget a verified token so it is decoded and checked again"""
+        self.tokens.pop(token_key(token))
+
+    def get_user(self, username: str) -> Optional[User]:
+        """Get a cached user"""
+        return self.users.get(username)
+
+    def put_user(self, user: User):
+        """Cache a user loaded from the database"""
+        self.users.put(user.username, user, time.time() + self.user_ttl_seconds)
+
+    def invalidate_user(self, username: str, revoke_tokens: bool = False):
+        """Drop a user after it changed; optionally drop every cached token of that user too"""
+        self.users.pop(username)
+        if revoke_tokens:
+            self.tokens.drop_values(lambda subject: subject == username)
+
+    def clear(self):
+        """Drop every cached user and token"""
+        self.users.clear()
+        self.tokens.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters of both caches"""
+        return {"users": self.users.stats(), "tokens": self.tokens.stats()}
+
+
+# Global auth cache instance
+auth_cache = AuthCache(
+    max_users=settings.USER_CACHE_SIZE,
+    user_ttl_seconds=settings.USER_CACHE_TTL_SECONDS,
+    max_tokens=settings.TOKEN_CACHE_SIZE
+)
+register_metrics("auth_cache", auth_cache.stats)
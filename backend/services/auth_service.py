@@ -1,41 +1,59 @@
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import Optional, Tuple
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
 from models.user_models import User, UserCreate, UserLogin, Token
 from core.settings import settings
 from database.repository import GameRepository, get_repository
+from services.auth_cache import auth_cache
+from services.password_hasher import PasswordHasherBusyError, password_hasher
 
 
-# Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 # Security scheme
 security = HTTPBearer()
 
 
+def _busy_error() -> HTTPException:
+    """Load-shedding response when the password hasher is saturated"""
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many login attempts in progress, please retry shortly",
+        headers={"Retry-After": "1"},
+    )
+
+
 class AuthService:
     """Authentication service with database integration"""
     
     def __init__(self, repository: GameRepository):
         self.repository = repository
     
-    def verify_password(self, plain_password: str, hashed_password: str) -> bool:
-        """Verify a plain password against its hash"""
-        return pwd_context.verify(plain_password, hashed_password)
+    async def verify_password(self, plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """Verify a plain password against its hash; also returns a new hash if the cost factor changed"""
+        try:
+            return await password_hasher.verify_and_update(plain_password, hashed_password)
+        except PasswordHasherBusyError:
+            raise _busy_error()
     
-    def get_password_hash(self, password: str) -> str:
+    async def get_password_hash(self, password: str) -> str:
         """Hash a password"""
-        return pwd_context.hash(password)
+        try:
+            return await password_hasher.hash(password)
+        except PasswordHasherBusyError:
+            raise _busy_error()
     
     async def get_user(self, username: str) -> Optional[User]:
-        """Get user by username"""
+        """Get user by username, served from the auth cache when possible"""
+        user = auth_cache.get_user(username)
+        if user is not None:
+            return user
         user_data = await self.repository.find_one("users", {"username": username})
         if user_data:
-            return User(**user_data)
+            user = User(**user_data)
+            auth_cache.put_user(user)
+            return user
         return None
     
     async def create_user(self, user_data: UserCreate) -> User:
@@ -49,10 +67,11 @@ class AuthService:
         
         user = User(
             username=user_data.username,
-            password_hash=self.get_password_hash(user_data.password),
+            password_hash=await self.get_password_hash(user_data.password),
             created_at=datetime.now(timezone.utc)
         )
         await self.repository.insert_one("users", user.model_dump())
+        auth_cache.invalidate_user(user.username)
         return user
     
     async def authenticate_user(self, username: str, password: str) -> Optional[User]:
@@ -60,8 +79,14 @@ class AuthService:
         user = await self.get_user(username)
         if not user:
             return None
-        if not self.verify_password(password, user.password_hash):
+        valid, new_hash = await self.verify_password(password, user.password_hash)
+        if not valid:
             return None
+        if new_hash is not None:
+            # Stored with a different bcrypt cost: upgrade it transparently
+            await self.repository.update_one("users", {"username": username}, {"$set": {"password_hash": new_hash}})
+            auth_cache.invalidate_user(username)
+            user = user.model_copy(update={"password_hash": new_hash})
         return user
     
     def create_access_token(self, data: dict, expires_delta: Optional[timedelta] = None):
@@ -76,7 +101,10 @@ class AuthService:
         return encoded_jwt
     
     def verify_token(self, credentials: HTTPAuthorizationCredentials) -> str:
-        """Verify JWT token and return username"""
+        """Verify JWT token and return username (tokens verified before are cached until they expire)"""
+        username = auth_cache.get_token_subject(credentials.credentials)
+        if username is not None:
+            return username
         try:
             payload = jwt.decode(credentials.credentials, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
             username: str = payload.get("sub")
@@ -86,6 +114,8 @@ class AuthService:
                     detail="Invalid authentication credentials",
                     headers={"WWW-Authenticate": "Bearer"},
                 )
+            if isinstance(payload.get("exp"), (int, float)):
+                auth_cache.put_token(credentials.credentials, username, payload["exp"])
             return username
         except JWTError:
             raise HTTPException(
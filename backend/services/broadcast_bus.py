@@ -0,0 +1,307 @@
+"""
+Broadcast Bus - Deliver game broadcasts and player presence across workers
+
+Each uvicorn worker (or node) only holds its own WebSockets. The bus
+carries broadcast_to_game messages to the other workers and tells every
+worker which players are connected elsewhere:
+- A worker subscribes to a game only while it holds sockets of that game,
+  so broadcasts only reach the workers that need them
+- Broadcasts are delivered to local sockets directly and published once
+  for the other workers; a worker ignores its own messages
+- Presence changes are announced as they happen, and every worker
+  re-announces its full presence every BUS_PRESENCE_INTERVAL_SECONDS;
+  presence of a worker that has not been heard from for three intervals
+  is ignored, so a crashed worker does not keep players "online"
+
+Backends (BROADCAST_BUS):
+- "local": in-process hub; one worker, or several simulated in tests
+- "rabbitmq": the existing chess_moves topic exchange, one exclusive
+  queue per worker bound to broadcast.<game_id> and presence
+"""
+
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Iterable, Optional, Set, Tuple
+
+from core.metrics import register_metrics
+from core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+Deliver = Callable[..., Any]
+LocalPresence = Callable[[], Iterable[Tuple[str, str]]]
+
+
+class BroadcastBus(ABC):
+    """Base class of the bus backends: subscriptions, remote presence and counters"""
+
+    def __init__(self, presence_interval: float = 10):
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.presence_interval = presence_interval
+        self.subscriptions: Set[str] = set()
+        self._deliver: Optional[Deliver] = None
+        self._local_presence: Optional[LocalPresence] = None
+        # Presence of other workers: worker_id -> {(game_id, username)}, and when it was last heard
+        self._remote_presence: Dict[str, Set[Tuple[str, str]]] = {}
+        self._heard_at: Dict[str, float] = {}
+        self._presence_task: Optional[asyncio.Task] = None
+        self.published = 0
+        self.received = 0
+
+    async def start(self, deliver: Deliver, local_presence: LocalPresence):
+        """
+        Start receiving from other workers
+
+        Args:
+            deliver: Called with (game_id, text, key=...) for broadcasts from other workers
+            local_presence: Returns the (game_id, username) pairs connected to this worker
+        """
+        self._deliver = deliver
+        self._local_presence = local_presence
+        await self._connect()
+        await self._send_presence_snapshot()
+        if self._presence_task is None and self.presence_interval > 0:
+            self._presence_task = asyncio.create_task(self._presence_loop())
+
+    async def stop(self):
+        """Withdraw this worker's presence and stop receiving"""
+        if self._presence_task is not None:
+            self._presence_task.cancel()
+            self._presence_task = None
+        try:
+            await self._publish_control({"kind": "presence_snapshot", "entries": []})
+        except Exception as e:
+            logger.error(f"Failed to withdraw presence of worker {self.worker_id}: {e}")
+        await self._disconnect()
+
+    async def subscribe(self, game_id: str):
+        """Receive broadcasts of a game from other workers"""
+        if game_id not in self.subscriptions:
+            self.subscriptions.add(game_id)
+            await self._bind(game_id)
+
+    async def unsubscribe(self, game_id: str):
+        """Stop receiving broadcasts of a game"""
+        if game_id in self.subscriptions:
+            self.subscriptions.discard(game_id)
+            await self._unbind(game_id)
+
+    async def publish(self, game_id: str, text: str, key: Optional[str] = None):
+        """Send a serialized broadcast to the other workers subscribed to the game"""
+        self.published += 1
+        await self._publish_broadcast(game_id, text, key)
+
+    async def announce_presence(self, game_id: str, username: str, connected: bool):
+        """Tell the other workers that a player (dis)connected here"""
+        await self._publish_control({"kind": "presence", "game_id": game_id,
+                                     "username": username, "connected": connected})
+
+    def is_present(self, game_id: str, username: str) -> bool:
+        """Whether the player is connected to the game on another worker"""
+        return any((game_id, username) in entries for entries in self._live_presence())
+
+    def present_users(self, game_id: str) -> Set[str]:
+        """Players connected to the game on other workers"""
+        return {user for entries in self._live_presence() for game, user in entries if game == game_id}
+
+    def _live_presence(self):
+        horizon = time.monotonic() - 3 * self.presence_interval
+        for worker, entries in self._remote_presence.items():
+            if self.presence_interval <= 0 or self._heard_at.get(worker, 0) >= horizon:
+                yield entries
+
+    def _receive(self, message: Dict[str, Any]):
+        """Handle a message from another worker"""
+        origin = message.get("origin")
+        if origin == self.worker_id:
+            return
+        kind = message.get("kind")
+        if kind == "broadcast":
+            self.received += 1
+            if self._deliver is not None and message["game_id"] in self.subscriptions:
+                self._deliver(message["game_id"], message["text"], key=message.get("key"))
+            return
+        self._heard_at[origin] = time.monotonic()
+        if kind == "presence":
+            entries = self._remote_presence.setdefault(origin, set())
+            entry = (message["game_id"], message["username"])
+            if message["connected"]:
+                entries.add(entry)
+            else:
+                entries.discard(entry)
+        elif kind == "presence_snapshot":
+            if message["entries"]:
+                self._remote_presence[origin] = {tuple(entry) for entry in message["entries"]}
+            else:
+                self._remote_presence.pop(origin, None)
+                self._heard_at.pop(origin, None)
+        elif kind == "presence_sync":
+            # A worker just started; answer with this worker's presence
+            asyncio.get_running_loop().create_task(self._send_presence_snapshot())
+
+    async def _send_presence_snapshot(self):
+        entries = [list(entry) for entry in self._local_presence()] if self._local_presence else []
+        await self._publish_control({"kind": "presence_snapshot", "entries": entries})
+
+    async def _presence_loop(self):
+        while True:
+            await asyncio.sleep(self.presence_interval)
+            try:
+                await self._send_presence_snapshot()
+            except Exception as e:
+                logger.error(f"Failed to announce presence of worker {self.worker_id}: {e}")
+
+    # Backend hooks
+
+    async def _connect(self):
+        pass
+
+    async def _disconnect(self):
+        pass
+
+    async def _bind(self, game_id: str):
+        pass
+
+    async def _unbind(self, game_id: str):
+        pass
+
+    @abstractmethod
+    async def _publish_broadcast(self, game_id: str, text: str, key: Optional[str]):
+        """Send a broadcast to the other workers subscribed to the game"""
+
+    @abstractmethod
+    async def _publish_control(self, message: Dict[str, Any]):
+        """Send a presence message to every other worker"""
+
+    def stats(self) -> Dict[str, Any]:
+        """Get subscription, traffic and presence counters"""
+        return {
+            "backend": type(self).__name__,
+            "worker_id": self.worker_id,
+            "subscriptions": len(self.subscriptions),
+            "published": self.published,
+            "received": self.received,
+            "remote_workers": sum(1 for _ in self._live_presence()),
+            "remote_players": sum(len(entries) for entries in self._live_presence())
+        }
+
+
+class InProcessHub:
+    """Routes messages between InProcessBus instances of one process"""
+
+    def __init__(self):
+        self.buses: Set["InProcessBus"] = set()
+
+    def deliver(self, message: Dict[str, Any], game_id: Optional[str] = None):
+        for bus in list(self.buses):
+            if game_id is None or game_id in bus.subscriptions:
+                bus._receive(message)
+
+
+class InProcessBus(BroadcastBus):
+    """Bus between workers simulated in one process; with one worker it delivers nothing"""
+
+    def __init__(self, hub: Optional[InProcessHub] = None, presence_interval: float = 10):
+        super().__init__(presence_interval)
+        self.hub = hub or InProcessHub()
+        self.hub.buses.add(self)
+        self._origin = {"origin": self.worker_id}
+
+    async def _connect(self):
+        self.hub.buses.add(self)
+        self.hub.deliver({**self._origin, "kind": "presence_sync"})
+
+    async def _disconnect(self):
+        self.hub.buses.discard(self)
+
+    async def _publish_broadcast(self, game_id: str, text: str, key: Optional[str]):
+        self.hub.deliver({**self._origin, "kind": "broadcast", "game_id": game_id, "text": text, "key": key}, game_id)
+
+    async def _publish_control(self, message: Dict[str, Any]):
+        self.hub.deliver({**self._origin, **message})
+
+
+class RabbitMQBus(BroadcastBus):
+    """Bus on the RabbitMQ topic exchange shared with the pending-move queues"""
+
+    def __init__(self, url: Optional[str] = None, exchange_name: str = "chess_moves",
+                 presence_interval: float = 10):
+        super().__init__(presence_interval)
+        self.url = url or settings.RABBITMQ_URL
+        self.exchange_name = exchange_name
+        self._connection = None
+        self._channel = None
+        self._exchange = None
+        self._queue = None
+
+    async def _connect(self):
+        import aio_pika
+
+        self._connection = await aio_pika.connect_robust(self.url)
+        self._channel = await self._connection.channel()
+        self._exchange = await self._channel.declare_exchange(
+            self.exchange_name, aio_pika.ExchangeType.TOPIC, durable=True
+        )
+        # One private queue per worker, gone when the worker is
+        self._queue = await self._channel.declare_queue(exclusive=True, auto_delete=True)
+        await self._queue.bind(self._exchange, "presence")
+        for game_id in self.subscriptions:
+            await self._bind(game_id)
+        await self._queue.consume(self._on_message, no_ack=True)
+        await self._publish_control({"kind": "presence_sync"})
+        logger.info(f"Broadcast bus of worker {self.worker_id} connected to RabbitMQ")
+
+    async def _disconnect(self):
+        if self._connection is not None and not self._connection.is_closed:
+            await self._connection.close()
+        self._connection = self._channel = self._exchange = self._queue = None
+
+    async def _on_message(self, message):
+        try:
+            self._receive(json.loads(message.body))
+        except Exception as e:
+            logger.error(f"Failed to handle bus message: {e}")
+
+    async def _bind(self, game_id: str):
+        if self._queue is not None:
+            await self._queue.bind(self._exchange, f"broadcast.{game_id}")
+
+    async def _unbind(self, game_id: str):
+        if self._queue is not None:
+            await self._queue.unbind(self._exchange, f"broadcast.{game_id}")
+
+    async def _publish(self, routing_key: str, message: Dict[str, Any]):
+        import aio_pika
+
+        if self._exchange is None:
+            return
+        await self._exchange.publish(
+            aio_pika.Message(json.dumps({"origin": self.worker_id, **message}).encode()),
+            routing_key=routing_key
+        )
+
+    async def _publish_broadcast(self, game_id: str, text: str, key: Optional[str]):
+        await self._publish(f"broadcast.{game_id}", {"kind": "broadcast", "game_id": game_id, "text": text, "key": key})
+
+    async def _publish_control(self, message: Dict[str, Any]):
+        await self._publish("presence", message)
+
+
+def create_bus(backend: str) -> BroadcastBus:
+    """Create the bus backend named by BROADCAST_BUS"""
+    if backend == "rabbitmq":
+        return RabbitMQBus(presence_interval=settings.BUS_PRESENCE_INTERVAL_SECONDS)
+    if backend == "local":
+        return InProcessBus(presence_interval=settings.BUS_PRESENCE_INTERVAL_SECONDS)
+    raise ValueError(f"Unknown broadcast bus backend {backend!r}, expected 'local' or 'rabbitmq'")
+
+
+# Global broadcast bus instance
+broadcast_bus = create_bus(settings.BROADCAST_BUS)
+register_metrics("broadcast_bus", broadcast_bus.stats)
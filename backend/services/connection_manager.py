@@ -0,0 +1,559 @@
+"""
+Connection Manager - WebSocket fan-out with per-connection outbound queues
+
+Every WebSocket gets a bounded outbound queue and its own writer task, so
+a broadcast serializes the message once and only enqueues it; a slow
+spectator can no longer delay the move reaching the opponent:
+- Enqueueing never blocks; from another event loop (e.g. a TestClient
+  request, or a worker thread) it is handed over with call_soon_threadsafe
+- A full queue applies WS_SLOW_CONSUMER_POLICY: "drop_oldest" degrades the
+  consumer by discarding its oldest queued messages, "disconnect" closes
+  it so the client reconnects and resyncs. Legacy move messages carry the
+  full FEN; compact move deltas do not, so after a drop the next move is
+  written as a sync frame with the full FEN and the client catches up
+- A send that takes longer than WS_SEND_TIMEOUT_SECONDS closes the
+  connection the same way
+- Queue depth, drops, disconnects and fan-out latency (broadcast to
+  written on the socket) are exposed per game on /metrics
+
+Spectators (sockets of anyone but the two players) are a separate, lower
+priority tier for high-audience games:
+- Broadcasts are queued for the players first; for the spectators of a
+  game they only replace the game's latest message of the same type
+  (latest-state coalescing), so a broadcast costs the same with 10 or
+  10,000 spectators
+- Every SPECTATOR_TICK_MS a per-loop clock hands the latest messages a
+  spectator has not seen yet to every spectator whose previous ones were
+  written; a spectator that falls behind skips the intermediate moves and
+  gets the newest state
+- Player sends go first: while a player connection on the loop has queued
+  messages, the clock holds back the next batch of SPECTATOR_BATCH_SIZE
+  spectators and released spectators pause before their next send (for at
+  most a tick, so a stuck player socket cannot starve the audience)
+
+Messages are queued as Frames (services/wire_protocol.py) and encoded
+by the writer for the connection's negotiated protocol, once per
+protocol and broadcast; bytes written are counted per game.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from starlette.websockets import WebSocketState
+
+from core.metrics import register_metrics
+from core.settings import settings
+from services.wire_protocol import LEGACY, PROTOCOLS, Frame, WireProtocol
+
+logger = logging.getLogger(__name__)
+
+POLICIES = ("drop_oldest", "disconnect")
+
+
+class _GameStats:
+    """Fan-out counters of one game"""
+
+    def __init__(self):
+        self.broadcasts = 0
+        self.delivered = 0
+        self.drops = 0
+        self.disconnects = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.spectator_delivered = 0
+        self.spectator_total_latency = 0.0
+        self.spectator_max_latency = 0.0
+        self.coalesced = 0
+        self.bytes_sent = 0
+
+    def record_delivery(self, latency: float, spectator: bool = False, size: int = 0):
+        self.bytes_sent += size
+        if spectator:
+            self.spectator_delivered += 1
+            self.spectator_total_latency += latency
+            self.spectator_max_latency = max(self.spectator_max_latency, latency)
+            return
+        self.delivered += 1
+        self.total_latency += latency
+        self.max_latency = max(self.max_latency, latency)
+
+
+def _call_on(loop: asyncio.AbstractEventLoop, callback, *args):
+    """Run a callback on the given event loop, from any thread or loop"""
+    try:
+        on_own_loop = asyncio.get_running_loop() is loop
+    except RuntimeError:
+        on_own_loop = False
+    if on_own_loop:
+        callback(*args)
+    elif not loop.is_closed():
+        loop.call_soon_threadsafe(callback, *args)
+
+
+class _SpectatorTier:
+    """Spectators of one game on one event loop, and the game's latest message per key"""
+
+    def __init__(self, clock: "_SpectatorClock", stats: _GameStats, loop: asyncio.AbstractEventLoop):
+        self.clock = clock
+        self.stats = stats
+        self.loop = loop
+        # Spectator -> sequence number of the last message it was handed
+        self.spectators: Dict["ClientConnection", int] = {}
+        # key -> (seq, frame, queued_at), oldest first
+        self.latest: "OrderedDict[str, tuple]" = OrderedDict()
+        self.seq = 0
+
+    def add(self, connection: "ClientConnection"):
+        # New spectators start from the full game_state they were sent on connect
+        self.spectators[connection] = self.seq
+
+    def offer(self, key: str, frame, queued_at: float):
+        """Replace the latest message of the same key; safe to call from any thread or loop"""
+        _call_on(self.loop, self._offer, key, frame, queued_at)
+
+    def _offer(self, key: str, frame, queued_at: float):
+        if self.latest.pop(key, None) is not None:
+            self.stats.coalesced += 1
+        self.seq += 1
+        self.latest[key] = (self.seq, frame, queued_at)
+        self.clock.mark(self)
+
+    def pending(self, seen: int) -> List[tuple]:
+        """Latest messages newer than seen, in broadcast order"""
+        return [(frame, queued_at) for seq, frame, queued_at in self.latest.values() if seq > seen]
+
+
+class _SpectatorClock:
+    """Releases coalesced spectator messages once per tick, in batches, on one event loop"""
+
+    def __init__(self, tick: float, batch_size: int):
+        self.tick = tick
+        self.batch_size = max(1, batch_size)
+        self.dirty: Set[_SpectatorTier] = set()
+        self.in_flight = 0
+        self._idle = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        # Player connections of this loop with queued messages; spectators wait while there are any
+        self.busy_players: Set["ClientConnection"] = set()
+        self.players_idle = asyncio.Event()
+        self.players_idle.set()
+        self._gate_timer: Optional[asyncio.TimerHandle] = None
+
+    def mark(self, tier: _SpectatorTier):
+        """Schedule a game's spectators for the next tick"""
+        self.dirty.add(tier)
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def player_busy(self, connection: "ClientConnection"):
+        """A player connection has messages queued"""
+        if not self.busy_players:
+            self.players_idle.clear()
+            self._gate_timer = asyncio.get_running_loop().call_later(self.tick, self.players_idle.set)
+        self.busy_players.add(connection)
+
+    def player_idle(self, connection: "ClientConnection"):
+        """A player connection wrote everything (or closed)"""
+        self.busy_players.discard(connection)
+        if not self.busy_players and not self.players_idle.is_set():
+            self.players_idle.set()
+            self._gate_timer.cancel()
+
+    def done(self):
+        """A released spectator finished writing"""
+        self.in_flight -= 1
+        if self.in_flight <= 0:
+            self._idle.set()
+
+    async def _run(self):
+        try:
+            while self.dirty:
+                await asyncio.sleep(self.tick)
+                released = 0
+                for tier in list(self.dirty):
+                    behind = False
+                    for connection, seen in list(tier.spectators.items()):
+                        if seen >= tier.seq or connection.closed:
+                            continue
+                        if released % self.batch_size == 0 and not self.players_idle.is_set():
+                            await self.players_idle.wait()
+                        # Spectators still writing the previous tick keep coalescing until the next one
+                        if not connection.release(tier.pending(seen)):
+                            behind = True
+                            continue
+                        tier.spectators[connection] = tier.seq
+                        self.in_flight += 1
+                        released += 1
+                        if released % self.batch_size == 0:
+                            # Wait for this batch (at most a tick) so player writes never queue behind the audience
+                            await self._wait_idle()
+                    if not behind and all(seen >= tier.seq for seen in tier.spectators.values()):
+                        self.dirty.discard(tier)
+        finally:
+            self._task = None
+
+    async def _wait_idle(self):
+        if self.in_flight <= 0:
+            return
+        self._idle.clear()
+        try:
+            await asyncio.wait_for(self._idle.wait(), self.tick)
+        except asyncio.TimeoutError:
+            pass
+
+
+class ClientConnection:
+    """One WebSocket with its bounded outbound queue and writer task"""
+
+    def __init__(self, websocket, game_id: str, username: Optional[str], stats: _GameStats,
+                 max_queue: int = 64, policy: str = "drop_oldest", send_timeout: float = 5.0,
+                 protocol: Optional[WireProtocol] = None):
+        self.websocket = websocket
+        self.game_id = game_id
+        self.username = username
+        self.max_queue = max_queue
+        self.policy = policy
+        self.send_timeout = send_timeout
+        self.protocol = protocol or PROTOCOLS[LEGACY]
+        self.closed = False
+        self.spectator = False
+        self._clock: Optional[_SpectatorClock] = None
+        self._tier: Optional[_SpectatorTier] = None
+        # Set when a message was dropped: the next move is written with the full FEN
+        self._needs_sync = False
+        self._stats = stats
+        self._queue: deque = deque()
+        # Spectators only: whether the clock is waiting for our released messages to be written
+        self._released = False
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._drained = asyncio.Event()
+        self._drained.set()
+        self._task = asyncio.create_task(self._writer())
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._queue)
+
+    @property
+    def is_open(self) -> bool:
+        """True while the socket is connected and not being dropped"""
+        try:
+            return not self.closed and self.websocket.client_state == WebSocketState.CONNECTED
+        except Exception:
+            return False
+
+    def enqueue(self, frame, queued_at: Optional[float] = None):
+        """Queue a Frame (or legacy JSON text) without blocking; safe to call from any thread or loop"""
+        _call_on(self._loop, self._put, frame, time.perf_counter() if queued_at is None else queued_at)
+
+    def release(self, messages: List[tuple]) -> bool:
+        """Spectators: queue (frame, queued_at) messages unless the previous ones are still being written"""
+        if self._queue or not self._drained.is_set():
+            return False
+        self._queue.extend(messages)
+        self._released = True
+        self._drained.clear()
+        self._wakeup.set()
+        return True
+
+    async def send_text(self, text: str):
+        """Queue legacy JSON text; same signature as WebSocket.send_text for direct senders"""
+        self.enqueue(text)
+
+    async def send(self, message: Dict[str, Any]):
+        """Queue a message dict, encoded for this connection's protocol"""
+        self.enqueue(Frame(message))
+
+    def _encode(self, frame):
+        # Spectators, and connections that dropped messages, may have missed plies,
+        # so they get moves with the full position
+        if isinstance(frame, str):
+            if not self.protocol.compact:
+                return frame
+            frame = Frame(text=frame)
+        sync = self.spectator
+        if self._needs_sync and frame.message is not None and frame.message.get("type") == "move_made":
+            sync, self._needs_sync = True, False
+        return frame.encode(self.protocol, sync=sync)
+
+    def _put(self, frame, queued_at: float):
+        if self.closed:
+            return
+        if len(self._queue) >= self.max_queue:
+            if self.policy == "disconnect":
+                logger.warning(f"Closing slow WebSocket of {self.username or 'anonymous'} in game {self.game_id}")
+                self._stats.disconnects += 1
+                self._close_soon()
+                return
+            self._queue.popleft()
+            self._needs_sync = True
+            self._stats.drops += 1
+        self._queue.append((frame, queued_at))
+        self._drained.clear()
+        self._wakeup.set()
+        if not self.spectator and self._clock is not None:
+            self._clock.player_busy(self)
+
+    def _player_idle(self):
+        if self._clock is not None:
+            self._clock.player_idle(self)
+
+    async def _writer(self):
+        while not self.closed:
+            if not self._queue:
+                self._drained.set()
+                self._player_idle()
+                self._finish_release()
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            if self.spectator and not self._clock.players_idle.is_set():
+                await self._clock.players_idle.wait()
+                continue
+            frame, queued_at = self._queue.popleft()
+            try:
+                data = self._encode(frame)
+                # asyncio.timeout, unlike wait_for, does not wrap every send in a new task
+                async with asyncio.timeout(self.send_timeout):
+                    if isinstance(data, bytes):
+                        await self.websocket.send_bytes(data)
+                    else:
+                        await self.websocket.send_text(data)
+            except asyncio.TimeoutError:
+                logger.warning(f"WebSocket send timed out in game {self.game_id}, closing")
+                self._stats.disconnects += 1
+                self._close_soon()
+                return
+            except Exception:
+                # Socket already gone; the endpoint unregisters it
+                self.closed = True
+                self._player_idle()
+                self._finish_release()
+                return
+            self._stats.record_delivery(time.perf_counter() - queued_at, self.spectator, len(data))
+
+    def _finish_release(self):
+        if self._released:
+            self._released = False
+            self._clock.done()
+
+    async def flush(self, timeout: float = 1.0):
+        """Wait until everything queued so far was written (or the timeout passed)"""
+        try:
+            await asyncio.wait_for(self._drained.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def _close_soon(self):
+        """Stop sending and close the socket; the endpoint's receive loop then ends"""
+        self.closed = True
+        self._queue.clear()
+        self._player_idle()
+        self._finish_release()
+        self._wakeup.set()
+        self._drained.set()
+        self._loop.create_task(self._close_socket())
+
+    async def _close_socket(self):
+        try:
+            await self.websocket.close(code=1013)  # Try again later
+        except Exception:
+            pass
+
+    async def close(self):
+        """Stop the writer task; queued messages are discarded"""
+        self.closed = True
+        self._queue.clear()
+        self._player_idle()
+        self._finish_release()
+        self._task.cancel()
+        try:
+            await self._task
+        except (asyncio.CancelledError, Exception):
+            pass
+
+
+class ConnectionManager:
+    """Connections per game and per player, with non-blocking broadcast"""
+
+    def __init__(self, max_queue: int = 64, policy: str = "drop_oldest", send_timeout: float = 5.0,
+                 spectator_tick: float = 0.1, spectator_batch_size: int = 200):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown slow consumer policy {policy!r}, expected one of {POLICIES}")
+        self.max_queue = max_queue
+        self.policy = policy
+        self.send_timeout = send_timeout
+        self.spectator_tick = spectator_tick
+        self.spectator_batch_size = spectator_batch_size
+        self._clocks: Dict[asyncio.AbstractEventLoop, _SpectatorClock] = {}
+        self._tiers: Dict[str, Dict[asyncio.AbstractEventLoop, _SpectatorTier]] = {}
+        # Active connections per game, and the player connections among them
+        self.game_connections: Dict[str, Set[ClientConnection]] = {}
+        self.user_connections: Dict[str, Dict[str, ClientConnection]] = {}
+        # Connections per game that get every message queued directly (everything but spectators)
+        self._direct: Dict[str, Set[ClientConnection]] = {}
+        self._games: Dict[str, _GameStats] = {}
+
+    def connect(self, game_id: str, websocket, username: Optional[str] = None,
+                protocol: Optional[WireProtocol] = None) -> ClientConnection:
+        """Register a WebSocket (on its own event loop) and start its writer task"""
+        stats = self._games.setdefault(game_id, _GameStats())
+        connection = ClientConnection(websocket, game_id, username, stats,
+                                      self.max_queue, self.policy, self.send_timeout, protocol)
+        connection._clock = self._clock_for(connection._loop)
+        self.game_connections.setdefault(game_id, set()).add(connection)
+        self._direct.setdefault(game_id, set()).add(connection)
+        if username:
+            self.user_connections.setdefault(game_id, {})[username] = connection
+        return connection
+
+    def _clock_for(self, loop: asyncio.AbstractEventLoop) -> _SpectatorClock:
+        if loop not in self._clocks:
+            # Loops of finished test clients go away; keep only clocks of live loops
+            self._clocks = {l: c for l, c in self._clocks.items() if not l.is_closed()}
+            self._clocks[loop] = _SpectatorClock(self.spectator_tick, self.spectator_batch_size)
+        return self._clocks[loop]
+
+    def set_spectator(self, connection: ClientConnection, spectator: bool = True):
+        """Move a connection to (or out of) the coalesced, lower priority spectator tier"""
+        if spectator and connection._tier is None:
+            # Its own queued messages no longer hold back the other spectators
+            connection._player_idle()
+            loop = connection._loop
+            tiers = self._tiers.setdefault(connection.game_id, {})
+            if loop not in tiers:
+                tiers[loop] = _SpectatorTier(connection._clock, self._games[connection.game_id], loop)
+            connection._tier = tiers[loop]
+            connection._tier.add(connection)
+            self._direct.get(connection.game_id, set()).discard(connection)
+        elif not spectator and connection._tier is not None:
+            self._leave_tier(connection)
+            self._direct.setdefault(connection.game_id, set()).add(connection)
+        connection.spectator = spectator
+
+    def _leave_tier(self, connection: ClientConnection):
+        connection._finish_release()
+        tier, connection._tier = connection._tier, None
+        tier.spectators.pop(connection, None)
+        if not tier.spectators:
+            tiers = self._tiers.get(connection.game_id, {})
+            if tiers.get(tier.loop) is tier:
+                del tiers[tier.loop]
+            if not tiers:
+                self._tiers.pop(connection.game_id, None)
+
+    async def disconnect(self, connection: ClientConnection):
+        """Unregister a connection and stop its writer task"""
+        game_id = connection.game_id
+        if connection._tier is not None:
+            self._leave_tier(connection)
+        connections = self.game_connections.get(game_id)
+        if connections is not None:
+            connections.discard(connection)
+            if not connections:
+                del self.game_connections[game_id]
+                self._games.pop(game_id, None)
+        direct = self._direct.get(game_id)
+        if direct is not None:
+            direct.discard(connection)
+            if not direct:
+                del self._direct[game_id]
+        users = self.user_connections.get(game_id)
+        if connection.username and users and users.get(connection.username) is connection:
+            del users[connection.username]
+            if not users:
+                del self.user_connections[game_id]
+        await connection.close()
+
+    def get_user_connection(self, game_id: str, username: str) -> Optional[ClientConnection]:
+        """The open connection of a player in a game, if any"""
+        connection = self.user_connections.get(game_id, {}).get(username)
+        return connection if connection is not None and connection.is_open else None
+
+    def connected_users(self, game_id: str) -> Set[str]:
+        """Players with a registered connection to a game"""
+        return set(self.user_connections.get(game_id, {}))
+
+    def present_users(self) -> List[Tuple[str, str]]:
+        """(game_id, username) of every player connected to this worker"""
+        return [(game_id, username) for game_id, users in self.user_connections.items() for username in users]
+
+    def broadcast(self, game_id: str, frame, exclude=None, key: Optional[str] = None) -> int:
+        """
+        Queue a Frame (or legacy JSON text) on every connection of a game
+
+        Players get it queued first; spectators get it coalesced by key,
+        once per game and event loop rather than once per spectator.
+
+        Args:
+            exclude: WebSocket (or connection) that should not receive it
+            key: Coalescing key for spectators, normally the message type
+
+        Returns:
+            Number of connections the message was queued on
+        """
+        if game_id not in self.game_connections:
+            return 0
+        if isinstance(frame, str):
+            # Encoded for the compact protocols once, not once per connection
+            frame = Frame(text=frame)
+        queued_at = time.perf_counter()
+        count = 0
+        tiers = self._tiers.get(game_id, {})
+        # Only the players' connections are visited; spectators are reached through their tiers
+        for connection in list(self._direct.get(game_id, ())):
+            if connection is exclude or connection.websocket is exclude or connection.closed:
+                continue
+            connection.enqueue(frame, queued_at)
+            count += 1
+        for tier in list(tiers.values()):
+            tier.offer(key or "message", frame, queued_at)
+            count += len(tier.spectators)
+        self._games[game_id].broadcasts += 1
+        return count
+
+    def stats(self) -> Dict[str, Any]:
+        """Get queue depth, drops and fan-out latency per game"""
+        games = {}
+        for game_id, stats in self._games.items():
+            connections = self.game_connections.get(game_id, ())
+            games[game_id] = {
+                "connections": len(connections),
+                "queue_depth": sum(c.queue_depth for c in connections),
+                "max_queue_depth": max((c.queue_depth for c in connections), default=0),
+                "broadcasts": stats.broadcasts,
+                "delivered": stats.delivered,
+                "drops": stats.drops,
+                "disconnects": stats.disconnects,
+                "fanout_avg_ms": stats.total_latency / stats.delivered * 1000 if stats.delivered else 0.0,
+                "fanout_max_ms": stats.max_latency * 1000,
+                "spectators": sum(1 for c in connections if c.spectator),
+                "spectator_delivered": stats.spectator_delivered,
+                "spectator_coalesced": stats.coalesced,
+                "spectator_fanout_avg_ms": (stats.spectator_total_latency / stats.spectator_delivered * 1000
+                                            if stats.spectator_delivered else 0.0),
+                "spectator_fanout_max_ms": stats.spectator_max_latency * 1000,
+                "bytes_sent": stats.bytes_sent
+            }
+        return {
+            "policy": self.policy,
+            "max_queue": self.max_queue,
+            "connections": sum(len(c) for c in self.game_connections.values()),
+            "drops": sum(g["drops"] for g in games.values()),
+            "games": games
+        }
+
+
+# Global connection manager instance
+connection_manager = ConnectionManager(
+    max_queue=settings.WS_SEND_QUEUE_SIZE,
+    policy=settings.WS_SLOW_CONSUMER_POLICY,
+    send_timeout=settings.WS_SEND_TIMEOUT_SECONDS,
+    spectator_tick=settings.SPECTATOR_TICK_MS / 1000,
+    spectator_batch_size=settings.SPECTATOR_BATCH_SIZE
+)
+register_metrics("websocket_fanout", connection_manager.stats)
@@ -8,53 +8,49 @@ Handles:
 - WebSocket vs RabbitMQ routing
 """
 
-import uuid
-import random
-import string
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 from datetime import datetime, timezone
 
-from models.game_models import GameState, MoveResponse
+from core.metrics import register_metrics
+from core.settings import settings
+from models.game_models import GameState, GameSummary, MoveResponse
 from enums.game_enums import GameStatus, TimeControl
-from database.repository import GameRepository
+from database.repository import (
+    DuplicateGameIdError, GameRepository, StaleGameStateError, decode_page_cursor, encode_page_cursor,
+    get_repository
+)
 from message_queue.rabbitmq import rabbitmq_manager
-from utils.chess_utils import validate_and_apply_move, detect_game_end, get_turn_from_fen
+from utils.chess_executor import chess_executor
+from utils.board_cache import board_cache
+from utils.chess_utils import MoveOutcome
+from utils.game_ids import game_id_allocator
 
 
 class GameService:
     """Lightweight game service for chess games"""
     
-    def __init__(self):
-        self.repository = GameRepository()
-    
-    def _generate_short_id(self) -> str:
-        """Generate a short, human-readable game ID (8 characters)"""
-        return ''.join(random.choices(string.ascii_lowercase + string.digits, k=8))
+    def __init__(self, repository: Optional[GameRepository] = None):
+        self.repository = repository or get_repository()
+        self.move_conflicts = 0
+        self.move_conflict_rejections = 0
+        self.stale_rechecks = 0
     
     async def create_game(self, username: str, time_control: str) -> GameState:
         """Create a new chess game"""
-        # Generate a short, unique game ID
-        game_id = self._generate_short_id()
-        
-        # Ensure the ID is unique (very unlikely collision, but let's be safe)
+        # IDs are unique per worker; the unique _id catches the rare cross-worker collision
         max_attempts = 10
-        attempts = 0
-        while attempts < max_attempts:
-            existing_game = await self.repository.get_game(game_id)
-            if not existing_game:
-                break
-            game_id = self._generate_short_id()
-            attempts += 1
-        
-        game = GameState(
-            id=game_id,
-            player_white=username,
-            time_control=time_control,
-            status=GameStatus.WAITING
-        )
-        
-        await self.repository.save_game(game)
-        return game
+        for _ in range(max_attempts):
+            game = GameState(
+                id=game_id_allocator.next_id(),
+                player_white=username,
+                time_control=time_control,
+                status=GameStatus.WAITING
+            )
+            try:
+                return await self.repository.insert_game(game)
+            except DuplicateGameIdError:
+                game_id_allocator.record_collision()
+        raise ValueError("Could not allocate a game ID, please retry")
     
     async def join_game(self, game_id: str, username: str) -> GameState:
         """Join an existing game"""
@@ -83,38 +79,47 @@ class GameService:
         
         return game
     
-    async def make_move(self, game_id: str, username: str, move_uci: str) -> MoveResponse:
-        """Make a move in a game"""
-        game = await self.repository.get_game(game_id)
-        if not game:
-            return MoveResponse(success=False, error="Game not found")
-        
-        if game.status != GameStatus.IN_PROGRESS and game.status != GameStatus.IN_PROGRESS.value:
-            return MoveResponse(success=False, error="Game is not in progress")
-        
-        # Validate player turn
-        current_turn = get_turn_from_fen(game.current_fen)
-        if current_turn == "white" and username != game.player_white:
-            return MoveResponse(success=False, error="Not your turn (white to move)")
-        elif current_turn == "black" and username != game.player_black:
-            return MoveResponse(success=False, error="Not your turn (black to move)")
-        
-        # Validate and apply move
-        success, new_fen, error = validate_and_apply_move(game.current_fen, move_uci)
-        if not success:
-            return MoveResponse(success=False, error=error)
-        
-        # Update game state
-        game.fens.append(new_fen)
-        game.updated_at = datetime.now(timezone.utc)
+    async def make_move(self, game_id: str, username: str, move_uci: str,
+                        seq: Optional[int] = None) -> MoveResponse:
+        """
+        Make a move in a game
+        
+        The move is written conditionally on the game version it was
+        validated against. If another request wrote the game in between,
+        the move is revalidated against the fresh state up to
+        MOVE_CONFLICT_RETRIES times, then rejected.
+        
+        Moves are first checked against this worker's cached copy of the
+        game, which may miss moves made through other workers. A move it
+        rejects is checked once more against the stored game before the
+        rejection is returned.
+        
+        Args:
+            seq: Sequence number of a move sent on the WebSocket, stored with the move
+        """
+        fresh = False
+        attempt = 0
+        while True:
+            try:
+                game, outcome = await self._apply_move(game_id, username, move_uci, seq, fresh)
+            except StaleGameStateError:
+                attempt += 1
+                self.move_conflicts += 1
+                if attempt > settings.MOVE_CONFLICT_RETRIES:
+                    self.move_conflict_rejections += 1
+                    return MoveResponse(success=False, error="Game was modified concurrently, please retry")
+                continue
+            if outcome.success or fresh or game is None:
+                break
+            # Rejected against a possibly outdated cached copy: check against the stored game
+            self.stale_rechecks += 1
+            fresh = True
         
-        # Check for game end
-        game_ended, result = detect_game_end(new_fen)
-        if game_ended:
-            game.status = GameStatus.FINISHED
-            game.result = result
+        if not outcome.success:
+            return MoveResponse(success=False, error=outcome.error)
         
-        await self.repository.save_game(game)
+        new_fen = outcome.fen
+        game_ended, result = outcome.game_over, outcome.result
         
         # Handle real-time vs async communication
         move_response = MoveResponse(
@@ -125,17 +130,81 @@ class GameService:
         )
         
         # Always try WebSocket first, fallback to RabbitMQ for offline players
-        await self._handle_move_delivery(game_id, username, move_uci, new_fen, game_ended, result)
+        await self._handle_move_delivery(game, username, move_uci, new_fen, game_ended, result)
         
         return move_response
     
-    async def get_game(self, game_id: str) -> Optional[GameState]:
+    def stats(self) -> Dict[str, Any]:
+        """Get move write conflict counters"""
+        return {
+            "move_conflicts": self.move_conflicts,
+            "move_conflict_rejections": self.move_conflict_rejections,
+            "stale_rechecks": self.stale_rechecks
+        }
+    
+    async def _apply_move(self, game_id: str, username: str, move_uci: str, seq: Optional[int] = None,
+                          fresh: bool = False):
+        """Validate and persist one move; raises StaleGameStateError on a concurrent write"""
+        game = await self.repository.get_game(game_id, operation="make_move", fresh=fresh)
+        if not game:
+            return None, MoveOutcome(False, "Game not found")
+        
+        if game.status != GameStatus.IN_PROGRESS and game.status != GameStatus.IN_PROGRESS.value:
+            return game, MoveOutcome(False, "Game is not in progress")
+        
+        # Live board for this game, pushed in place instead of reparsing the FEN
+        board = board_cache.get_board(game)
+        
+        # Turn check, legality, push and end detection in a single pass
+        side = "white" if username == game.player_white else "black" if username == game.player_black else None
+        outcome = await chess_executor.process_move(board, move_uci, side, game.position_counts,
+                                                    settings.THREEFOLD_REPETITION_ENDS_GAME)
+        if not outcome.success:
+            return game, outcome
+        
+        # Update game state
+        game.record_move(outcome.move, outcome.fen)
+        if seq is not None:
+            game.move_seqs[username] = (seq, outcome.move)
+        game.updated_at = datetime.now(timezone.utc)
+        if outcome.game_over:
+            game.status = GameStatus.FINISHED
+            game.result = outcome.result
+        
+        try:
+            await self.repository.append_move(game)
+        except BaseException:
+            # The cached board is ahead of what was persisted (also when the request was cancelled)
+            board_cache.invalidate(game_id, board)
+            raise
+        
+        if outcome.game_over:
+            board_cache.invalidate(game_id, board)
+        else:
+            board_cache.commit(game_id, game.ply, board)
+        return game, outcome
+    
+    async def get_game(self, game_id: str, operation: str = "get_game") -> Optional[GameState]:
         """Get a game by ID"""
-        return await self.repository.get_game(game_id)
+        return await self.repository.get_game(game_id, operation=operation)
+    
+    async def list_user_games(self, username: str, limit: int = 50,
+                              cursor: Optional[str] = None) -> Tuple[List[GameSummary], Optional[str]]:
+        """Get one page of a user's games and the cursor of the next page (None on the last page)"""
+        after = decode_page_cursor(cursor) if cursor else None
+        games = await self.repository.get_user_game_summaries(username, limit=limit + 1, after=after)
+        if len(games) <= limit:
+            return games, None
+        games = games[:limit]
+        return games, encode_page_cursor(games[-1])
     
-    async def list_user_games(self, username: str) -> List[GameState]:
-        """Get all games for a user"""
-        return await self.repository.get_user_games(username)
+    async def list_all_user_games(self, username: str, page_size: int = 200) -> List[GameSummary]:
+        """Get every game of a user, most recent first, walking the keyset pages"""
+        games, cursor = await self.list_user_games(username, limit=page_size)
+        while cursor:
+            page, cursor = await self.list_user_games(username, limit=page_size, cursor=cursor)
+            games += page
+        return games
     
     async def _broadcast_game_joined(self, game_id: str, player_white: str, player_black: str):
         """Broadcast game joined event via WebSocket"""
@@ -153,16 +222,12 @@ class GameService:
             # Log error but don't fail the join
             print(f"Failed to broadcast game joined via WebSocket: {e}")
 
-    async def _handle_move_delivery(self, game_id: str, username: str, move_uci: str, fen: str, game_ended: bool, result: str = None):
+    async def _handle_move_delivery(self, game: GameState, username: str, move_uci: str, fen: str, game_ended: bool, result: str = None):
         """Handle move delivery with WebSocket primary and RabbitMQ fallback"""
+        game_id = game.id
         try:
             from routers.websocket import is_user_connected, broadcast_to_game
             
-            # Get the game to determine the opponent
-            game = await self.repository.get_game(game_id)
-            if not game:
-                return
-            
             # Determine the opponent
             opponent = game.player_black if username == game.player_white else game.player_white
             if not opponent:
@@ -174,6 +239,7 @@ class GameService:
                 "game_id": game_id,
                 "username": username,
                 "move": move_uci,
+                "ply": game.ply,
                 "fen": fen,
                 "timestamp": datetime.now(timezone.utc).isoformat()
             }
@@ -291,7 +357,7 @@ class GameService:
         game.result = result
         game.updated_at = datetime.now(timezone.utc)
         
-        await self.repository.save_game(game)
+        await self.repository.update_status(game)
         
         # Broadcast game end
         try:
@@ -374,7 +440,7 @@ class GameService:
         game.result = "1/2-1/2"
         game.updated_at = datetime.now(timezone.utc)
         
-        await self.repository.save_game(game)
+        await self.repository.update_status(game)
         
         # Broadcast game end to both players
         try:
@@ -437,3 +503,4 @@ class GameService:
 
 # Global service instance
 game_service = GameService()
+register_metrics("game_service", game_service.stats)
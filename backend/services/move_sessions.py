@@ -0,0 +1,135 @@
+"""
+Move Sessions - Sequence numbers, acks and retransmit dedup for WebSocket moves
+
+Players can send make_move messages on their game socket instead of
+POSTing every move. Each carries a client sequence number (increasing
+per client session of a player in a game), and the answer is a
+move_ack or move_nack with the same number:
+- A retransmit of a move that was already answered gets the same answer
+  again, without applying the move twice (the last WS_MOVE_DEDUP_WINDOW
+  answers are kept per player and game)
+- A retransmit that arrives while the move is still being applied (e.g.
+  on the new socket after a reconnect) waits for the same result
+- Numbers not above the last one seen and no longer in the window are
+  nacked as stale
+- Rejected moves are answered like any other; a move that failed
+  unexpectedly is not remembered, so it can be retried with the same
+  number
+
+A client session is named by the client (?session= when connecting) so
+it survives reconnects; a client that reloads picks a new name and
+starts its numbers over. Sockets without a name get a session of their
+own. Sessions are kept in process for the WS_MOVE_SESSIONS most recently
+active (game, player, session) keys. They do not follow a player to another
+worker: there, a retransmit of the last move is recognised from the seq
+and move stored with the game (GameState.move_seqs, see routers/websocket.py).
+"""
+
+import asyncio
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+from core.metrics import register_metrics
+from core.settings import settings
+
+Answer = Dict[str, Any]
+
+
+class _Session:
+    """Sequence state of one client session of a player in a game"""
+
+    def __init__(self):
+        self.last_seq = -1
+        self.answers: "OrderedDict[int, Answer]" = OrderedDict()
+        self.pending: Dict[int, asyncio.Future] = {}
+
+
+class MoveSessions:
+    """Per (game, player, session) sequence numbers and recent answers of WebSocket moves"""
+
+    def __init__(self, window: int = 32, max_sessions: int = 10000):
+        self.window = window
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[Tuple[str, str, str], _Session]" = OrderedDict()
+        self.applied = 0
+        self.duplicates = 0
+        self.stale = 0
+
+    def _session(self, game_id: str, username: str, session_id: str) -> _Session:
+        key = (game_id, username, session_id)
+        session = self._sessions.get(key)
+        if session is None:
+            session = self._sessions[key] = _Session()
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        self._sessions.move_to_end(key)
+        return session
+
+    async def submit(self, game_id: str, username: str, seq: int,
+                     apply: Callable[[], Awaitable[Answer]], session_id: str = "") -> Answer:
+        """
+        Apply a numbered move once and return its answer
+
+        Args:
+            session_id: Client session the numbers belong to
+            apply: Makes the move and returns the answer (without the seq);
+                raising means the move may be retried with the same number
+
+        Returns:
+            The answer of this number, fresh or remembered
+        """
+        session = self._session(game_id, username, session_id)
+        answer = session.answers.get(seq)
+        if answer is not None:
+            self.duplicates += 1
+            return answer
+        pending = session.pending.get(seq)
+        if pending is not None:
+            self.duplicates += 1
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise
+                return {"type": "move_nack", "seq": seq, "error": "Move was interrupted, please retry"}
+        if seq <= session.last_seq:
+            self.stale += 1
+            return {"type": "move_nack", "seq": seq, "error": "Stale sequence number"}
+
+        previous, session.last_seq = session.last_seq, seq
+        future = asyncio.get_running_loop().create_future()
+        session.pending[seq] = future
+        try:
+            answer = {**await apply(), "seq": seq}
+        except BaseException as e:
+            if session.last_seq == seq:
+                session.last_seq = previous
+            if isinstance(e, Exception):
+                future.set_exception(e)
+                # Retrieved here so a failure nobody waited for is not logged as unhandled
+                future.exception()
+            else:
+                future.cancel()
+            raise
+        finally:
+            session.pending.pop(seq, None)
+        self.applied += 1
+        session.answers[seq] = answer
+        while len(session.answers) > self.window:
+            session.answers.popitem(last=False)
+        future.set_result(answer)
+        return answer
+
+    def stats(self) -> Dict[str, Any]:
+        """Get session count and dedup counters"""
+        return {
+            "sessions": len(self._sessions),
+            "applied": self.applied,
+            "duplicates": self.duplicates,
+            "stale": self.stale
+        }
+
+
+# Global move sessions instance
+move_sessions = MoveSessions(window=settings.WS_MOVE_DEDUP_WINDOW, max_sessions=settings.WS_MOVE_SESSIONS)
+register_metrics("websocket_moves", move_sessions.stats)
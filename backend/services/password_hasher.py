@@ -0,0 +1,120 @@
+"""
+Password Hasher - bcrypt off the event loop with bounded concurrency
+
+bcrypt is deliberately slow (hundreds of milliseconds per hash at the
+default cost). Run inline in an async handler it stalls every live game
+on the worker, so hashing and verification run on a small thread pool
+(the bcrypt library releases the GIL):
+- At most BCRYPT_WORKERS hashes run at once and BCRYPT_MAX_QUEUE more may
+  wait; beyond that requests are shed with PasswordHasherBusyError
+- The cost factor is BCRYPT_ROUNDS; hashes made with any other cost are
+  flagged by verify_and_update so they can be rehashed on login
+- Hash latency, queue depth and shed requests are exposed on /metrics
+"""
+
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+from passlib.context import CryptContext
+
+from core.metrics import register_metrics
+from core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class PasswordHasherBusyError(Exception):
+    """Raised when too many hashes are already running or queued"""
+
+
+class PasswordHasher:
+    """Bounded thread pool for bcrypt hashing and verification"""
+
+    def __init__(self, rounds: int = 12, workers: int = 2, max_queue: int = 32):
+        self.rounds = rounds
+        self.workers = workers
+        self.max_queue = max_queue
+        # min == max == default, so hashes made with any other cost need an update
+        self.context = CryptContext(
+            schemes=["bcrypt"], deprecated="auto",
+            bcrypt__default_rounds=rounds, bcrypt__min_rounds=rounds, bcrypt__max_rounds=rounds
+        )
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.rejected = 0
+        self.rehashes = 0
+        self.operations = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    async def _run(self, func, *args):
+        """Run a bcrypt call on the pool, shedding load when the queue is full"""
+        if self.in_flight >= self.workers + self.max_queue:
+            self.rejected += 1
+            raise PasswordHasherBusyError("Too many concurrent password operations")
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        start = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._pool, func, *args)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.in_flight -= 1
+            self.operations += 1
+            self.total_seconds += elapsed
+            self.max_seconds = max(self.max_seconds, elapsed)
+
+    async def hash(self, password: str) -> str:
+        """Hash a password with the configured cost"""
+        return await self._run(self.context.hash, password)
+
+    async def verify_and_update(self, password: str, password_hash: str) -> Tuple[bool, Optional[str]]:
+        """
+        Verify a password against its hash
+
+        Returns:
+            (valid, new_hash) where new_hash is set when the stored hash used
+            a different cost and should be replaced
+        """
+        valid, new_hash = await self._run(self.context.verify_and_update, password, password_hash)
+        if new_hash is not None:
+            self.rehashes += 1
+        return valid, new_hash
+
+    def shutdown(self):
+        """Stop the hashing threads"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Get queue depth, shed requests and hash latency"""
+        return {
+            "rounds": self.rounds,
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "queue_depth": max(0, self.in_flight - self.workers),
+            "peak_in_flight": self.peak_in_flight,
+            "rejected": self.rejected,
+            "rehashes": self.rehashes,
+            "operations": self.operations,
+            "avg_ms": self.total_seconds / self.operations * 1000 if self.operations else 0.0,
+            "max_ms": self.max_seconds * 1000
+        }
+
+
+# Global password hasher instance
+password_hasher = PasswordHasher(
+    rounds=settings.BCRYPT_ROUNDS,
+    workers=settings.BCRYPT_WORKERS,
+    max_queue=settings.BCRYPT_MAX_QUEUE
+)
+register_metrics("password_hasher", password_hasher.stats)
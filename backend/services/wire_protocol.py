@@ -0,0 +1,214 @@
+"""
+Wire Protocol - Encodings of the messages sent to WebSocket clients
+
+Messages are built as dicts (the legacy JSON format) and encoded per
+connection when they are written, once per protocol and broadcast:
+- "json" (default, existing clients): the dict as JSON text; no
+  subprotocol needed
+- "chess.v1.json": compact JSON text frames. Short type codes and keys,
+  no repeated game_id, usernames only where needed, and integer
+  millisecond clocks instead of ISO timestamps. A move is a delta
+  (UCI + ply + clock); the full FEN is only sent on sync: game_state,
+  moves without a ply, moves to spectators, whose coalesced stream may
+  skip plies, and the first move after a slow connection dropped messages
+- "chess.v1.msgpack": the same messages as MessagePack binary frames;
+  only offered when the optional msgpack package is installed
+
+Clients choose with ?protocol=<name> or the Sec-WebSocket-Protocol
+header (the first supported name wins). Unknown or unavailable names
+fall back to the compact JSON protocol (for msgpack) or the legacy one.
+"""
+
+import json
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional, Tuple, Union
+
+try:
+    import msgpack
+except ImportError:  # Optional dependency: binary frames are not offered without it
+    msgpack = None
+
+LEGACY = "json"
+COMPACT_JSON = "chess.v1.json"
+COMPACT_MSGPACK = "chess.v1.msgpack"
+VERSION = 1
+
+# Message types and keys of the compact protocol
+TYPE_CODES = {
+    "game_state": "s",
+    "move_made": "m",
+    "game_joined": "j",
+    "game_ended": "e",
+    "draw_offered": "do",
+    "draw_declined": "dd",
+    "error": "x",
+    "make_move": "mm",
+    "move_ack": "ma",
+    "move_nack": "mn"
+}
+KEY_CODES = {
+    "fen": "f",
+    "ply": "p",
+    "move": "u",
+    "status": "st",
+    "player_white": "w",
+    "player_black": "b",
+    "time_control": "tc",
+    "result": "r",
+    "username": "n",
+    "message": "msg",
+    "seq": "q",
+    "game_over": "go",
+    "error": "er"
+}
+TYPE_NAMES = {code: name for name, code in TYPE_CODES.items()}
+KEY_NAMES = {code: name for name, code in KEY_CODES.items()}
+
+Encoded = Union[str, bytes]
+
+# Reused: json.dumps builds a new encoder whenever separators are passed
+_dumps_compact = json.JSONEncoder(separators=(",", ":")).encode
+
+
+def _clock_ms(timestamp: str) -> Optional[int]:
+    try:
+        return int(datetime.fromisoformat(timestamp).timestamp() * 1000)
+    except (TypeError, ValueError):
+        return None
+
+
+def compact_message(message: Dict[str, Any], sync: bool = False) -> Dict[str, Any]:
+    """
+    Convert a legacy message to the compact form
+
+    Args:
+        sync: Always include the full FEN in moves (for receivers that may have missed plies)
+    """
+    message_type = message.get("type")
+    result: Dict[str, Any] = {"t": TYPE_CODES.get(message_type, message_type)}
+    delta = message_type == "move_made" and not sync and message.get("ply") is not None
+    for key, value in message.items():
+        if key in ("type", "game_id"):
+            continue
+        if key == "timestamp":
+            clock = _clock_ms(value)
+            if clock is not None:
+                result["c"] = clock
+            continue
+        if delta and key in ("fen", "username"):
+            # The mover follows from the ply; the position from the previous one
+            continue
+        result[KEY_CODES.get(key, key)] = value
+    if message_type == "game_state":
+        result["v"] = VERSION
+    return result
+
+
+def expand_message(message: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a compact client message to the legacy form; legacy messages pass through"""
+    if "t" not in message or "type" in message:
+        return message
+    result = {"type": TYPE_NAMES.get(message["t"], message["t"])}
+    for key, value in message.items():
+        if key != "t":
+            result[KEY_NAMES.get(key, key)] = value
+    return result
+
+
+class WireProtocol:
+    """One wire format; encode() turns a legacy message dict into a frame"""
+
+    def __init__(self, name: str, binary: bool = False, compact: bool = False):
+        self.name = name
+        self.binary = binary
+        self.compact = compact
+
+    def encode(self, message: Dict[str, Any], sync: bool = False) -> Encoded:
+        if not self.compact:
+            return json.dumps(message)
+        body = compact_message(message, sync)
+        if self.binary:
+            return msgpack.packb(body)
+        return _dumps_compact(body)
+
+    def decode(self, data: Encoded) -> Dict[str, Any]:
+        """Parse a client frame into a legacy message dict"""
+        if isinstance(data, bytes):
+            if msgpack is None:
+                raise ValueError("Binary frames are not supported")
+            message = msgpack.unpackb(data)
+        else:
+            message = json.loads(data)
+        return expand_message(message) if self.compact else message
+
+
+PROTOCOLS: Dict[str, WireProtocol] = {
+    LEGACY: WireProtocol(LEGACY),
+    COMPACT_JSON: WireProtocol(COMPACT_JSON, compact=True)
+}
+if msgpack is not None:
+    PROTOCOLS[COMPACT_MSGPACK] = WireProtocol(COMPACT_MSGPACK, binary=True, compact=True)
+
+
+def negotiate(requested: Optional[str], subprotocols: Iterable[str] = ()) -> Tuple[WireProtocol, Optional[str]]:
+    """
+    Pick the protocol of a new connection
+
+    Args:
+        requested: Value of the ?protocol= query parameter
+        subprotocols: Names offered in the Sec-WebSocket-Protocol header
+
+    Returns:
+        The protocol, and the subprotocol to accept (None when chosen by query parameter)
+    """
+    for name in subprotocols:
+        if name in PROTOCOLS:
+            return PROTOCOLS[name], name
+    if requested == COMPACT_MSGPACK and requested not in PROTOCOLS:
+        return PROTOCOLS[COMPACT_JSON], None
+    return PROTOCOLS.get(requested, PROTOCOLS[LEGACY]), None
+
+
+class Frame:
+    """
+    A message on its way to many connections, encoded lazily once per protocol
+
+    Built from a dict, or from legacy JSON text (broadcasts from other
+    workers, pending moves); plain text that is not JSON is sent as is.
+    """
+
+    __slots__ = ("_text", "_message", "_encoded")
+
+    def __init__(self, message: Optional[Dict[str, Any]] = None, text: Optional[str] = None):
+        self._message = message
+        self._text = text
+        self._encoded: Dict[Tuple[str, bool], Encoded] = {}
+
+    @property
+    def text(self) -> str:
+        """The legacy JSON text"""
+        if self._text is None:
+            self._text = json.dumps(self._message)
+        return self._text
+
+    @property
+    def message(self) -> Optional[Dict[str, Any]]:
+        if self._message is None:
+            try:
+                parsed = json.loads(self._text)
+            except ValueError:
+                return None
+            self._message = parsed if isinstance(parsed, dict) else None
+        return self._message
+
+    def encode(self, protocol: WireProtocol, sync: bool = False) -> Encoded:
+        """The frame for a protocol; legacy receivers get the text unchanged"""
+        if not protocol.compact:
+            return self.text
+        key = (protocol.name, sync)
+        encoded = self._encoded.get(key)
+        if encoded is None:
+            message = self.message
+            encoded = self.text if message is None else protocol.encode(message, sync)
+            self._encoded[key] = encoded
+        return encoded
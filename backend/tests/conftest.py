@@ -2,6 +2,7 @@
 Test configuration and fixtures for backend tests
 """
 
+import asyncio
 import pytest
 import os
 from datetime import datetime, timedelta, timezone
@@ -49,3 +50,19 @@ def black_player():
         "username": "BlackPlayer", 
         "headers": {"Authorization": f"Bearer {token}"}
     }
+
+
+class FakeSocket:
+    """WebSocket stand-in that records messages, optionally taking a while per send"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.sent = []
+        self.close_code = None
+
+    async def send_text(self, text: str):
+        await asyncio.sleep(self.delay)
+        self.sent.append(text)
+
+    async def close(self, code: int = 1000):
+        self.close_code = code
@@ -0,0 +1,68 @@
+"""
+Test the cold archive tier
+
+Tests: packed move round trip -> archiver moves finished games and resumes -> reads fall through to the archive
+"""
+
+import asyncio
+
+from database.archive import GameArchiver, archive_document, game_from_archive, pack_moves, unpack_moves
+from database.repository import GameRepository
+from services.game_service import GameService
+
+
+async def finished_game(service: GameService, moves):
+    """Play the given moves and resign, returning the finished game"""
+    game = await service.create_game("WhitePlayer", "5+3")
+    await service.join_game(game.id, "BlackPlayer")
+    for i, move in enumerate(moves):
+        await service.make_move(game.id, "WhitePlayer" if i % 2 == 0 else "BlackPlayer", move)
+    await service.leave_game(game.id, "BlackPlayer")
+    return await service.get_game(game.id)
+
+
+def test_archive_document_round_trip():
+    """Archived games restore the same moves, checkpoints and repetition index"""
+    async def run():
+        service = GameService(GameRepository(in_memory=True))
+        return await finished_game(service, ["g1f3", "g8f6", "f3g1", "f6g8", "g1f3", "g8f6"])
+
+    game = asyncio.run(run())
+    game.checkpoint_interval = 2
+    game.checkpoints = game.fens[2::2]
+    document = archive_document(game, game.updated_at)
+    restored = game_from_archive(document)
+
+    assert unpack_moves(pack_moves([0, 1, 0x7FFF])) == [0, 1, 0x7FFF]
+    assert "fens" not in document and "checkpoints" not in document
+    assert restored.moves == game.moves
+    assert restored.checkpoints == game.checkpoints
+    assert restored.current_fen == game.current_fen
+    assert restored.position_counts == game.position_counts
+
+
+def test_archiver_moves_finished_games_and_resumes():
+    """Only finished games are archived, batch by batch, and reads fall through to the archive"""
+    async def run():
+        repository = GameRepository(in_memory=True)
+        service = GameService(repository)
+        finished = [await finished_game(service, ["e2e4", "e7e5"]) for _ in range(3)]
+        live = await service.create_game("WhitePlayer", "5+3")
+
+        archiver = GameArchiver(min_age_seconds=0, batch_size=2)
+        first_batch = await archiver.run_batch(repository)
+        # A fresh archiver resumes from the saved checkpoint
+        resumed = GameArchiver(min_age_seconds=0, batch_size=2)
+        await resumed.run(repository)
+
+        game = await service.get_game(finished[0].id)
+        listing, _ = await service.list_user_games("WhitePlayer", limit=10)
+        return repository.memory, finished, live, first_batch, resumed, game, listing
+
+    store, finished, live, first_batch, resumed, game, listing = asyncio.run(run())
+    assert first_batch == 2
+    assert resumed.archived == 1 and resumed.stats()["compression_ratio"] > 1
+    assert all(store.get_game(g.id) is None and store.get_archived(g.id) for g in finished)
+    assert store.get_game(live.id) is not None
+    assert game.moves == finished[0].moves and game.status == "finished"
+    assert {g.id for g in listing} == {g.id for g in finished} | {live.id}
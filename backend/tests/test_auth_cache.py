@@ -0,0 +1,63 @@
+"""
+Test the authentication caches
+
+Tests: token cached until exp -> user lookups served from cache -> invalidation hooks
+"""
+
+import asyncio
+import time
+
+from fastapi.security import HTTPAuthorizationCredentials
+
+from database.repository import GameRepository
+from models.user_models import UserCreate
+from services.auth_cache import AuthCache, auth_cache
+from services.auth_service import AuthService
+from tests.conftest import create_test_token
+
+
+def test_token_kept_until_exp():
+    """A verified token is served from the cache only until its own expiry"""
+    cache = AuthCache(max_tokens=10)
+    cache.put_token("live", "WhitePlayer", time.time() + 60)
+    cache.put_token("expired", "BlackPlayer", time.time() - 1)
+
+    assert cache.get_token_subject("live") == "WhitePlayer"
+    assert cache.get_token_subject("expired") is None
+    assert cache.stats()["tokens"]["hits"] == 1
+
+
+def test_authenticated_request_skips_user_lookup():
+    """After the first request, token and user come from the caches"""
+    class CountingRepository(GameRepository):
+        lookups = 0
+
+        async def find_one(self, collection_name, query):
+            CountingRepository.lookups += 1
+            return await super().find_one(collection_name, query)
+
+    async def run():
+        auth_cache.clear()
+        service = AuthService(CountingRepository(in_memory=True))
+        await service.create_user(UserCreate(username="CachedPlayer", password="secret123"))
+        lookups_before = CountingRepository.lookups
+        credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=create_test_token("CachedPlayer"))
+        for _ in range(5):
+            user = await service.get_current_user(credentials)
+        return user, CountingRepository.lookups - lookups_before
+
+    user, lookups = asyncio.run(run())
+    assert user.username == "CachedPlayer"
+    assert lookups == 1
+
+
+def test_invalidate_user_drops_user_and_tokens():
+    """Invalidation removes the user and, on request, every token issued to it"""
+    cache = AuthCache()
+    cache.put_token("t1", "WhitePlayer", time.time() + 60)
+    cache.put_token("t2", "BlackPlayer", time.time() + 60)
+
+    cache.invalidate_user("WhitePlayer", revoke_tokens=True)
+
+    assert cache.get_token_subject("t1") is None
+    assert cache.get_token_subject("t2") == "BlackPlayer"
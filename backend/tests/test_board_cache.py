@@ -0,0 +1,98 @@
+"""
+Test the live board cache
+
+Tests: hit/miss counting -> stale ply rebuild -> interleaved pushes -> LRU and idle eviction
+"""
+
+import chess
+
+from models.game_models import GameState
+from utils.board_cache import BoardCache
+from utils.chess_utils import pack_move
+
+
+def make_game(game_id: str, moves=()) -> GameState:
+    """Build a game whose FEN history follows the given UCI moves"""
+    board = chess.Board()
+    fens = [board.fen()]
+    for move in moves:
+        board.push_uci(move)
+        fens.append(board.fen())
+    return GameState(id=game_id, player_white="WhitePlayer", time_control="5+3", fens=fens)
+
+
+def test_hit_after_commit():
+    """A committed push is served from the cache on the next move"""
+    cache = BoardCache(max_games=10, idle_seconds=0)
+    game = make_game("g1")
+
+    board = cache.get_board(game)
+    board.push_uci("e2e4")
+    game.record_move(pack_move(board.peek()), board.fen())
+    cache.commit(game.id, game.ply, board)
+
+    assert cache.get_board(game) is board
+    assert cache.hits == 1
+    assert cache.misses == 1
+
+
+def test_rebuild_when_ply_is_stale():
+    """A game advanced elsewhere is rebuilt from its FEN history"""
+    cache = BoardCache(max_games=10, idle_seconds=0)
+    cache.get_board(make_game("g1"))
+
+    advanced = make_game("g1", ["e2e4", "e7e5"])
+    board = cache.get_board(advanced)
+
+    assert board.fen() == advanced.current_fen
+    assert cache.misses == 2
+
+
+def test_interleaved_pushes_do_not_share_a_board():
+    """A request missing the cache while another push is in flight cannot make its board current"""
+    cache = BoardCache(max_games=10, idle_seconds=0)
+    game = make_game("g1")
+
+    # Request A pushes onto the cached board; request B reads the same ply before A commits
+    board_a = cache.get_board(game)
+    board_a.push_uci("e2e4")
+    board_b = cache.get_board(game)
+    assert board_b is not board_a
+    board_b.push_uci("d2d4")
+
+    # A persisted e2e4, B then lost the version check; B's commit/invalidate must not touch A's entry
+    cache.commit(game.id, 1, board_b)
+    cache.invalidate(game.id, board_b)
+    game.record_move(pack_move(board_a.peek()), board_a.fen())
+    cache.commit(game.id, game.ply, board_a)
+
+    served = cache.get_board(game)
+    assert served is board_a and served.fen() == game.current_fen
+    assert cache.hits == 1
+
+
+def test_lru_bound():
+    """The least recently used board is evicted beyond the size bound"""
+    cache = BoardCache(max_games=2, idle_seconds=0)
+    games = [make_game(f"g{i}") for i in range(3)]
+    for game in games:
+        cache.get_board(game)
+
+    stats = cache.stats()
+    assert stats["size"] == 2
+    assert stats["evictions"] == 1
+
+    cache.get_board(games[0])
+    assert cache.misses == 4
+
+
+def test_idle_eviction():
+    """Boards idle for longer than the limit are dropped"""
+    cache = BoardCache(max_games=10, idle_seconds=60)
+    cache.get_board(make_game("g1"))
+    cache._entries["g1"].last_used -= 120
+
+    cache.get_board(make_game("g2"))
+
+    assert "g1" not in cache._entries
+    assert cache.evictions == 1
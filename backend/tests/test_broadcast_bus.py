@@ -0,0 +1,225 @@
+"""
+Test the cross-worker broadcast bus
+
+Tests: broadcasts reach subscribed workers only -> presence follows workers
+-> RabbitMQ bus over an in-memory broker -> backends must implement publishing -> RabbitMQ delivery between processes
+"""
+
+import asyncio
+import multiprocessing
+import socket
+import time
+import uuid
+from types import SimpleNamespace
+from urllib.parse import urlparse
+
+import aio_pika
+import pytest
+
+from core.settings import settings
+from services.broadcast_bus import BroadcastBus, InProcessBus, InProcessHub, RabbitMQBus
+from services.connection_manager import ConnectionManager
+from tests.conftest import FakeSocket
+
+
+def test_broadcast_reaches_subscribed_workers_only():
+    """A broadcast on worker A reaches sockets on worker B; unsubscribed worker C gets nothing"""
+    async def run():
+        hub = InProcessHub()
+        workers = []
+        for _ in range(3):
+            manager, bus = ConnectionManager(), InProcessBus(hub)
+            await bus.start(manager.broadcast, manager.present_users)
+            workers.append((manager, bus))
+        (_, bus_a), (manager_b, bus_b), (_, bus_c) = workers
+
+        socket_b = FakeSocket()
+        manager_b.connect("game", socket_b, "BlackPlayer")
+        await bus_b.subscribe("game")
+        await bus_a.publish("game", "move 1")
+        await asyncio.sleep(0.01)
+        return socket_b, bus_b, bus_c
+
+    socket_b, bus_b, bus_c = asyncio.run(run())
+    assert socket_b.sent == ["move 1"]
+    assert bus_b.received == 1 and bus_c.received == 0
+
+
+def test_presence_follows_workers():
+    """Players connected elsewhere are present, also for late workers, until their worker stops"""
+    async def run():
+        hub = InProcessHub()
+        manager_b, bus_b = ConnectionManager(), InProcessBus(hub)
+        await bus_b.start(manager_b.broadcast, manager_b.present_users)
+        manager_b.connect("game", FakeSocket(), "BlackPlayer")
+        await bus_b.announce_presence("game", "BlackPlayer", True)
+
+        # Worker A starts later and learns the presence from B's snapshot
+        manager_a, bus_a = ConnectionManager(), InProcessBus(hub)
+        await bus_a.start(manager_a.broadcast, manager_a.present_users)
+        await asyncio.sleep(0.01)
+        present = bus_a.is_present("game", "BlackPlayer"), bus_a.present_users("game")
+        await bus_b.stop()
+        return present, bus_a.is_present("game", "BlackPlayer")
+
+    (present, users), after_stop = asyncio.run(run())
+    assert present and users == {"BlackPlayer"}
+    assert not after_stop
+
+
+class FakeBroker:
+    """RabbitMQ stand-in: one exchange routing serialized messages to the queues bound to their key"""
+
+    def __init__(self):
+        self.queues = []
+
+    async def connect_robust(self, url):
+        return FakeConnection(self)
+
+
+class FakeConnection:
+    """Connection, channel and exchange of one worker on the fake broker"""
+
+    def __init__(self, broker: FakeBroker):
+        self.broker = broker
+        self.queues = []
+        self.is_closed = False
+
+    async def channel(self):
+        return self
+
+    async def declare_exchange(self, name, kind, durable=False):
+        return self
+
+    async def declare_queue(self, exclusive=False, auto_delete=False):
+        queue = FakeQueue()
+        self.queues.append(queue)
+        self.broker.queues.append(queue)
+        return queue
+
+    async def publish(self, message, routing_key):
+        # Delivered later and as bytes, like a message that went through the server
+        body = bytes(message.body)
+        for queue in self.broker.queues:
+            if routing_key in queue.keys and queue.consumer is not None:
+                asyncio.get_running_loop().create_task(queue.consumer(SimpleNamespace(body=body)))
+
+    async def close(self):
+        self.is_closed = True
+        for queue in self.queues:
+            self.broker.queues.remove(queue)
+
+
+class FakeQueue:
+    def __init__(self):
+        self.keys = set()
+        self.consumer = None
+
+    async def bind(self, exchange, routing_key):
+        self.keys.add(routing_key)
+
+    async def unbind(self, exchange, routing_key):
+        self.keys.discard(routing_key)
+
+    async def consume(self, callback, no_ack=False):
+        self.consumer = callback
+
+
+def test_rabbitmq_bus_over_fake_broker(monkeypatch):
+    """Two workers on the RabbitMQ bus exchange broadcasts and presence through a shared broker"""
+    monkeypatch.setattr(aio_pika, "connect_robust", FakeBroker().connect_robust)
+
+    async def run():
+        manager_b, bus_b = ConnectionManager(), RabbitMQBus()
+        await bus_b.start(manager_b.broadcast, manager_b.present_users)
+        socket_b = FakeSocket()
+        manager_b.connect("game", socket_b, "BlackPlayer")
+        await bus_b.subscribe("game")
+        await bus_b.announce_presence("game", "BlackPlayer", True)
+
+        # Worker A starts later and learns the presence from B's snapshot
+        manager_a, bus_a = ConnectionManager(), RabbitMQBus()
+        await bus_a.start(manager_a.broadcast, manager_a.present_users)
+        await asyncio.sleep(0.01)
+        present = bus_a.present_users("game")
+
+        await bus_a.publish("game", '{"type": "move_made", "ply": 1}', key="move_made")
+        await bus_a.publish("other-game", '{"type": "move_made", "other": true}')
+        await asyncio.sleep(0.01)
+        await bus_b.unsubscribe("game")
+        await bus_a.publish("game", '{"type": "move_made", "ply": 2}', key="move_made")
+        await asyncio.sleep(0.01)
+
+        await bus_b.stop()
+        await asyncio.sleep(0.01)
+        after_stop = bus_a.is_present("game", "BlackPlayer")
+        await bus_a.stop()
+        return present, socket_b.sent, bus_b.received, after_stop
+
+    present, sent, received, after_stop = asyncio.run(run())
+    assert present == {"BlackPlayer"}
+    assert sent == ['{"type": "move_made", "ply": 1}'] and received == 1
+    assert not after_stop
+
+
+def test_backend_without_publish_hooks_cannot_be_built():
+    """A backend that forgets a publish hook fails when it is built, not on its first publish"""
+    class BroadcastOnlyBus(BroadcastBus):
+        async def _publish_broadcast(self, game_id, text, key):
+            pass
+
+    with pytest.raises(TypeError):
+        BroadcastOnlyBus()
+
+
+def _rabbitmq_reachable() -> bool:
+    url = urlparse(settings.RABBITMQ_URL)
+    try:
+        with socket.create_connection((url.hostname or "localhost", url.port or 5672), timeout=0.5):
+            return True
+    except OSError:
+        return False
+
+
+def _subscriber_worker(game_id: str, ready, received):
+    """Second process: holds BlackPlayer's socket for the game and reports what it receives"""
+    async def run():
+        bus = RabbitMQBus(presence_interval=1)
+        await bus.start(lambda game, text, key=None: received.put(text), lambda: [(game_id, "BlackPlayer")])
+        await bus.subscribe(game_id)
+        ready.set()
+        await asyncio.sleep(5)
+        await bus.stop()
+
+    asyncio.run(run())
+
+
+@pytest.mark.skipif(not _rabbitmq_reachable(), reason="RabbitMQ is not reachable")
+def test_rabbitmq_bus_across_processes():
+    """A broadcast published in this process is delivered by a worker in another process"""
+    game_id = f"bus-{uuid.uuid4().hex[:8]}"
+    context = multiprocessing.get_context("spawn")
+    ready, received = context.Event(), context.Queue()
+    worker = context.Process(target=_subscriber_worker, args=(game_id, ready, received))
+    worker.start()
+    try:
+        assert ready.wait(10)
+
+        async def run():
+            bus = RabbitMQBus(presence_interval=1)
+            await bus.start(lambda game, text, key=None: None, lambda: [])
+            deadline = time.monotonic() + 5
+            while not bus.is_present(game_id, "BlackPlayer") and time.monotonic() < deadline:
+                await asyncio.sleep(0.05)
+            present = bus.is_present(game_id, "BlackPlayer")
+            await bus.publish(game_id, '{"type": "move_made"}')
+            await bus.publish("other-game", '{"type": "move_made", "other": true}')
+            await bus.stop()
+            return present
+
+        assert asyncio.run(run())
+        assert received.get(timeout=5) == '{"type": "move_made"}'
+    finally:
+        worker.join(10)
+        if worker.is_alive():
+            worker.terminate()
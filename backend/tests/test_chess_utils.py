@@ -0,0 +1,222 @@
+"""
+Test the chess utilities used on the move path
+
+Tests: fused move pipeline -> turn and legality errors -> game end classification
+-> offloaded moves keep the live board private
+"""
+
+import asyncio
+
+import chess
+
+from models.game_models import GameState
+from utils.chess_utils import pack_move, process_move, position_key, rebuild_position_counts, replay_fens
+from utils.position_cache import position_cache
+from utils.board_cache import BoardCache
+from utils.chess_executor import ChessExecutor
+
+KNIGHT_SHUFFLE = ["g1f3", "g8f6", "f3g1", "f6g8"]
+
+
+def play(moves, board=None, position_counts=None, threefold_ends_game=True):
+    """Play UCI moves through process_move and return the last outcome"""
+    board = board or chess.Board()
+    outcome = None
+    for move in moves:
+        side = "white" if board.turn else "black"
+        outcome = process_move(board, move, side, position_counts, threefold_ends_game)
+        assert outcome.success, outcome.error
+    return outcome
+
+
+def test_process_move_updates_live_board():
+    """A live board is pushed in place and the SAN and FEN are returned"""
+    board = chess.Board()
+    outcome = process_move(board, "e2e4", "white")
+
+    assert outcome.success is True
+    assert outcome.san == "e4"
+    assert outcome.fen == board.fen()
+    assert outcome.game_over is False
+
+
+def test_process_move_rejects_without_touching_board():
+    """Wrong side, illegal and malformed moves leave the board unchanged"""
+    board = chess.Board()
+
+    assert process_move(board, "e7e5", "black").error == "Not your turn (white to move)"
+    assert process_move(board, "e2e4", None).error == "Not your turn (white to move)"
+    assert process_move(board, "e2e5", "white").error == "Illegal move"
+    assert process_move(board, "zz", "white").error.startswith("Invalid move format")
+    assert board.fen() == chess.STARTING_FEN
+
+
+def test_process_move_accepts_fen():
+    """A FEN string works the same way as a live board"""
+    outcome = process_move(chess.STARTING_FEN, "g1f3", "white")
+
+    assert outcome.success is True
+    assert outcome.san == "Nf3"
+
+
+def test_checkmate_classification():
+    """Fool's Mate is classified as a black win by checkmate"""
+    outcome = play(["f2f3", "e7e5", "g2g4", "d8h4"])
+
+    assert outcome.san == "Qh4#"
+    assert outcome.game_over is True
+    assert outcome.result == "black"
+    assert outcome.reason == "checkmate"
+
+
+def test_stalemate_classification():
+    """A stalemating move ends the game in a draw"""
+    board = chess.Board("7k/8/6K1/8/8/8/8/5Q2 w - - 0 1")
+    outcome = process_move(board, "f1f7", "white")
+
+    assert outcome.result == "draw"
+    assert outcome.reason == "stalemate"
+
+
+def test_insufficient_material_classification():
+    """Capturing the last pawn leaves bare kings"""
+    board = chess.Board("8/8/4k3/8/4p3/4K3/8/8 w - - 0 1")
+    outcome = process_move(board, "e3e4", "white")
+
+    assert outcome.result == "draw"
+    assert outcome.reason == "insufficient_material"
+
+
+def test_threefold_repetition_from_fen_only_board():
+    """Repetition is detected from the index even without a move stack"""
+    counts = GameState(id="g1", player_white="WhitePlayer", time_control="5+3").position_counts
+    fen = chess.STARTING_FEN
+    outcome = None
+    for move in KNIGHT_SHUFFLE * 2:
+        board = chess.Board(fen)
+        outcome = process_move(board, move, "white" if board.turn else "black", counts)
+        fen = outcome.fen
+
+    assert outcome.game_over is True
+    assert outcome.reason == "threefold_repetition"
+    assert counts[position_key(chess.Board())] == 3
+
+
+def test_fivefold_repetition_when_threefold_is_claimable():
+    """With threefold left to the players, fivefold still ends the game"""
+    counts = {position_key(chess.Board()): 1}
+    board = chess.Board()
+    outcome = play(KNIGHT_SHUFFLE * 3, board, counts, threefold_ends_game=False)
+    assert outcome.game_over is False
+
+    outcome = play(KNIGHT_SHUFFLE, board, counts, threefold_ends_game=False)
+    assert outcome.reason == "fivefold_repetition"
+
+
+def test_irreversible_move_resets_index():
+    """A pawn move clears positions that can no longer recur"""
+    counts = {}
+    play(["g1f3", "g8f6", "e2e4"], position_counts=counts)
+
+    assert len(counts) == 1
+
+
+def test_rebuild_matches_incremental_index():
+    """Cold rebuild from FENs gives the same counts as incremental updates"""
+    counts = {position_key(chess.Board()): 1}
+    board = chess.Board()
+    fens = [board.fen()]
+    for move in ["e2e4", "e7e5"] + KNIGHT_SHUFFLE:
+        process_move(board, move, "white" if board.turn else "black", counts)
+        fens.append(board.fen())
+
+    assert rebuild_position_counts(fens) == counts
+
+
+def test_cold_load_replays_only_since_last_irreversible_move(monkeypatch):
+    """A game loaded without its index rebuilds it from the moves after the last pawn move"""
+    moves = ["e2e4", "e7e5"] + KNIGHT_SHUFFLE
+    board, counts, packed = chess.Board(), {position_key(chess.Board()): 1}, []
+    for move in moves:
+        process_move(board, move, "white" if board.turn else "black", counts)
+        packed.append(pack_move(board.peek()))
+
+    replayed = []
+
+    def recording_replay(start_fen, codes):
+        replayed.append(len(codes))
+        return replay_fens(start_fen, codes)
+
+    monkeypatch.setattr("models.game_models.replay_fens", recording_replay)
+    game = GameState(id="g1", player_white="WhitePlayer", time_control="5+3", moves=packed,
+                     current_fen=board.fen(), checkpoint_interval=100)
+
+    assert game.position_counts == counts
+    assert max(replayed) == len(KNIGHT_SHUFFLE)
+
+
+def test_position_cache_replays_identically():
+    """A game replayed from the shared cache gives the same SAN, FEN and result"""
+    position_cache.clear()
+    moves = ["e2e4", "e7e5", "f1c4", "b8c6", "d1h5", "g8f6", "h5f7"]
+
+    def replay():
+        board = chess.Board()
+        outcomes = []
+        for move in moves:
+            outcomes.append(process_move(board, move, "white" if board.turn else "black", {}))
+        return outcomes
+
+    first = replay()
+    second = replay()
+
+    assert first == second
+    assert second[-1].reason == "checkmate"
+    assert position_cache.stats()["hits"] == len(moves)
+    # Cached under the same public key as the repetition index
+    assert position_cache.peek(position_key(chess.Board())).successors
+
+
+def test_process_pool_matches_inline():
+    """Offloaded moves give the same outcome and keep the live board in sync"""
+    position_cache.clear()
+    moves = ["f2f3", "e7e5", "g2g4", "d8h4"]
+
+    async def play(mode):
+        executor = ChessExecutor(mode=mode, workers=1)
+        board = chess.Board()
+        counts = {}
+        outcomes = []
+        for move in moves:
+            side = "white" if board.turn else "black"
+            outcomes.append(await executor.process_move(board, move, side, counts))
+        executor.shutdown()
+        return outcomes, board.fen(), counts, executor.stats()
+
+    inline = asyncio.run(play("inline"))
+    position_cache.clear()
+    offloaded = asyncio.run(play("process"))
+
+    assert offloaded[:3] == inline[:3]
+    assert offloaded[3]["offloaded_moves"] == len(moves)
+
+
+def test_offloaded_move_keeps_live_board_private():
+    """While a move is in the pool, other requests for the game get their own board"""
+    position_cache.clear()
+
+    async def run():
+        executor, cache = ChessExecutor(mode="process", workers=1), BoardCache()
+        game = GameState(id="g1", player_white="WhitePlayer", time_control="5+3")
+        live = cache.get_board(game)
+        pending = asyncio.create_task(executor.process_move(live, "e2e4", "white", {}))
+        await asyncio.sleep(0)
+        concurrent = cache.get_board(game)
+        outcome = await pending
+        executor.shutdown()
+        return live, concurrent, outcome
+
+    live, concurrent, outcome = asyncio.run(run())
+    assert outcome.success and concurrent is not live
+    assert concurrent.fen() == chess.STARTING_FEN
+    assert [move.uci() for move in live.move_stack] == ["e2e4"]
@@ -0,0 +1,142 @@
+"""
+Test optimistic concurrency control on game writes
+
+Tests: stale write rejected -> duplicate move submitted twice -> moves from both players racing
+-> players alternating on two workers with their own game caches
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import chess
+import pytest
+
+from database.game_cache import GameCache
+from database.repository import GameRepository, StaleGameStateError, game_to_document
+from enums.game_enums import GameStatus
+from models.game_models import GameState
+from services.game_service import GameService
+from utils.board_cache import board_cache
+from utils.chess_utils import unpack_move
+
+
+class InterleavingRepository(GameRepository):
+    """In-memory repository that yields to the event loop on every read"""
+
+    async def get_game(self, game_id: str, operation: str = "get_game", fresh: bool = False):
+        game = await super().get_game(game_id, operation, fresh)
+        await asyncio.sleep(0)
+        return game
+
+
+async def started_game(service: GameService):
+    """Create a game and have both players join it"""
+    board_cache.clear()
+    game = await service.create_game("WhitePlayer", "5+3")
+    await service.join_game(game.id, "BlackPlayer")
+    return game.id
+
+
+def test_stale_write_rejected():
+    """A game read before another write cannot be written back"""
+    async def run():
+        repository = GameRepository(in_memory=True)
+        game_id = await started_game(GameService(repository))
+        first = await repository.get_game(game_id)
+        second = await repository.get_game(game_id)
+
+        first.result = "draw"
+        await repository.update_status(first)
+        second.result = "white"
+        with pytest.raises(StaleGameStateError):
+            await repository.update_status(second)
+        return await repository.get_game(game_id)
+
+    assert asyncio.run(run()).result == "draw"
+
+
+def test_duplicate_move_applied_once():
+    """A double-submitted move is applied once and the copy is rejected"""
+    async def run():
+        service = GameService(InterleavingRepository(in_memory=True))
+        game_id = await started_game(service)
+        responses = await asyncio.gather(
+            service.make_move(game_id, "WhitePlayer", "e2e4"),
+            service.make_move(game_id, "WhitePlayer", "e2e4")
+        )
+        return responses, await service.get_game(game_id), service.stats()
+
+    responses, game, stats = asyncio.run(run())
+    assert sorted(response.success for response in responses) == [False, True]
+    assert game.ply == 1
+    assert stats["move_conflicts"] == 1 and stats["move_conflict_rejections"] == 0
+
+
+def test_racing_moves_keep_history_legal():
+    """Moves racing from both players never produce an illegal history"""
+    async def run():
+        service = GameService(InterleavingRepository(in_memory=True))
+        game_id = await started_game(service)
+        await asyncio.gather(
+            service.make_move(game_id, "WhitePlayer", "e2e4"),
+            service.make_move(game_id, "BlackPlayer", "e7e5")
+        )
+        return await service.get_game(game_id)
+
+    game = asyncio.run(run())
+    board = chess.Board()
+    for code in game.moves:
+        move = unpack_move(code)
+        assert board.is_legal(move)
+        board.push(move)
+    assert board.fen() == game.current_fen
+
+
+class SharedGamesCollection:
+    """Games collection stand-in shared by several workers (conditional updates only)"""
+
+    def __init__(self):
+        self.documents = {}
+
+    async def find_one(self, query):
+        document = self.documents.get(query["_id"])
+        return dict(document) if document else None
+
+    async def update_one(self, query, update):
+        document = self.documents.get(query["_id"])
+        if document is None or document.get("version") != query["version"]:
+            return SimpleNamespace(matched_count=0)
+        for key, value in update.get("$push", {}).items():
+            document[key] = document[key] + [value]
+        document.update(update["$set"])
+        return SimpleNamespace(matched_count=1)
+
+
+def worker_service(collection: SharedGamesCollection) -> GameService:
+    """A worker: its own repository and game cache on the shared collection"""
+    repository = GameRepository(cache=GameCache(max_games=10, ttl_seconds=60))
+    repository._checked = True
+    repository.games_collection = collection
+    return GameService(repository)
+
+
+def test_players_alternating_on_two_workers():
+    """A move is not rejected because this worker's cached copy misses the opponent's last move"""
+    async def run():
+        board_cache.clear()
+        collection = SharedGamesCollection()
+        game = GameState(id="two-workers", player_white="WhitePlayer", player_black="BlackPlayer",
+                         time_control="5+3", status=GameStatus.IN_PROGRESS, version=1)
+        collection.documents[game.id] = game_to_document(game)
+        workers = {"WhitePlayer": worker_service(collection), "BlackPlayer": worker_service(collection)}
+        for service in workers.values():
+            await service.get_game(game.id)
+
+        responses = []
+        for username, move in zip(["WhitePlayer", "BlackPlayer"] * 2, ["e2e4", "e7e5", "g1f3", "b8c6"]):
+            responses.append(await workers[username].make_move(game.id, username, move))
+        return responses, collection.documents[game.id]
+
+    responses, document = asyncio.run(run())
+    assert [response.error for response in responses] == [None] * 4
+    assert len(document["moves"]) == 4 and document["version"] == 5
@@ -0,0 +1,60 @@
+"""
+Test the read-through game cache
+
+Tests: private copies -> version check -> TTL expiry and finished games -> LRU bound
+"""
+
+from database.game_cache import GameCache
+from enums.game_enums import GameStatus
+from models.game_models import GameState
+
+
+def make_game(game_id: str, version: int = 1, status: GameStatus = GameStatus.IN_PROGRESS) -> GameState:
+    """Build a game at the given write version"""
+    return GameState(id=game_id, player_white="WhitePlayer", player_black="BlackPlayer",
+                     time_control="5+3", status=status, version=version)
+
+
+def test_get_returns_private_copy():
+    """Mutating a game read from the cache does not change the cached state"""
+    cache = GameCache(max_games=10, ttl_seconds=60)
+    cache.put(make_game("g1"))
+
+    game = cache.get("g1", "make_move")
+    game.moves.append(1804)
+
+    assert cache.get("g1", "make_move").moves == []
+    assert cache.stats()["operations"]["make_move"] == {"hits": 2, "misses": 0, "hit_rate": 1.0}
+
+
+def test_older_version_does_not_replace_newer():
+    """A stale read never overwrites a newer write-through"""
+    cache = GameCache(max_games=10, ttl_seconds=60)
+    cache.put(make_game("g1", version=3))
+    cache.put(make_game("g1", version=2))
+
+    assert cache.get("g1").version == 3
+    assert cache.stale_puts == 1
+
+
+def test_ttl_expiry_skips_finished_games():
+    """Active games expire after the TTL, finished games stay cached"""
+    cache = GameCache(max_games=10, ttl_seconds=60)
+    cache.put(make_game("active"))
+    cache.put(make_game("finished", status=GameStatus.FINISHED))
+    cache._entries["active"].expires_at -= 120
+
+    assert cache.get("active") is None
+    assert cache.get("finished") is not None
+    assert cache.expirations == 1
+
+
+def test_lru_bound():
+    """The least recently used game is evicted beyond the size bound"""
+    cache = GameCache(max_games=2, ttl_seconds=60)
+    for i in range(3):
+        cache.put(make_game(f"g{i}"))
+
+    assert cache.get("g0") is None
+    assert cache.stats()["size"] == 2
+    assert cache.evictions == 1
@@ -0,0 +1,59 @@
+"""
+Test game ID allocation without a pre-read
+
+Tests: IDs are short, unique and time-ordered -> exhausted sequences and clock steps do not block
+-> a taken ID is retried with the next one
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from database.repository import DuplicateGameIdError, GameRepository
+from models.game_models import GameState
+from services.game_service import GameService
+from utils.game_ids import GameIdAllocator, game_id_allocator
+
+
+def test_ids_are_short_unique_and_ordered():
+    """A burst of IDs from one worker never repeats and sorts by creation time"""
+    allocator = GameIdAllocator()
+    ids = [allocator.next_id() for _ in range(5000)]
+
+    assert len(set(ids)) == len(ids)
+    assert all(len(game_id) == 10 and game_id.isalnum() and game_id.islower() for game_id in ids)
+    assert ids[0][:6] <= ids[-1][:6]
+
+
+def test_exhausted_sequence_and_clock_step_back_do_not_wait(monkeypatch):
+    """The next second is borrowed instead of slept for, and a clock going back never reorders IDs"""
+    clock = iter([1800000000.0, 1800000000.5, 1799999990.0])
+    fake_time = SimpleNamespace(time=lambda: next(clock), sleep=lambda seconds: pytest.fail("next_id slept"))
+    monkeypatch.setattr("utils.game_ids.time", fake_time)
+    allocator = GameIdAllocator()
+    first = allocator.next_id()
+    allocator._start = (allocator._sequence + 2) % 36 ** 4
+    ids = [first, allocator.next_id(), allocator.next_id()]
+
+    seconds = [game_id[:6] for game_id in ids]
+    assert seconds == sorted(seconds) and len(set(ids)) == 3
+    assert ids[2][:6] > ids[0][:6] and allocator.borrowed == 1
+
+
+def test_taken_id_is_retried(monkeypatch):
+    """Creation inserts without reading and retries when another worker took the ID"""
+    async def run():
+        repository = GameRepository(in_memory=True)
+        taken = await repository.insert_game(GameState(id="taken", player_white="Other", time_control="5+3"))
+        with pytest.raises(DuplicateGameIdError):
+            await repository.insert_game(GameState(id="taken", player_white="Other", time_control="5+3"))
+
+        ids = iter(["taken", "fresh"])
+        monkeypatch.setattr(game_id_allocator, "next_id", lambda: next(ids))
+        game = await GameService(repository).create_game("WhitePlayer", "5+3")
+        return taken, game, await repository.get_game("taken")
+
+    taken, game, stored = asyncio.run(run())
+    assert game.id == "fresh" and game.version == 1
+    assert stored.player_white == "Other" and taken.version == 1
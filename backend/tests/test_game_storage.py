@@ -0,0 +1,148 @@
+"""
+Test the compact game storage format
+
+Tests: packed move list -> FEN checkpoints -> legacy FEN-per-ply migration -> append-only move writes
+-> migrated legacy games are cached until rewritten
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import chess
+
+from benchmarks.corpus import sample_games
+from database.game_cache import game_cache
+from database.repository import GameRepository, game_from_document, game_to_document, move_update
+from models.game_models import GameState
+from schemas.game_schemas import GameResponse
+from utils.chess_utils import pack_move
+
+
+def legacy_document(game_id: str, moves):
+    """Build a document in the old one-FEN-per-ply format"""
+    board = chess.Board()
+    fens = [board.fen()]
+    for move in moves:
+        board.push_uci(move)
+        fens.append(board.fen())
+    game = GameState(id=game_id, player_white="WhitePlayer", player_black="BlackPlayer",
+                     time_control="5+3", status="in_progress")
+    return {
+        "_id": game.id,
+        "player_white": game.player_white,
+        "player_black": game.player_black,
+        "fens": fens,
+        "time_control": game.time_control,
+        "status": "in_progress",
+        "result": None,
+        "created_at": game.created_at,
+        "updated_at": game.updated_at
+    }, fens
+
+
+def test_fen_at_every_ply():
+    """Every ply is rebuilt from the nearest checkpoint"""
+    moves = sample_games()[1]
+    game = GameState(id="g1", player_white="WhitePlayer", time_control="5+3", checkpoint_interval=8)
+    board = chess.Board()
+    expected = [board.fen()]
+    for move in moves:
+        board.push_uci(move)
+        game.record_move(pack_move(board.peek()), board.fen())
+        expected.append(board.fen())
+
+    assert len(game.checkpoints) == len(moves) // 8
+    assert [game.fen_at(ply) for ply in range(game.ply + 1)] == expected
+    assert game.fens == expected
+
+
+def test_legacy_document_migration():
+    """A FEN-per-ply document loads into the compact format unchanged"""
+    document, fens = legacy_document("g1", sample_games()[0])
+
+    game = game_from_document(document)
+
+    assert game.ply == len(fens) - 1
+    assert game.current_fen == fens[-1]
+    assert game.fens == fens
+    assert "fens" not in game_to_document(game)
+
+
+def test_response_unchanged_by_storage_format():
+    """GameResponse is identical for legacy and compact documents"""
+    document, _ = legacy_document("g1", sample_games()[2])
+    legacy = game_from_document(document)
+    compact = game_from_document(game_to_document(legacy))
+
+    legacy_json = GameResponse.from_game_state(legacy).model_dump_json()
+    assert GameResponse.from_game_state(compact).model_dump_json() == legacy_json
+    assert compact.position_counts == legacy.position_counts
+
+
+def test_move_update_matches_full_document():
+    """Applying the append delta to the previous document yields the full document"""
+    game = GameState(id="g1", player_white="WhitePlayer", time_control="5+3", checkpoint_interval=4)
+    board = chess.Board()
+    document = {key: list(value) if isinstance(value, list) else value
+                for key, value in game_to_document(game).items()}
+    for move in sample_games()[0][:12]:
+        board.push_uci(move)
+        game.record_move(pack_move(board.peek()), board.fen())
+        update = move_update(game)
+        for key, value in update["$push"].items():
+            document[key] = document[key] + [value]
+        document.update(update["$set"])
+        assert document == game_to_document(game)
+
+
+def test_legacy_document_needs_full_write():
+    """Only documents loaded from the legacy format are rewritten in full"""
+    document, _ = legacy_document("g1", sample_games()[0])
+    legacy = game_from_document(document)
+    compact = game_from_document(game_to_document(legacy))
+
+    assert legacy._needs_full_write
+    assert not compact._needs_full_write
+
+
+class LegacyCollection:
+    """Games collection stand-in holding one legacy document"""
+
+    def __init__(self, document):
+        self.document = document
+        self.reads = 0
+        self.replaced = None
+
+    async def find_one(self, query):
+        self.reads += 1
+        return dict(self.document)
+
+    async def replace_one(self, query, document, upsert=False):
+        self.replaced = document
+        return SimpleNamespace(matched_count=1)
+
+
+def test_migrated_legacy_game_is_cached():
+    """A legacy game is migrated once per cache lifetime and still rewritten in full on its next write"""
+    document, fens = legacy_document("legacy1", sample_games()[0][:10])
+    collection = LegacyCollection(document)
+    repository = GameRepository()
+    repository._checked = True
+    repository.games_collection = collection
+
+    async def run():
+        await repository.get_game("legacy1")
+        game = await repository.get_game("legacy1")
+        board = chess.Board(game.current_fen)
+        board.push_uci("a2a3" if board.turn == chess.WHITE else "a7a6")
+        game.record_move(pack_move(board.peek()), board.fen())
+        await repository.append_move(game)
+        return game
+
+    try:
+        game = asyncio.run(run())
+    finally:
+        game_cache.invalidate("legacy1")
+    assert collection.reads == 1
+    assert collection.replaced["moves"] == game.moves and "fens" not in collection.replaced
+    assert not game._needs_full_write
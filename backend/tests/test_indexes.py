@@ -0,0 +1,54 @@
+"""
+Test the index registry and query plan self-test
+
+Tests: every hot query has an index -> COLLSCAN detection in explain output
+"""
+
+import asyncio
+
+from database.indexes import HOT_QUERIES, INDEXES, verify_indexes
+
+
+class ExplainingDatabase:
+    """Database stand-in that answers explain with a fixed plan per collection"""
+
+    def __init__(self, plans):
+        self.plans = plans
+        self.created = []
+
+    def __getitem__(self, collection):
+        database = self
+
+        class Collection:
+            async def create_indexes(self, models):
+                database.created.extend((collection, model.document["name"]) for model in models)
+
+        return Collection()
+
+    async def command(self, command):
+        return {"queryPlanner": {"winningPlan": self.plans[command["explain"]["find"]]}}
+
+
+def test_registry_covers_hot_query_fields():
+    """Each non-_id hot query filters on the leading key of a registered index"""
+    leading = {(spec.collection, spec.keys[0][0]) for spec in INDEXES}
+    for query in HOT_QUERIES:
+        fields = set()
+        for clause in query.filter.get("$or", [query.filter]):
+            fields.update(clause)
+        assert "_id" in fields or all((query.collection, field) in leading for field in fields), query.name
+    assert ("users", "username") in leading
+
+
+def test_collscan_is_reported():
+    """A hot query planned as a collection scan fails the self-test"""
+    db = ExplainingDatabase({
+        "games": {"stage": "LIMIT", "inputStage": {"stage": "FETCH", "inputStage": {"stage": "IXSCAN"}}},
+        "games_archive": {"stage": "SORT_MERGE", "inputStages": [{"stage": "IXSCAN"}, {"stage": "IXSCAN"}]},
+        "users": {"stage": "LIMIT", "inputStage": {"stage": "COLLSCAN"}},
+    })
+
+    failures = asyncio.run(verify_indexes(db))
+
+    assert failures == ["get_user"]
+    assert ("users", "username") in db.created
@@ -0,0 +1,56 @@
+"""
+Test the indexed in-memory storage backend
+
+Tests: player and status indexes follow updates -> snapshot round trip
+"""
+
+import asyncio
+
+from database.memory_store import MemoryStore
+from database.repository import GameRepository
+from services.game_service import GameService
+
+
+def test_indexes_follow_updates():
+    """Joining and finishing a game moves it between player and status indexes"""
+    async def run():
+        repository = GameRepository(in_memory=True)
+        service = GameService(repository)
+        game = await service.create_game("WhitePlayer", "5+3")
+        waiting = [g.id for g in repository.memory.games_with_status("waiting")]
+        await service.join_game(game.id, "BlackPlayer")
+        await service.leave_game(game.id, "BlackPlayer")
+        return repository.memory, game.id, waiting
+
+    store, game_id, waiting = asyncio.run(run())
+    assert waiting == [game_id]
+    assert store.games_with_status("waiting") == []
+    assert [g.id for g in store.games_with_status("finished")] == [game_id]
+    assert [g.id for g in store.games_for_player("BlackPlayer")] == [game_id]
+
+
+def test_snapshot_round_trip(tmp_path):
+    """Games and users written to a snapshot are restored with their indexes"""
+    path = str(tmp_path / "store.jsonl")
+
+    async def run():
+        repository = GameRepository(in_memory=True, snapshot_path=path)
+        service = GameService(repository)
+        game = await service.create_game("WhitePlayer", "5+3")
+        await service.join_game(game.id, "BlackPlayer")
+        await service.make_move(game.id, "WhitePlayer", "e2e4")
+        await repository.insert_one("users", {"username": "WhitePlayer", "password_hash": "x"})
+        repository.memory.close()
+        return await repository.get_game(game.id)
+
+    saved = asyncio.run(run())
+    restored = MemoryStore(path)
+    restored.load_snapshot()
+
+    game = restored.get_game(saved.id)
+    assert game.current_fen == saved.current_fen
+    assert game.moves == saved.moves
+    assert game.version == saved.version
+    assert game.updated_at.tzinfo is not None
+    assert [g.id for g in restored.games_for_player("BlackPlayer")] == [saved.id]
+    assert restored.find_user({"username": "WhitePlayer"})["password_hash"] == "x"
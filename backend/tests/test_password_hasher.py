@@ -0,0 +1,48 @@
+"""
+Test the bounded password hasher
+
+Tests: load shedding when saturated -> rehash on login after a cost change
+"""
+
+import asyncio
+
+from database.repository import GameRepository
+from models.user_models import UserCreate
+from services import auth_service as auth_module
+from services.auth_cache import auth_cache
+from services.password_hasher import PasswordHasher, PasswordHasherBusyError
+
+
+def test_sheds_load_beyond_queue_limit():
+    """Hashes beyond workers + queue are rejected instead of queued"""
+    async def run():
+        hasher = PasswordHasher(rounds=4, workers=1, max_queue=1)
+        results = await asyncio.gather(*(hasher.hash("secret123") for _ in range(4)), return_exceptions=True)
+        hasher.shutdown()
+        return hasher, results
+
+    hasher, results = asyncio.run(run())
+    assert sum(isinstance(result, PasswordHasherBusyError) for result in results) == 2
+    assert hasher.stats()["rejected"] == 2
+    assert hasher.stats()["in_flight"] == 0
+
+
+def test_rehash_on_login_after_cost_change(monkeypatch):
+    """A password stored with an old cost is rehashed with the configured one on login"""
+    async def run():
+        auth_cache.clear()
+        repository = GameRepository(in_memory=True)
+        monkeypatch.setattr(auth_module, "password_hasher", PasswordHasher(rounds=4, workers=1))
+        await auth_module.AuthService(repository).create_user(UserCreate(username="OldHash", password="secret123"))
+        old_hash = repository.memory.find_user({"username": "OldHash"})["password_hash"]
+
+        upgraded = PasswordHasher(rounds=5, workers=1)
+        monkeypatch.setattr(auth_module, "password_hasher", upgraded)
+        user = await auth_module.AuthService(repository).authenticate_user("OldHash", "secret123")
+        return old_hash, user, repository.memory.find_user({"username": "OldHash"})["password_hash"], upgraded
+
+    old_hash, user, stored_hash, upgraded = asyncio.run(run())
+    assert old_hash.startswith("$2b$04$")
+    assert stored_hash.startswith("$2b$05$")
+    assert user.password_hash == stored_hash
+    assert upgraded.rehashes == 1
@@ -0,0 +1,63 @@
+"""
+Test the paginated user game listing
+
+Tests: keyset pages cover every game once -> summaries carry no move history -> route and cursor header
+"""
+
+import asyncio
+
+from database.repository import GameRepository
+from services.game_service import GameService
+
+
+async def create_games(service: GameService, count: int):
+    """Create games for WhitePlayer, half of them joined by BlackPlayer"""
+    for i in range(count):
+        game = await service.create_game("WhitePlayer", "5+3")
+        if i % 2:
+            await service.join_game(game.id, "BlackPlayer")
+
+
+def test_pages_cover_every_game_once():
+    """Walking the cursors returns each game once, most recently updated first"""
+    async def run():
+        service = GameService(GameRepository(in_memory=True))
+        await create_games(service, 7)
+        pages, cursor = [], None
+        while True:
+            games, cursor = await service.list_user_games("WhitePlayer", limit=3, cursor=cursor)
+            pages.append(games)
+            if cursor is None:
+                everything = await service.list_all_user_games("WhitePlayer", page_size=2)
+                return pages, await service.list_user_games("BlackPlayer", limit=10), everything
+
+    pages, (black_games, black_cursor), everything = asyncio.run(run())
+    games = [game for page in pages for game in page]
+    assert everything == games
+    assert [len(page) for page in pages] == [3, 3, 1]
+    assert len({game.id for game in games}) == 7
+    assert [game.updated_at for game in games] == sorted((game.updated_at for game in games), reverse=True)
+    assert len(black_games) == 3 and black_cursor is None
+    assert not hasattr(games[0], "moves")
+
+
+def test_user_games_route(client, white_player):
+    """GET /api/games/user pages through the caller's games with X-Next-Cursor, or lists them all"""
+    for _ in range(3):
+        client.post("/api/games", json={"time_control": "5+3"}, headers=white_player["headers"])
+
+    first = client.get("/api/games/user?limit=2", headers=white_player["headers"])
+    assert first.status_code == 200
+    assert len(first.json()) == 2
+    cursor = first.headers["X-Next-Cursor"]
+
+    second = client.get(f"/api/games/user?limit=2&cursor={cursor}", headers=white_player["headers"])
+    assert {game["id"] for game in second.json()}.isdisjoint(game["id"] for game in first.json())
+
+    bad = client.get("/api/games/user?cursor=not-a-cursor", headers=white_player["headers"])
+    assert bad.status_code == 400
+
+    # Callers that do not page (the current frontend) still get every game
+    everything = client.get("/api/games/user", headers=white_player["headers"])
+    assert "X-Next-Cursor" not in everything.headers
+    assert {game["id"] for game in first.json() + second.json()} <= {game["id"] for game in everything.json()}
@@ -0,0 +1,103 @@
+"""
+Test WebSocket fan-out through per-connection outbound queues
+
+Tests: a slow spectator does not delay other sockets -> slow consumer policies -> moves reach a socket on
+another loop -> a claimed username spectates -> spectators get coalesced latest state
+"""
+
+import asyncio
+
+from services.connection_manager import ConnectionManager, connection_manager
+from tests.conftest import FakeSocket, create_test_token
+
+
+def test_slow_spectator_does_not_delay_players():
+    """Broadcast returns at once; the fast socket gets every message, the slow one only the newest"""
+    async def run():
+        manager = ConnectionManager(max_queue=4, policy="drop_oldest")
+        fast, slow = FakeSocket(), FakeSocket(delay=10)
+        manager.connect("game", fast, "WhitePlayer")
+        manager.connect("game", slow)
+        for i in range(10):
+            assert manager.broadcast("game", f"move {i}") == 2
+            await asyncio.sleep(0.001)
+        stats = manager.stats()["games"]["game"]
+        for connection in list(manager.game_connections["game"]):
+            await manager.disconnect(connection)
+        return fast, stats, manager
+
+    fast, stats, manager = asyncio.run(run())
+    assert fast.sent == [f"move {i}" for i in range(10)]
+    # move 0 is in flight on the slow socket, 1-5 were dropped, 6-9 are queued
+    assert stats["drops"] == 5 and stats["max_queue_depth"] == 4
+    assert stats["delivered"] == 10 and stats["fanout_max_ms"] < 1000
+    assert manager.game_connections == {}
+
+
+def test_disconnect_policy_closes_slow_consumer():
+    """With the disconnect policy a full queue closes the socket and stops its deliveries"""
+    async def run():
+        manager = ConnectionManager(max_queue=2, policy="disconnect")
+        slow = FakeSocket(delay=10)
+        connection = manager.connect("game", slow, "BlackPlayer")
+        for i in range(5):
+            manager.broadcast("game", f"move {i}")
+        await asyncio.sleep(0.01)
+        return slow, connection, manager.stats()["games"]["game"]
+
+    slow, connection, stats = asyncio.run(run())
+    assert connection.closed and slow.close_code == 1013
+    assert stats["disconnects"] == 1
+
+
+def test_move_reaches_socket_on_another_loop(client, white_player, black_player):
+    """A move made through the REST API is queued onto the socket's own event loop"""
+    game_id = client.post("/api/games", json={"time_control": "5+3"}, headers=white_player["headers"]).json()["id"]
+    client.post(f"/api/games/{game_id}/join", json={}, headers=black_player["headers"])
+
+    with client.websocket_connect(f"/ws/{game_id}") as websocket:
+        assert websocket.receive_json()["type"] == "game_state"
+        response = client.post(f"/api/games/{game_id}/move", json={"move": "e2e4"}, headers=white_player["headers"])
+        assert response.json()["success"] is True
+        message = websocket.receive_json()
+
+    assert message["type"] == "move_made" and message["move"] == "e2e4"
+
+
+def test_claimed_username_is_a_spectator(client, white_player, black_player):
+    """Only a token puts a socket on the direct player feed; ?username= alone spectates"""
+    game_id = client.post("/api/games", json={"time_control": "5+3"}, headers=white_player["headers"]).json()["id"]
+    client.post(f"/api/games/{game_id}/join", json={}, headers=black_player["headers"])
+
+    with client.websocket_connect(f"/ws/{game_id}?username=BlackPlayer") as claimed, \
+            client.websocket_connect(f"/ws/{game_id}?token={create_test_token('BlackPlayer')}") as authenticated:
+        for websocket in (claimed, authenticated):
+            websocket.receive_json()
+            # Answered once the tier is decided
+            websocket.send_json({"type": "get_game_state"})
+            websocket.receive_json()
+        tiers = {connection.spectator for connection in connection_manager.game_connections[game_id]}
+
+    assert tiers == {True, False}
+
+
+def test_spectators_get_latest_state_per_tick():
+    """Players get every move at once; a spectator gets one coalesced state per tick"""
+    async def run():
+        manager = ConnectionManager(spectator_tick=0.02)
+        player, spectator = FakeSocket(), FakeSocket()
+        manager.connect("game", player, "WhitePlayer")
+        manager.set_spectator(manager.connect("game", spectator))
+        manager.broadcast("game", "joined", key="game_joined")
+        for i in range(5):
+            manager.broadcast("game", f"move {i}", key="move_made")
+            await asyncio.sleep(0.001)
+        received_before_tick = list(spectator.sent)
+        await asyncio.sleep(0.05)
+        return player, spectator, received_before_tick, manager.stats()["games"]["game"]
+
+    player, spectator, received_before_tick, stats = asyncio.run(run())
+    assert player.sent == ["joined"] + [f"move {i}" for i in range(5)]
+    assert received_before_tick == []
+    assert spectator.sent == ["joined", "move 4"]
+    assert stats["spectators"] == 1 and stats["spectator_coalesced"] == 4
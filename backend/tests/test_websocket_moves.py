@@ -0,0 +1,145 @@
+"""
+Test moves sent on the WebSocket
+
+Tests: retransmits are answered once -> a failed move can be retried -> make_move over an authenticated socket
+-> retransmit to another worker -> a new client session starts over -> unauthenticated sockets cannot move
+"""
+
+import asyncio
+
+from services.move_sessions import MoveSessions
+from tests.conftest import create_test_token
+
+
+def test_retransmits_are_applied_once():
+    """The same seq gets the remembered answer; an older one outside the window is stale"""
+    async def run():
+        sessions, applied = MoveSessions(window=2), []
+
+        async def apply():
+            applied.append(1)
+            return {"type": "move_ack"}
+
+        answers = [await sessions.submit("game", "WhitePlayer", seq, apply) for seq in (1, 1, 2, 3, 1)]
+        return answers, applied, sessions.stats()
+
+    answers, applied, stats = asyncio.run(run())
+    assert answers[0] == answers[1] == {"type": "move_ack", "seq": 1}
+    assert answers[4] == {"type": "move_nack", "seq": 1, "error": "Stale sequence number"}
+    assert len(applied) == 3 and stats["duplicates"] == 1 and stats["stale"] == 1
+
+
+def test_failed_move_can_be_retried_with_same_seq():
+    """An unexpected failure is not remembered"""
+    async def run():
+        sessions, attempts = MoveSessions(), []
+
+        async def apply():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise ConnectionError("database unavailable")
+            return {"type": "move_ack"}
+
+        try:
+            await sessions.submit("game", "WhitePlayer", 5, apply)
+        except ConnectionError:
+            pass
+        return await sessions.submit("game", "WhitePlayer", 5, apply)
+
+    assert asyncio.run(run()) == {"type": "move_ack", "seq": 5}
+
+
+def test_make_move_over_authenticated_socket(client, white_player, black_player):
+    """The move is broadcast, acked with its seq, and a retransmit is acked without a second move"""
+    game_id = client.post("/api/games", json={"time_control": "1+0"}, headers=white_player["headers"]).json()["id"]
+    client.post(f"/api/games/{game_id}/join", json={}, headers=black_player["headers"])
+
+    with client.websocket_connect(f"/ws/{game_id}?token={create_test_token('WhitePlayer')}") as websocket:
+        assert websocket.receive_json()["type"] == "game_state"
+        websocket.send_json({"type": "make_move", "seq": 1, "move": "e2e4"})
+        broadcast, ack = websocket.receive_json(), websocket.receive_json()
+        websocket.send_json({"type": "make_move", "seq": 1, "move": "e2e4"})
+        retransmit_ack = websocket.receive_json()
+        websocket.send_json({"type": "make_move", "seq": 2, "move": "d2d4"})
+        nack = websocket.receive_json()
+        websocket.send_json({"type": "get_game_state"})
+        state = websocket.receive_json()
+
+    assert broadcast["type"] == "move_made" and broadcast["move"] == "e2e4"
+    assert ack == retransmit_ack == {"type": "move_ack", "seq": 1, "game_over": False, "result": None}
+    assert nack["type"] == "move_nack" and nack["seq"] == 2
+    assert state["ply"] == 1
+
+
+def test_retransmit_to_another_worker_is_acked(client, white_player, black_player, monkeypatch):
+    """A worker without the session acks the retransmit from the seq and move stored with the game"""
+    game_id = client.post("/api/games", json={"time_control": "1+0"}, headers=white_player["headers"]).json()["id"]
+    client.post(f"/api/games/{game_id}/join", json={}, headers=black_player["headers"])
+    token = create_test_token('WhitePlayer')
+
+    with client.websocket_connect(f"/ws/{game_id}?token={token}") as websocket:
+        websocket.receive_json()
+        websocket.send_json({"type": "make_move", "seq": 7, "move": "e2e4"})
+        websocket.receive_json()
+        ack = websocket.receive_json()
+
+    # Reconnect to a worker that has never seen this player
+    monkeypatch.setattr("routers.websocket.move_sessions", MoveSessions())
+    with client.websocket_connect(f"/ws/{game_id}?token={token}") as websocket:
+        websocket.receive_json()
+        websocket.send_json({"type": "make_move", "seq": 7, "move": "e2e4"})
+        retransmit_ack = websocket.receive_json()
+        websocket.send_json({"type": "make_move", "seq": 8, "move": "e2e4"})
+        nack = websocket.receive_json()
+        monkeypatch.setattr("routers.websocket.move_sessions", MoveSessions())
+        websocket.send_json({"type": "make_move", "seq": 7, "move": "d2d4"})
+        other_move_nack = websocket.receive_json()
+        websocket.send_json({"type": "get_game_state"})
+        state = websocket.receive_json()
+
+    assert ack == retransmit_ack == {"type": "move_ack", "seq": 7, "game_over": False, "result": None}
+    assert nack["type"] == "move_nack" and nack["seq"] == 8
+    # The same seq with another move (a restarted or colliding client) is not mistaken for a retransmit
+    assert other_move_nack["type"] == "move_nack" and other_move_nack["seq"] == 7
+    assert state["ply"] == 1
+
+
+def test_new_client_session_starts_seq_over(client, white_player, black_player):
+    """A reloaded client numbers its moves from 1 again; reconnecting the same session keeps dedup"""
+    game_id = client.post("/api/games", json={"time_control": "1+0"}, headers=white_player["headers"]).json()["id"]
+    client.post(f"/api/games/{game_id}/join", json={}, headers=black_player["headers"])
+    token = create_test_token('WhitePlayer')
+
+    def send_move(session: str, seq: int, move: str) -> dict:
+        with client.websocket_connect(f"/ws/{game_id}?token={token}&session={session}") as websocket:
+            websocket.receive_json()
+            websocket.send_json({"type": "make_move", "seq": seq, "move": move})
+            while True:
+                answer = websocket.receive_json()
+                if answer["type"] in ("move_ack", "move_nack"):
+                    return answer
+
+    first = send_move("before-reload", 5, "e2e4")
+    client.post(f"/api/games/{game_id}/move", json={"move": "e7e5"}, headers=black_player["headers"])
+    restarted = send_move("after-reload", 1, "g1f3")
+    retransmit = send_move("after-reload", 1, "g1f3")
+    state = client.get(f"/api/games/{game_id}").json()
+
+    assert first["type"] == restarted["type"] == retransmit["type"] == "move_ack"
+    assert restarted["seq"] == retransmit["seq"] == 1
+    assert state["fen"] == "rnbqkbnr/pppp1ppp/8/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R b KQkq - 1 2"
+
+
+def test_unauthenticated_socket_cannot_move(client, white_player):
+    """Without a token make_move is nacked; an invalid token closes the socket"""
+    game_id = client.post("/api/games", json={"time_control": "1+0"}, headers=white_player["headers"]).json()["id"]
+
+    with client.websocket_connect(f"/ws/{game_id}?username=WhitePlayer") as websocket:
+        websocket.receive_json()
+        websocket.send_json({"type": "make_move", "seq": 1, "move": "e2e4"})
+        nack = websocket.receive_json()
+    assert nack["type"] == "move_nack" and "authenticated" in nack["error"]
+
+    with client.websocket_connect(f"/ws/{game_id}?token=not-a-token") as websocket:
+        error = websocket.receive_json()
+    assert error == {"type": "error", "message": "Invalid authentication credentials"}
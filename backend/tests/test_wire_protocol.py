@@ -0,0 +1,97 @@
+"""
+Test the compact WebSocket wire protocol
+
+Tests: compact move deltas and sync frames -> resync after dropped deltas -> negotiation by query parameter
+-> negotiation by subprotocol -> MessagePack frames
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from services.connection_manager import ConnectionManager
+from services.wire_protocol import COMPACT_JSON, COMPACT_MSGPACK, LEGACY, PROTOCOLS, Frame, negotiate
+from tests.conftest import FakeSocket, create_test_token
+
+MOVE = {
+    "type": "move_made",
+    "game_id": "a1b2c3d4e5",
+    "username": "WhitePlayer",
+    "move": "e2e4",
+    "ply": 1,
+    "fen": "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 1",
+    "timestamp": "2025-01-01T12:00:00+00:00"
+}
+
+
+def test_compact_move_is_a_delta_and_sync_carries_the_fen():
+    """Players get UCI + ply + clock, spectators (sync) also the FEN; legacy text is unchanged"""
+    frame = Frame(MOVE)
+    compact = PROTOCOLS[COMPACT_JSON]
+    assert json.loads(frame.encode(compact)) == {"t": "m", "u": "e2e4", "p": 1, "c": 1735732800000}
+    assert json.loads(frame.encode(compact, sync=True))["f"] == MOVE["fen"]
+    assert frame.encode(PROTOCOLS[LEGACY]) == json.dumps(MOVE)
+    assert len(frame.encode(compact)) * 4 < len(frame.text)
+    assert compact.decode('{"t": "s"}') == {"type": "game_state"}
+
+
+def test_move_after_dropped_deltas_carries_the_fen():
+    """A compact player that lost moves to drop_oldest gets the next move with the full FEN"""
+    async def run():
+        manager = ConnectionManager(max_queue=2, policy="drop_oldest")
+        socket = FakeSocket()
+        manager.connect("game", socket, "BlackPlayer", PROTOCOLS[COMPACT_JSON])
+        for ply in range(1, 6):
+            manager.broadcast("game", Frame({**MOVE, "ply": ply}), key="move_made")
+        await asyncio.sleep(0.01)
+        return [json.loads(text) for text in socket.sent]
+
+    sent = asyncio.run(run())
+    assert [message["p"] for message in sent] == [4, 5]
+    assert sent[0]["f"] == MOVE["fen"] and "f" not in sent[1]
+
+
+def test_negotiation_falls_back_to_supported_protocols():
+    """Subprotocols win over the query parameter; unknown names get the legacy protocol"""
+    assert negotiate(None) == (PROTOCOLS[LEGACY], None)
+    assert negotiate("chess.v0") == (PROTOCOLS[LEGACY], None)
+    assert negotiate(COMPACT_JSON) == (PROTOCOLS[COMPACT_JSON], None)
+    assert negotiate(None, ["chess.v9", COMPACT_JSON]) == (PROTOCOLS[COMPACT_JSON], COMPACT_JSON)
+    assert negotiate(COMPACT_MSGPACK)[0].name in (COMPACT_MSGPACK, COMPACT_JSON)
+
+
+def test_compact_client_gets_sync_then_deltas(client, white_player, black_player):
+    """A player on the compact protocol gets the FEN once on connect, then move deltas"""
+    game_id = client.post("/api/games", json={"time_control": "5+3"}, headers=white_player["headers"]).json()["id"]
+    client.post(f"/api/games/{game_id}/join", json={}, headers=black_player["headers"])
+
+    token = create_test_token("BlackPlayer")
+    with client.websocket_connect(f"/ws/{game_id}?token={token}&protocol={COMPACT_JSON}") as websocket:
+        sync = websocket.receive_json()
+        client.post(f"/api/games/{game_id}/move", json={"move": "e2e4"}, headers=white_player["headers"])
+        move = websocket.receive_json()
+
+    assert sync["t"] == "s" and sync["v"] == 1 and sync["p"] == 0 and "f" in sync
+    assert move["t"] == "m" and move["u"] == "e2e4" and move["p"] == 1
+    assert "f" not in move and "game_id" not in move
+
+
+def test_subprotocol_negotiation(client, white_player):
+    """The chosen protocol is echoed as the accepted subprotocol"""
+    game_id = client.post("/api/games", json={"time_control": "5+3"}, headers=white_player["headers"]).json()["id"]
+
+    with client.websocket_connect(f"/ws/{game_id}", subprotocols=[COMPACT_JSON]) as websocket:
+        assert websocket.accepted_subprotocol == COMPACT_JSON
+        assert websocket.receive_json()["t"] == "s"
+        websocket.send_text(json.dumps({"t": "get_game_state"}))
+        assert websocket.receive_json()["t"] == "s"
+
+
+def test_msgpack_frames_are_binary():
+    """With msgpack installed, the binary protocol carries the same compact messages"""
+    msgpack = pytest.importorskip("msgpack")
+    frame = Frame(MOVE)
+    encoded = frame.encode(PROTOCOLS[COMPACT_MSGPACK])
+    assert isinstance(encoded, bytes)
+    assert msgpack.unpackb(encoded) == json.loads(frame.encode(PROTOCOLS[COMPACT_JSON]))
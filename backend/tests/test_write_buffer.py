@@ -0,0 +1,123 @@
+"""
+Test the write-behind buffer
+
+Tests: coalescing per game -> flush on stop -> size trigger -> retry keeps per-game order
+-> rejected writes are dropped from the cache
+"""
+
+import asyncio
+
+import chess
+from pymongo.errors import BulkWriteError
+
+from database.game_cache import game_cache
+from database.write_buffer import WriteBuffer
+from models.game_models import GameState
+from utils.chess_utils import pack_move
+
+
+class RecordingCollection:
+    """Collection stand-in that records bulk_write batches"""
+
+    def __init__(self, fail_times: int = 0):
+        self.batches = []
+        self.fail_times = fail_times
+
+    async def bulk_write(self, requests, ordered=True):
+        if self.fail_times:
+            self.fail_times -= 1
+            raise ConnectionError("network blip")
+        self.batches.append([(request._filter, request._doc) for request in requests])
+        return type("Result", (), {"matched_count": len(requests)})()
+
+
+def make_buffer(collection, max_batch: int = 500) -> WriteBuffer:
+    buffer = WriteBuffer(["blitz"], flush_interval=0.001, max_batch=max_batch, retry_delay=0.001)
+    buffer.collection = collection
+    return buffer
+
+
+def play(game: GameState, board: chess.Board, uci: str):
+    """Apply one move to a game the way the repository sees it"""
+    board.push_uci(uci)
+    game.record_move(pack_move(board.peek()), board.fen())
+    game.version += 1
+
+
+def test_updates_to_one_game_are_coalesced():
+    """Several moves buffered before a flush become one $push $each"""
+    async def run():
+        collection = RecordingCollection()
+        buffer = make_buffer(collection)
+        game = GameState(id="g1", player_white="WhitePlayer", time_control="5+3", version=1)
+        board = chess.Board()
+        for uci in ("e2e4", "e7e5", "g1f3"):
+            expected, since = game.version, game.ply
+            play(game, board, uci)
+            buffer.enqueue(game, expected, since)
+        assert buffer.latest("g1").ply == 3
+        await buffer.stop()
+        return collection, game, buffer
+
+    collection, game, buffer = asyncio.run(run())
+    [[(query, update)]] = collection.batches
+    assert query == {"_id": "g1", "version": 1}
+    assert update["$push"]["moves"] == {"$each": game.moves}
+    assert update["$set"]["version"] == 4
+    assert buffer.coalesced == 2
+    assert buffer.latest("g1") is None
+
+
+def test_size_trigger_and_retry_order():
+    """A full batch flushes early, and a failed batch is retried ahead of newer updates"""
+    async def run():
+        collection = RecordingCollection(fail_times=1)
+        buffer = make_buffer(collection, max_batch=2)
+        games = [GameState(id=f"g{i}", player_white="WhitePlayer", time_control="5+3", version=1) for i in range(2)]
+        boards = [chess.Board(), chess.Board()]
+        for game, board in zip(games, boards):
+            play(game, board, "e2e4")
+            buffer.enqueue(game, 1, 0)
+        await asyncio.sleep(0.05)
+        play(games[0], boards[0], "e7e5")
+        buffer.enqueue(games[0], 2, 1)
+        await buffer.stop()
+        return collection, buffer
+
+    collection, buffer = asyncio.run(run())
+    assert buffer.flush_failures == 1
+    # g0's writes start from the stored version and together push both moves
+    g0 = [(query, update) for batch in collection.batches for query, update in batch if query["_id"] == "g0"]
+    assert g0[0][0]["version"] == 1
+    assert sum(len(update["$push"]["moves"]["$each"]) for _, update in g0) == 2
+    assert buffer.stats()["queue_depth"] == 0
+
+
+class RejectingCollection:
+    """Collection stand-in whose bulk_write rejects the first update of every batch"""
+
+    async def bulk_write(self, requests, ordered=True):
+        raise BulkWriteError({
+            "writeErrors": [{"index": 0, "code": 121, "errmsg": "Document failed validation"}],
+            "nMatched": len(requests) - 1
+        })
+
+
+def test_rejected_write_is_dropped_from_cache():
+    """A write error is counted as a failed write, not as matched, and its game leaves the cache"""
+    async def run():
+        buffer = make_buffer(RejectingCollection())
+        games = [GameState(id=f"rejected{i}", player_white="WhitePlayer", time_control="5+3", version=1)
+                 for i in range(2)]
+        for game in games:
+            play(game, chess.Board(), "e2e4")
+            buffer.enqueue(game, 1, 0)
+            game_cache.put(game)
+        await buffer.stop()
+        return buffer
+
+    buffer = asyncio.run(run())
+    assert game_cache.get("rejected0") is None
+    assert game_cache.get("rejected1") is not None
+    assert buffer.failed_writes == 1 and buffer.conflicts == 0
+    game_cache.invalidate("rejected1")
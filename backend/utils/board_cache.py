@@ -0,0 +1,143 @@
+"""
+Board Cache - Live python-chess boards for active games
+
+Keeps one chess.Board per active game so the move path does not reparse
+the FEN on every request:
+- LRU ordering with an upper bound on cached games
+- Idle eviction for games nobody has touched for a while
+- Rebuild from the game's current FEN on a miss or when the cached ply is stale
+- Boards carrying a push that was never committed are rebuilt too, so a
+  move that lost a concurrent write cannot leak into the next request
+- While a request's push is in flight, concurrent requests get a private
+  board and the shared entry is left alone; commit() and invalidate()
+  only act on the board the caller actually pushed onto
+"""
+
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+import chess
+
+from core.metrics import register_metrics
+from core.settings import settings
+from models.game_models import GameState
+
+
+class _BoardEntry:
+    """A cached board together with the ply it represents"""
+
+    __slots__ = ("board", "ply", "base_ply", "last_used")
+
+    def __init__(self, board: chess.Board, ply: int):
+        self.board = board
+        self.ply = ply
+        self.base_ply = ply
+        self.last_used = time.monotonic()
+
+    def is_current(self, ply: int) -> bool:
+        """Check the board is at the given ply with no uncommitted pushes"""
+        return self.ply == ply and self.base_ply + len(self.board.move_stack) == ply
+
+    @property
+    def in_flight(self) -> bool:
+        """A push onto this board is not committed (or invalidated) yet"""
+        return self.base_ply + len(self.board.move_stack) != self.ply
+
+
+class BoardCache:
+    """Bounded LRU cache of live boards keyed by game ID"""
+
+    def __init__(self, max_games: int = 10000, idle_seconds: float = 1800):
+        self.max_games = max_games
+        self.idle_seconds = idle_seconds
+        self._entries: "OrderedDict[str, _BoardEntry]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_board(self, game: GameState) -> chess.Board:
+        """
+        Get the live board for a game, rebuilding it from the current FEN on a miss
+
+        Callers that push a move onto the returned board must call
+        commit() with it once the move is persisted, or invalidate() if
+        persisting it failed. While another request's push is in flight
+        the board is private to the caller and not cached.
+        """
+        ply = game.ply
+        entry = self._entries.get(game.id)
+        if entry is not None and entry.is_current(ply):
+            self.hits += 1
+            entry.last_used = time.monotonic()
+            self._entries.move_to_end(game.id)
+            self._evict_idle()
+            return entry.board
+
+        # Miss, or another writer advanced the game since we cached it
+        self.misses += 1
+        if entry is not None and entry.in_flight:
+            # The pushing request still owns the shared board
+            return chess.Board(game.current_fen)
+        entry = _BoardEntry(chess.Board(game.current_fen), ply)
+        self._entries[game.id] = entry
+        self._entries.move_to_end(game.id)
+        self._evict_idle()
+        self._evict_overflow()
+        return entry.board
+
+    def commit(self, game_id: str, ply: int, board: chess.Board):
+        """Record that the board a move was pushed onto now represents the given ply"""
+        entry = self._entries.get(game_id)
+        if entry is not None and entry.board is board:
+            entry.ply = ply
+            entry.last_used = time.monotonic()
+
+    def invalidate(self, game_id: str, board: Optional[chess.Board] = None):
+        """Drop the cached board for a game (finished game or failed write), only if it is the given board"""
+        entry = self._entries.get(game_id)
+        if entry is not None and (board is None or entry.board is board):
+            del self._entries[game_id]
+
+    def clear(self):
+        """Drop every cached board"""
+        self._entries.clear()
+
+    def _evict_idle(self):
+        """Evict least recently used boards that have been idle too long"""
+        if self.idle_seconds <= 0:
+            return
+        cutoff = time.monotonic() - self.idle_seconds
+        while self._entries:
+            game_id, entry = next(iter(self._entries.items()))
+            if entry.last_used >= cutoff:
+                break
+            del self._entries[game_id]
+            self.evictions += 1
+
+    def _evict_overflow(self):
+        """Evict least recently used boards beyond the size bound"""
+        while len(self._entries) > self.max_games:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and current occupancy"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_games": self.max_games,
+            "idle_seconds": self.idle_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+
+# Global board cache instance
+board_cache = BoardCache(
+    max_games=settings.BOARD_CACHE_MAX_GAMES,
+    idle_seconds=settings.BOARD_CACHE_IDLE_SECONDS
+)
+register_metrics("board_cache", board_cache.stats)
@@ -0,0 +1,133 @@
+"""
+Chess Executor - Run move validation off the event loop
+
+python-chess is pure Python, so generating moves in a complex position
+blocks every WebSocket and HTTP request on the worker. In "process" mode
+process_move runs in a worker process pool:
+- Cheap cases stay inline: wrong side to move, or a move already
+  memoized in the shared position cache
+- At most CHESS_EXECUTOR_MAX_IN_FLIGHT moves are submitted at once;
+  further moves wait for a slot instead of queueing unboundedly
+- The live board is updated in place once the worker returns; until
+  then it carries a placeholder null move, so the board cache sees an
+  uncommitted push and hands concurrent requests a private board
+
+"inline" mode (the default) keeps everything on the event loop.
+"""
+
+import asyncio
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+import chess
+
+from core.metrics import register_metrics
+from core.settings import settings
+from utils.chess_utils import MoveOutcome, is_memoized_move, process_move, unpack_move
+
+logger = logging.getLogger(__name__)
+
+
+def _process_move_in_worker(fen: str, move_uci: str, side: Optional[str],
+                            position_counts: Optional[Dict[str, int]],
+                            threefold_ends_game: bool) -> Tuple[MoveOutcome, Optional[Dict[str, int]]]:
+    """Pool entry point: run the fused pipeline on a board parsed from the FEN"""
+    outcome = process_move(fen, move_uci, side, position_counts, threefold_ends_game)
+    return outcome, position_counts
+
+
+class ChessExecutor:
+    """Dispatch process_move inline or to a process pool"""
+
+    def __init__(self, mode: str = "inline", workers: int = 2, max_in_flight: int = 32):
+        self.mode = mode
+        self.workers = workers
+        self.max_in_flight = max_in_flight
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.inline_moves = 0
+        self.offloaded_moves = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.offload_seconds = 0.0
+        self.slot_wait_seconds = 0.0
+
+    def _ensure_pool(self):
+        """Start the worker processes on first use"""
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            self._slots = asyncio.Semaphore(self.max_in_flight)
+            logger.info(f"Started chess executor pool with {self.workers} workers")
+
+    async def process_move(self, board: chess.Board, move_uci: str, side: Optional[str],
+                           position_counts: Optional[Dict[str, int]] = None,
+                           threefold_ends_game: bool = True) -> MoveOutcome:
+        """Same contract as utils.chess_utils.process_move on a live board"""
+        turn = "white" if board.turn else "black"
+        if self.mode != "process" or side != turn or is_memoized_move(board, move_uci):
+            self.inline_moves += 1
+            return process_move(board, move_uci, side, position_counts, threefold_ends_game)
+
+        self._ensure_pool()
+        fen = board.fen()
+        # Keeps other requests off this board while we wait (see BoardCache.get_board)
+        board.push(chess.Move.null())
+        try:
+            wait_start = time.perf_counter()
+            async with self._slots:
+                start = time.perf_counter()
+                self.slot_wait_seconds += start - wait_start
+                self.in_flight += 1
+                self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+                try:
+                    loop = asyncio.get_running_loop()
+                    outcome, counts = await loop.run_in_executor(
+                        self._pool, _process_move_in_worker,
+                        fen, move_uci, side, position_counts, threefold_ends_game
+                    )
+                finally:
+                    self.in_flight -= 1
+                    self.offload_seconds += time.perf_counter() - start
+        finally:
+            board.pop()
+        self.offloaded_moves += 1
+
+        if outcome.success:
+            # Bring the live board and repetition index up to date
+            board.push(unpack_move(outcome.move))
+            if position_counts is not None:
+                position_counts.clear()
+                position_counts.update(counts)
+        return outcome
+
+    def shutdown(self):
+        """Stop the worker processes"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+            self._slots = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Get dispatch counters and pool latency"""
+        return {
+            "mode": self.mode,
+            "workers": self.workers,
+            "max_in_flight": self.max_in_flight,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "inline_moves": self.inline_moves,
+            "offloaded_moves": self.offloaded_moves,
+            "avg_offload_ms": self.offload_seconds / self.offloaded_moves * 1000 if self.offloaded_moves else 0.0,
+            "avg_slot_wait_ms": self.slot_wait_seconds / self.offloaded_moves * 1000 if self.offloaded_moves else 0.0
+        }
+
+
+# Global chess executor instance
+chess_executor = ChessExecutor(
+    mode=settings.CHESS_EXECUTOR_MODE,
+    workers=settings.CHESS_EXECUTOR_WORKERS,
+    max_in_flight=settings.CHESS_EXECUTOR_MAX_IN_FLIGHT
+)
+register_metrics("chess_executor", chess_executor.stats)
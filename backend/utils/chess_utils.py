@@ -5,28 +5,160 @@ Uses python-chess for:
 - Move validation
 - Game end detection (checkmate, stalemate, etc.)
 - FEN handling
+
+Helpers accept either a FEN string or a live chess.Board (see
+utils/board_cache.py); a live board is updated in place. Legal moves and
+game end classification of early positions are shared across games via
+utils/position_cache.py.
 """
 
 import chess
-from typing import Tuple, Optional
+import chess.polyglot
+from typing import Dict, List, NamedTuple, Tuple, Optional, Union
+
+from utils.position_cache import PositionInfo, position_cache
+
+Position = Union[str, chess.Board]
+
+
+class MoveOutcome(NamedTuple):
+    """Everything the move path needs to know about a single move"""
+    success: bool
+    error: Optional[str] = None
+    san: Optional[str] = None
+    fen: Optional[str] = None
+    game_over: bool = False
+    result: Optional[str] = None  # 'white', 'black', 'draw' or None
+    reason: Optional[str] = None  # e.g. 'checkmate', 'stalemate'
+    move: Optional[int] = None  # Normalized move, packed with pack_move
+
+
+def _to_board(position: Position) -> chess.Board:
+    """Use a live board as-is, or parse a FEN string into a new one"""
+    if isinstance(position, chess.Board):
+        return position
+    return chess.Board(position)
+
+
+def pack_move(move: chess.Move) -> int:
+    """Pack a move into 15 bits: from square | to square << 6 | promotion piece << 12"""
+    return move.from_square | (move.to_square << 6) | ((move.promotion or 0) << 12)
+
 
+def unpack_move(code: int) -> chess.Move:
+    """Unpack a move packed by pack_move"""
+    return chess.Move(code & 0x3F, (code >> 6) & 0x3F, (code >> 12) or None)
 
-def validate_and_apply_move(fen: str, move_uci: str) -> Tuple[bool, Optional[str], Optional[str]]:
+
+def replay_fens(start_fen: str, moves: List[int]) -> List[str]:
+    """Rebuild the FEN of every ply by replaying packed moves from a position"""
+    board = chess.Board(start_fen)
+    fens = [board.fen()]
+    for code in moves:
+        board.push(unpack_move(code))
+        fens.append(board.fen())
+    return fens
+
+
+def moves_from_fens(fens: List[str]) -> List[int]:
+    """
+    Recover the packed move list of a FEN history
+    
+    Used to migrate documents stored as one FEN per ply. Raises ValueError
+    if two consecutive FENs are not connected by a legal move.
+    """
+    moves = []
+    board = chess.Board(fens[0])
+    for target in fens[1:]:
+        placement = target.split(" ", 1)[0]
+        for move in board.legal_moves:
+            board.push(move)
+            if board.board_fen() == placement and board.fen() == target:
+                moves.append(pack_move(move))
+                break
+            board.pop()
+        else:
+            raise ValueError(f"No legal move leads to {target}")
+    return moves
+
+
+def _analyze_position(board: chess.Board) -> PositionInfo:
+    """Classify a position without generating the full legal-move set"""
+    is_check = board.is_check()
+    if not any(board.generate_legal_moves()):
+        if is_check:
+            # The player whose turn it is has been checkmated
+            return PositionInfo(is_check, "white" if not board.turn else "black", "checkmate")
+        return PositionInfo(is_check, "draw", "stalemate")
+    if board.is_insufficient_material():
+        return PositionInfo(is_check, "draw", "insufficient_material")
+    return PositionInfo(is_check)
+
+
+def _cached_position_info(board: chess.Board, count: bool = True,
+                          key: Optional[str] = None) -> Optional[PositionInfo]:
+    """
+    Get position facts from the shared cache, adding the position on a miss
+    
+    Returns None for positions beyond the cached opening phase. count=False
+    looks the position up without affecting the hit-rate statistics.
+    Positions are keyed by position_key, the repetition key, which callers
+    that already computed it pass in.
+    """
+    if not position_cache.enabled or board.ply() > position_cache.max_ply:
+        return None
+    if key is None:
+        key = position_key(board)
+    info = position_cache.get(key) if count else position_cache.peek(key)
+    if info is None:
+        info = _analyze_position(board)
+        position_cache.put(key, info)
+    return info
+
+
+def _is_legal(board: chess.Board, move: chess.Move, info: Optional[PositionInfo]) -> bool:
+    """Check legality against the cached move set, falling back to python-chess"""
+    if info is not None:
+        if info.legal_moves is None:
+            info.validations += 1
+            if info.validations > 1:
+                # Seen again: worth generating the full set once
+                info.legal_moves = frozenset(pack_move(m) for m in board.generate_legal_moves())
+        if info.legal_moves is not None and pack_move(move) in info.legal_moves:
+            return True
+    # Uncached position, an illegal move, or an alternative castling notation (e1h1)
+    return board.is_legal(move)
+
+
+def is_memoized_move(board: chess.Board, move_uci: str) -> bool:
+    """Check whether a move from this position is already in the shared cache (no move generation needed)"""
+    if not position_cache.enabled or board.ply() > position_cache.max_ply:
+        return False
+    info = position_cache.peek(position_key(board))
+    if info is None:
+        return False
+    try:
+        return pack_move(chess.Move.from_uci(move_uci)) in info.successors
+    except ValueError:
+        return False
+
+
+def validate_and_apply_move(fen: Position, move_uci: str) -> Tuple[bool, Optional[str], Optional[str]]:
     """
     Validate a move and return the resulting FEN
     
     Args:
-        fen: Current board position in FEN notation
+        fen: Current board position in FEN notation, or a live board to push onto
         move_uci: Move in UCI format (e.g., 'e2e4')
     
     Returns:
         Tuple of (success, new_fen, error_message)
     """
     try:
-        board = chess.Board(fen)
+        board = _to_board(fen)
         move = chess.Move.from_uci(move_uci)
         
-        if move not in board.legal_moves:
+        if not _is_legal(board, move, _cached_position_info(board, count=False)):
             return False, None, "Illegal move"
         
         board.push(move)
@@ -38,49 +170,178 @@ def validate_and_apply_move(fen: str, move_uci: str) -> Tuple[bool, Optional[str
         return False, None, f"Move validation error: {str(e)}"
 
 
-def detect_game_end(fen: str) -> Tuple[bool, Optional[str]]:
+def position_key(board: chess.Board) -> str:
     """
-    Check if the game has ended and determine the result
+    Get the repetition key of a position
+    
+    Polyglot Zobrist hash of placement, side to move, castling rights and
+    capturable en passant square; the clock fields are not part of it.
+    """
+    return format(chess.polyglot.zobrist_hash(board), "016x")
+
+
+def rebuild_position_counts(fens: List[str]) -> Dict[str, int]:
+    """
+    Rebuild the repetition index of a game from its FEN history
+    
+    Only positions since the last pawn move or capture (halfmove clock 0)
+    can repeat, so earlier FENs are skipped without being parsed. Callers
+    holding a move list should replay just that tail (see
+    GameState._ensure_derived_state) rather than the whole game.
+    """
+    start = 0
+    for i in range(len(fens) - 1, -1, -1):
+        if fens[i].split()[4] == "0":
+            start = i
+            break
+    
+    counts: Dict[str, int] = {}
+    for fen in fens[start:]:
+        key = position_key(chess.Board(fen))
+        counts[key] = counts.get(key, 0) + 1
+    return counts
+
+
+def process_move(position: Position, move_uci: str, side: Optional[str],
+                 position_counts: Optional[Dict[str, int]] = None,
+                 threefold_ends_game: bool = True) -> MoveOutcome:
+    """
+    Check turn and legality, apply a move and classify the result in one pass
+    
+    Everything is computed on a single board instance; a live board is
+    updated in place, and left untouched if the move is rejected.
     
     Args:
-        fen: Current board position in FEN notation
+        position: Current position as a FEN string or a live board
+        move_uci: Move in UCI format (e.g., 'e2e4')
+        side: Color of the player making the move ('white' or 'black'),
+              or None if the player is not part of the game
+        position_counts: Repetition index of the game (see position_key),
+                         updated in place when the move is applied
+        threefold_ends_game: End the game on threefold repetition instead
+                             of waiting for fivefold
     
     Returns:
-        Tuple of (game_ended, result)
-        result can be 'white', 'black', 'draw', or None
+        MoveOutcome with the SAN, the new FEN and the game end classification
     """
     try:
-        board = chess.Board(fen)
+        board = _to_board(position)
+        turn = "white" if board.turn else "black"
+        if side != turn:
+            return MoveOutcome(success=False, error=f"Not your turn ({turn} to move)")
         
-        if board.is_checkmate():
-            # The player whose turn it is has been checkmated
-            winner = "white" if not board.turn else "black"
-            return True, winner
+        move = chess.Move.from_uci(move_uci)
+        info = _cached_position_info(board, count=False)
+        if not _is_legal(board, move, info):
+            return MoveOutcome(success=False, error="Illegal move")
         
-        elif (board.is_stalemate() or 
-              board.is_insufficient_material() or 
-              board.is_seventyfive_moves() or 
-              board.is_repetition(3)):
-            return True, "draw"
+        packed = pack_move(move)
+        successor = info.successors.get(packed) if info is not None else None
+        if successor is not None:
+            # Move already played from this position in some game
+            san, fen_fields, key = successor
+            board.push(move)
+            fen = f"{fen_fields} {board.halfmove_clock} {board.fullmove_number}"
+        else:
+            san = board.san_and_push(move)
+            fen = board.fen()
+            key = None
+            if info is not None:
+                key = position_key(board)
+                info.successors[packed] = (san, fen.rsplit(" ", 2)[0], key)
         
-        return False, None
+        repetitions = None
+        if position_counts is not None:
+            repetitions = _record_position(board, position_counts, key)
+        game_over, result, reason = _classify_position(board, repetitions, threefold_ends_game, key)
+        return MoveOutcome(
+            success=True,
+            move=pack_move(board.peek()),
+            san=san,
+            fen=fen,
+            game_over=game_over,
+            result=result,
+            reason=reason
+        )
+        
+    except ValueError as e:
+        return MoveOutcome(success=False, error=f"Invalid move format: {str(e)}")
+    except Exception as e:
+        return MoveOutcome(success=False, error=f"Move validation error: {str(e)}")
+
+
+def _record_position(board: chess.Board, position_counts: Dict[str, int], key: Optional[str] = None) -> int:
+    """Count the current position in the repetition index and return its count"""
+    if board.halfmove_clock == 0:
+        # Pawn move or capture: no earlier position can occur again
+        position_counts.clear()
+    if key is None:
+        key = position_key(board)
+    count = position_counts.get(key, 0) + 1
+    position_counts[key] = count
+    return count
+
+
+def _classify_position(board: chess.Board, repetitions: Optional[int] = None,
+                       threefold_ends_game: bool = True,
+                       key: Optional[str] = None) -> Tuple[bool, Optional[str], Optional[str]]:
+    """
+    Classify the position after a move as (game_over, result, reason)
+    
+    repetitions is the count from the game's repetition index; without an
+    index, repetition falls back to replaying the board's move stack. key
+    is the position_key of the board, if already known.
+    """
+    info = _cached_position_info(board, key=key) or _analyze_position(board)
+    if info.result is not None:
+        return True, info.result, info.reason
+    
+    # Legal moves exist, so only the clock matters for the 75-move rule
+    if board.halfmove_clock >= 150:
+        return True, "draw", "seventyfive_moves"
+    if repetitions is None:
+        if board.is_repetition(3):
+            return True, "draw", "threefold_repetition"
+    elif repetitions >= 5:
+        return True, "draw", "fivefold_repetition"
+    elif repetitions >= 3 and threefold_ends_game:
+        return True, "draw", "threefold_repetition"
+    
+    return False, None, None
+
+
+def detect_game_end(fen: Position) -> Tuple[bool, Optional[str]]:
+    """
+    Check if the game has ended and determine the result
+    
+    Args:
+        fen: Current board position in FEN notation, or a live board
+    
+    Returns:
+        Tuple of (game_ended, result)
+        result can be 'white', 'black', 'draw', or None
+    """
+    try:
+        board = _to_board(fen)
+        game_ended, result, _ = _classify_position(board)
+        return game_ended, result
         
     except Exception:
         return False, None
 
 
-def get_turn_from_fen(fen: str) -> str:
+def get_turn_from_fen(fen: Position) -> str:
     """
     Get whose turn it is from a FEN string
     
     Args:
-        fen: Board position in FEN notation
+        fen: Board position in FEN notation, or a live board
     
     Returns:
         'white' or 'black'
     """
     try:
-        board = chess.Board(fen)
+        board = _to_board(fen)
         return "white" if board.turn else "black"
     except:
         return "white"  # Default to white
@@ -0,0 +1,83 @@
+"""
+Game IDs - Short, time-ordered game IDs without a database round trip
+
+An ID is 10 lowercase base36 characters:
+- 6 characters of seconds since 2024-01-01 UTC (good until the 2090s),
+  so IDs sort by creation time and never repeat across seconds
+- 4 characters of a per-worker sequence that starts at a random value
+  every second, so IDs from one worker never repeat within a second
+
+Allocation never waits: a worker that runs out of sequence numbers
+within a second moves on to the next second early, and one whose clock
+steps back keeps counting in the last second it used, so its IDs stay
+unique and ordered.
+
+Two workers can still pick the same ID in the same second; the games
+collection's unique _id rejects the second insert and GameService retries
+with the next ID. Archived games are at least a day old, so a new ID can
+never collide with one in the archive.
+"""
+
+import secrets
+import time
+from typing import Any, Dict
+
+from core.metrics import register_metrics
+
+_ALPHABET = "0123456789abcdefghijklmnopqrstuvwxyz"
+_EPOCH = 1704067200  # 2024-01-01T00:00:00Z
+_TIME_CHARS = 6
+_SEQUENCE_CHARS = 4
+_SEQUENCE_SIZE = 36 ** _SEQUENCE_CHARS
+
+
+def _base36(value: int, width: int) -> str:
+    chars = []
+    for _ in range(width):
+        value, digit = divmod(value, 36)
+        chars.append(_ALPHABET[digit])
+    return "".join(reversed(chars))
+
+
+class GameIdAllocator:
+    """Per-worker allocator of time-ordered game IDs"""
+
+    def __init__(self):
+        self._second = -1
+        self._start = 0
+        self._sequence = 0
+        self.allocated = 0
+        self.collisions = 0
+        self.borrowed = 0
+
+    def next_id(self) -> str:
+        """Allocate the next game ID (never blocks)"""
+        # Never behind the last ID: a clock stepped back keeps counting in the current second
+        second = max(int(time.time()) - _EPOCH, self._second)
+        if second != self._second:
+            self._new_second(second)
+        else:
+            self._sequence = (self._sequence + 1) % _SEQUENCE_SIZE
+            if self._sequence == self._start:
+                # Sequence exhausted within one second: borrow the next one instead of waiting for it
+                self.borrowed += 1
+                self._new_second(second + 1)
+        self.allocated += 1
+        return _base36(self._second, _TIME_CHARS) + _base36(self._sequence, _SEQUENCE_CHARS)
+
+    def _new_second(self, second: int):
+        self._second = second
+        self._start = self._sequence = secrets.randbelow(_SEQUENCE_SIZE)
+
+    def record_collision(self):
+        """Count an ID that was already taken by another worker"""
+        self.collisions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Get allocation and collision counters"""
+        return {"allocated": self.allocated, "collisions": self.collisions, "borrowed": self.borrowed}
+
+
+# Global game ID allocator instance
+game_id_allocator = GameIdAllocator()
+register_metrics("game_ids", game_id_allocator.stats)
@@ -0,0 +1,113 @@
+"""
+Position Cache - Shared legal-move transposition table
+
+Openings repeat across games, so the same positions get their legal moves
+generated over and over. This process-wide cache maps a position's
+repetition key (chess_utils.position_key: the polyglot Zobrist hash that
+also indexes each game's repetition counts) to its legal-move set and
+its history-independent game end classification (checkmate, stalemate,
+insufficient material):
+- Memoized per-move results (SAN, next FEN, repetition key)
+- LRU eviction bounded by POSITION_CACHE_SIZE (0 disables the cache)
+- Only positions up to POSITION_CACHE_MAX_PLY are cached, where
+  transpositions are common; later positions are almost always unique
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Hashable, Optional, Tuple
+
+from core.metrics import register_metrics
+from core.settings import settings
+
+
+class PositionInfo:
+    """
+    Cached facts about a position that do not depend on the game history
+
+    Besides the end classification, an entry memoizes the result of each
+    move played from the position (SAN, FEN fields without the clocks and
+    repetition key of the next position). The legal-move set is only
+    generated once the position has been validated against more than
+    once, since generating it costs more than a single legality check.
+    """
+
+    __slots__ = ("is_check", "result", "reason", "legal_moves", "successors", "validations")
+
+    def __init__(self, is_check: bool, result: Optional[str] = None, reason: Optional[str] = None):
+        self.is_check = is_check
+        self.result = result  # 'white', 'black', 'draw' or None
+        self.reason = reason
+        self.legal_moves: Optional[FrozenSet[int]] = None  # Packed moves, see chess_utils.pack_move
+        self.successors: Dict[int, Tuple[str, str, str]] = {}  # packed move -> (san, fen fields, key)
+        self.validations = 0
+
+
+class PositionCache:
+    """Bounded LRU map of position key -> PositionInfo"""
+
+    def __init__(self, max_positions: int = 20000, max_ply: int = 20):
+        self.max_positions = max_positions
+        self.max_ply = max_ply
+        self._entries: "OrderedDict[Hashable, PositionInfo]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_positions > 0
+
+    def get(self, key: Hashable) -> Optional[PositionInfo]:
+        """Look up a position, counting the hit or miss"""
+        info = self._entries.get(key)
+        if info is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return info
+
+    def peek(self, key: Hashable) -> Optional[PositionInfo]:
+        """Look up a position without counting or touching LRU order"""
+        return self._entries.get(key)
+
+    def put(self, key: Hashable, info: PositionInfo):
+        """Store a position, evicting the least recently used beyond the bound"""
+        self._entries[key] = info
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_positions:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def resize(self, max_positions: int):
+        """Change the size bound, evicting immediately if it shrank"""
+        self.max_positions = max_positions
+        while len(self._entries) > max(max_positions, 0):
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        """Drop every cached position and reset the counters"""
+        self._entries.clear()
+        self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit-rate statistics and current occupancy"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_positions": self.max_positions,
+            "max_ply": self.max_ply,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+
+# Global position cache instance
+position_cache = PositionCache(
+    max_positions=settings.POSITION_CACHE_SIZE,
+    max_ply=settings.POSITION_CACHE_MAX_PLY
+)
+register_metrics("position_cache", position_cache.stats)
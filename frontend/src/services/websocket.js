@@ -17,11 +17,18 @@ class WebSocketService {
       }
     }
 
-    // Build WebSocket URL with username for connection tracking
-    let wsUrl = `ws://localhost:8000/ws/${gameId}`
+    // Build WebSocket URL with username for connection tracking; the access token
+    // authenticates the socket, without it the server treats it as a spectator
+    const params = new URLSearchParams()
+    const token = localStorage.getItem('auth_token')
+    if (token) {
+      params.set('token', token)
+    }
     if (username) {
-      wsUrl += `?username=${encodeURIComponent(username)}`
+      params.set('username', username)
     }
+    const query = params.toString()
+    const wsUrl = `ws://localhost:8000/ws/${gameId}${query ? `?${query}` : ''}`
 
     const ws = new WebSocket(wsUrl)
     this.connections.set(gameId, ws)